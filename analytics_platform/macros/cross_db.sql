@@ -0,0 +1,17 @@
+{#
+  Postgres-only SQL used by the models, with the DuckDB equivalent for the
+  `local` (dbt-duckdb) target. Other adapters get the Postgres form.
+#}
+
+{# Integer date key (20251221) -> date. DuckDB has no to_date(text, fmt). #}
+{% macro yyyymmdd_to_date(column) -%}
+    {{ return(adapter.dispatch('yyyymmdd_to_date')(column)) }}
+{%- endmacro %}
+
+{% macro default__yyyymmdd_to_date(column) -%}
+    to_date({{ column }}::text, 'YYYYMMDD')
+{%- endmacro %}
+
+{% macro duckdb__yyyymmdd_to_date(column) -%}
+    strptime({{ column }}::varchar, '%Y%m%d')::date
+{%- endmacro %}
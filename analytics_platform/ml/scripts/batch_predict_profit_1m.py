@@ -1,8 +1,6 @@
-import os
 import pandas as pd
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 
 from sklearn.metrics import mean_absolute_error
 
@@ -10,38 +8,19 @@ import mlflow
 import mlflow.sklearn
 
 from ml.config import setup_mlflow
+from ml.warehouse import read_sql, write_table
 
 load_dotenv()
 
 
-def get_engine():
-    PGHOST = os.getenv("PGHOST")
-    PGPORT = os.getenv("PGPORT", "5432")
-    PGUSER = os.getenv("PGUSER")
-    PGPASSWORD = os.getenv("PGPASSWORD")
-    PGDATABASE = os.getenv("PGDATABASE")
-    PGSSLMODE = os.getenv("PGSSLMODE", "require")
-
-    assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
-        "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
-    )
-
-    conn_str = (
-        f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-        f"?sslmode={PGSSLMODE}"
-    )
-    return create_engine(conn_str)
-
-
 def main():
     # 1) connect db + mlflow
     tracking_uri = setup_mlflow()
-    engine = get_engine()
     mlflow.set_experiment("phase5_batch_predictions")
 
     # 2) load batch features (same table as training dataset)
     sql = "select * from analytics.ml_train_profit_monthly order by region_id, ds;"
-    df = pd.read_sql(sql, engine)
+    df = read_sql(sql)
     df["ds"] = pd.to_datetime(df["ds"])
 
     target = "y_operating_profit_1m"
@@ -94,13 +73,7 @@ def main():
         if len(df_eval) > 0:
             mae = mean_absolute_error(df_eval[target], model.predict(df_eval[feature_cols]))
 
-    out.to_sql(
-        "ml_pred_profit_1m",
-        engine,
-        schema="analytics",
-        if_exists="replace",
-        index=False,
-    )
+    write_table(out, "ml_pred_profit_1m")
 
     # 6) Log the batch run itself
     with mlflow.start_run(run_name="batch_predict_profit_1m"):
@@ -1,41 +1,21 @@
-import os
 import pandas as pd
 from datetime import datetime, timezone
-from sqlalchemy import create_engine
 from sklearn.metrics import mean_absolute_error
 import mlflow
 import mlflow.sklearn
 
 from ml.config import setup_mlflow
-
-def get_engine():
-    PGHOST = os.getenv("PGHOST")
-    PGPORT = os.getenv("PGPORT", "5432")
-    PGUSER = os.getenv("PGUSER")
-    PGPASSWORD = os.getenv("PGPASSWORD")
-    PGDATABASE = os.getenv("PGDATABASE")
-    PGSSLMODE = os.getenv("PGSSLMODE", "require")
-
-    assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
-        "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
-    )
-
-    conn_str = (
-        f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-        f"?sslmode={PGSSLMODE}"
-    )
-    return create_engine(conn_str)
+from ml.warehouse import read_sql, write_table
 
 
 def main():
     # 1) connect db + mlflow
     tracking_uri = setup_mlflow()
-    engine = get_engine()
     mlflow.set_experiment("phase5_batch_predictions")
 
     # 2) load batch features (same table as training dataset)
     sql = "select * from analytics.ml_train_sales_monthly order by region_id, ds;"
-    df = pd.read_sql(sql, engine)
+    df = read_sql(sql)
     df["ds"] = pd.to_datetime(df["ds"])
 
     target = "y_shipped_qty_1m"
@@ -92,7 +72,7 @@ def main():
     else:
         mae = None
 
-    out.to_sql("ml_pred_sales_1m", engine, schema="analytics", if_exists="replace", index=False)
+    write_table(out, "ml_pred_sales_1m")
 
     # 6) Log the batch run itself
     with mlflow.start_run(run_name="batch_predict_sales_1m"):
@@ -1,37 +1,15 @@
-import os
 from dotenv import load_dotenv
 load_dotenv()
 
 import json
 import pandas as pd
-from sqlalchemy import create_engine
 from sklearn.metrics import mean_absolute_error
 from sklearn.linear_model import LinearRegression
 
 import mlflow
 import mlflow.sklearn
 from ml.config import setup_mlflow
-
-
-# -------------------------------------------------
-# 1) Postgres connection (same as dbt)
-# -------------------------------------------------
-PGHOST = os.getenv("PGHOST")
-PGPORT = os.getenv("PGPORT", "5432")
-PGUSER = os.getenv("PGUSER")
-PGPASSWORD = os.getenv("PGPASSWORD")
-PGDATABASE = os.getenv("PGDATABASE")
-PGSSLMODE = os.getenv("PGSSLMODE", "require")
-
-assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
-    "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
-)
-
-conn_str = (
-    f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-    f"?sslmode={PGSSLMODE}"
-)
-engine = create_engine(conn_str)
+from ml.warehouse import read_sql, write_table
 
 
 # -------------------------------------------------
@@ -42,7 +20,7 @@ select *
 from analytics.ml_train_profit_monthly
 order by region_id, ds;
 """
-df = pd.read_sql(sql, engine)
+df = read_sql(sql)
 df["ds"] = pd.to_datetime(df["ds"])
 
 
@@ -118,13 +96,7 @@ with mlflow.start_run(run_name=run_name):
     out["y_pred"] = pred
     out["model_name"] = "linear_regression_baseline"
 
-    out.to_sql(
-        "ml_pred_profit_1m",
-        engine,
-        schema="analytics",
-        if_exists="replace",
-        index=False,
-    )
+    write_table(out, "ml_pred_profit_1m")
 
     # -------------------------------------------------
     # 7) Artifacts
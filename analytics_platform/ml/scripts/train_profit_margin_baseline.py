@@ -1,30 +1,14 @@
-import os
 import pandas as pd
-from sqlalchemy import create_engine
 from sklearn.metrics import mean_absolute_error
 from sklearn.linear_model import LinearRegression
 
-# 1) Build Postgres connection from env vars (same ones dbt uses)
-PGHOST = os.getenv("PGHOST")
-PGPORT = os.getenv("PGPORT", "5432")
-PGUSER = os.getenv("PGUSER")
-PGPASSWORD = os.getenv("PGPASSWORD")
-PGDATABASE = os.getenv("PGDATABASE")
-PGSSLMODE = os.getenv("PGSSLMODE", "require")
+from ml.warehouse import read_sql, write_table
 
-assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
-    "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
-)
-
-conn_str = (
-    f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-    f"?sslmode={PGSSLMODE}"
-)
-engine = create_engine(conn_str)
+# 1) Warehouse: ml.warehouse reads Postgres, or the local DuckDB file with ML_TARGET=duckdb
 
 # 2) Load training data
 sql = "select * from analytics.ml_train_profit_monthly order by region_id, ds;"
-df = pd.read_sql(sql, engine)
+df = read_sql(sql)
 
 # 3) Ensure ds is datetime
 df["ds"] = pd.to_datetime(df["ds"])
@@ -74,5 +58,5 @@ out = df_test[["ds", "region_id"]].copy()
 out["y_true"] = y_test.values
 out["y_pred"] = pred
 out["model_name"] = "linear_regression_baseline"
-out.to_sql("ml_pred_profit_margin_1m", engine, schema="analytics", if_exists="replace", index=False)
+write_table(out, "ml_pred_profit_margin_1m")
 print("Saved predictions to analytics.ml_pred_profit_margin_1m")
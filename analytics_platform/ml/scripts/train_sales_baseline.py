@@ -1,8 +1,6 @@
-import os
 import json
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 
 from sklearn.metrics import mean_absolute_error
 from sklearn.linear_model import LinearRegression
@@ -11,36 +9,15 @@ import mlflow
 import mlflow.sklearn
 
 from ml.config import setup_mlflow
+from ml.warehouse import read_sql, write_table
 
 load_dotenv()
 
 
-def get_engine():
-    # 1) Build Postgres connection from env vars (same ones dbt uses)
-    PGHOST = os.getenv("PGHOST")
-    PGPORT = os.getenv("PGPORT", "5432")
-    PGUSER = os.getenv("PGUSER")
-    PGPASSWORD = os.getenv("PGPASSWORD")
-    PGDATABASE = os.getenv("PGDATABASE")
-    PGSSLMODE = os.getenv("PGSSLMODE", "require")
-
-    assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
-        "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
-    )
-
-    conn_str = (
-        f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
-        f"?sslmode={PGSSLMODE}"
-    )
-    return create_engine(conn_str)
-
-
 def main():
-    engine = get_engine()
-
     # 2) Load training data
     sql = "select * from analytics.ml_train_sales_monthly order by region_id, ds;"
-    df = pd.read_sql(sql, engine)
+    df = read_sql(sql)
 
     # 3) Ensure ds is datetime
     df["ds"] = pd.to_datetime(df["ds"])
@@ -104,13 +81,7 @@ def main():
         out["y_pred"] = pred
         out["model_name"] = model_name
         out["run_id"] = run.info.run_id
-        out.to_sql(
-            "ml_pred_sales_1m",
-            engine,
-            schema="analytics",
-            if_exists="replace",
-            index=False
-        )
+        write_table(out, "ml_pred_sales_1m")
 
         # 10) Artifacts
         pred_path = "predictions.csv"
@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Where the ML scripts read features and write predictions:
+# - postgres (default): the warehouse dbt builds into (PG* env vars, same as dbt)
+# - duckdb: the local file the ETL writes with --target duckdb (ETL_DUCKDB_PATH)
+# Read on each call: the scripts load .env after importing this module.
+DEFAULT_DUCKDB_PATH = Path(__file__).resolve().parents[2] / "database" / "local" / "warehouse.duckdb"
+
+
+def ml_target() -> str:
+    return os.getenv("ML_TARGET") or os.getenv("ETL_TARGET", "postgres")
+
+
+def get_engine():
+    from sqlalchemy import create_engine
+
+    PGHOST = os.getenv("PGHOST")
+    PGPORT = os.getenv("PGPORT", "5432")
+    PGUSER = os.getenv("PGUSER")
+    PGPASSWORD = os.getenv("PGPASSWORD")
+    PGDATABASE = os.getenv("PGDATABASE")
+    PGSSLMODE = os.getenv("PGSSLMODE", "require")
+
+    assert PGHOST and PGUSER and PGPASSWORD and PGDATABASE, (
+        "Missing PG env vars. Export PGHOST/PGUSER/PGPASSWORD/PGDATABASE first."
+    )
+
+    conn_str = (
+        f"postgresql+psycopg2://{PGUSER}:{PGPASSWORD}@{PGHOST}:{PGPORT}/{PGDATABASE}"
+        f"?sslmode={PGSSLMODE}"
+    )
+    return create_engine(conn_str)
+
+
+def _duckdb(read_only: bool):
+    import duckdb
+
+    path = os.getenv("ETL_DUCKDB_PATH") or DEFAULT_DUCKDB_PATH
+    return duckdb.connect(str(path), read_only=read_only)
+
+
+def read_sql(sql: str) -> pd.DataFrame:
+    if ml_target() == "duckdb":
+        with _duckdb(read_only=True) as con:
+            return con.execute(sql).df()
+    return pd.read_sql(sql, get_engine())
+
+
+def write_table(df: pd.DataFrame, name: str, schema: str = "analytics"):
+    """Replace ``schema.name`` with ``df``."""
+    if ml_target() == "duckdb":
+        with _duckdb(read_only=False) as con:
+            con.register("df", df)
+            con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            con.execute(f"CREATE OR REPLACE TABLE {schema}.{name} AS SELECT * FROM df")
+        return
+    df.to_sql(name, get_engine(), schema=schema, if_exists="replace", index=False)
@@ -19,7 +19,7 @@ with pl as (
 -- 先按期间 & 地区算收入，用来做分母
 revenue_per_period_region as (
     select
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,
         year,
         month,
         month_name,
@@ -30,7 +30,7 @@ revenue_per_period_region as (
         sum(case when category = 'Revenue' then amount else 0 end) as revenue_amount
     from pl
     group by
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')),
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}),
         year,
         month,
         month_name,
@@ -43,7 +43,7 @@ revenue_per_period_region as (
 -- 再把 COGS + Opex 分解到类别
 costs as (
     select
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,
         year,
         month,
         month_name,
@@ -57,7 +57,7 @@ costs as (
     from pl
     where category in ('Cogs', 'Opex')
     group by
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')),
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}),
         year,
         month,
         month_name,
@@ -19,7 +19,7 @@ with pl as (
 
 agg as (
     select
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,
         year,
         month,
         month_name,
@@ -35,7 +35,7 @@ agg as (
 
     from pl
     group by
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')),
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}),
         year,
         month,
         month_name,
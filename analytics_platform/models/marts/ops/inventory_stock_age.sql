@@ -4,9 +4,9 @@ with inv as (
     -- 每天/每月底的库存快照
     select
         date_id,                  -- 快照日期
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,        
-        extract(year  from to_date(date_id::text, 'YYYYMMDD'))::int  as year,
-        extract(month from to_date(date_id::text, 'YYYYMMDD'))::int  as month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,        
+        extract(year  from {{ yyyymmdd_to_date('date_id') }})::int  as year,
+        extract(month from {{ yyyymmdd_to_date('date_id') }})::int  as month,
 
         --region_id,
         --country_code,
@@ -4,9 +4,9 @@
 with inv as (
     select
         date_id,      
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,        
-        extract(year  from to_date(date_id::text, 'YYYYMMDD'))::int  as year,
-        extract(month from to_date(date_id::text, 'YYYYMMDD'))::int  as month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,        
+        extract(year  from {{ yyyymmdd_to_date('date_id') }})::int  as year,
+        extract(month from {{ yyyymmdd_to_date('date_id') }})::int  as month,
 
         --region_id,
         --country_code,
@@ -42,9 +42,9 @@ avg_inv as (
 -- 每月 / 地区 COGS（金额为负时用绝对值）
 cogs as (
     select      
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')) as period_month,
-        extract(year  from to_date(date_id::text, 'YYYYMMDD'))::int  as year,
-        extract(month from to_date(date_id::text, 'YYYYMMDD'))::int  as month,
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}) as period_month,
+        extract(year  from {{ yyyymmdd_to_date('date_id') }})::int  as year,
+        extract(month from {{ yyyymmdd_to_date('date_id') }})::int  as month,
 
         --region_id,
         --country_code,
@@ -54,9 +54,9 @@ cogs as (
         sum(case when category = 'Cogs' then amount else 0 end) as cogs_amount
     from {{ ref('int_finance_pl_lines') }}
     group by
-        date_trunc('month', to_date(date_id::text, 'YYYYMMDD')),
-        extract(year  from to_date(date_id::text, 'YYYYMMDD')),
-        extract(month from to_date(date_id::text, 'YYYYMMDD')),
+        date_trunc('month', {{ yyyymmdd_to_date('date_id') }}),
+        extract(year  from {{ yyyymmdd_to_date('date_id') }}),
+        extract(month from {{ yyyymmdd_to_date('date_id') }}),
         --region_id,
         --country_code,
         country_name,
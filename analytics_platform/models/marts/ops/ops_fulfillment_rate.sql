@@ -6,9 +6,9 @@ with o as (
         order_line_number,
 
         order_date_id,
-        date_trunc('month', to_date(order_date_id::text, 'YYYYMMDD')) as period_month,        
-        extract(year  from to_date(order_date_id::text, 'YYYYMMDD'))::int  as year,
-        extract(month from to_date(order_date_id::text, 'YYYYMMDD'))::int  as month,
+        date_trunc('month', {{ yyyymmdd_to_date('order_date_id') }}) as period_month,        
+        extract(year  from {{ yyyymmdd_to_date('order_date_id') }})::int  as year,
+        extract(month from {{ yyyymmdd_to_date('order_date_id') }})::int  as month,
 
         region_id,
         country_code,
@@ -34,7 +34,7 @@ sales_m as (
         sum(shipped_qty)   as shipped_qty,
         sum(cancelled_qty) as cancelled_qty,
 
-        case when sum(order_count) = 0 then null else sum(otif_orders)::float / sum(order_count) end as otif_rate
+        case when sum(order_count) = 0 then null else sum(otif_orders)::double precision / sum(order_count) end as otif_rate
 
     from {{ ref('sales_daily_revenue') }}
     group by
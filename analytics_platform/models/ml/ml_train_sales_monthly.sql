@@ -19,9 +19,9 @@ with base_monthly as (
         sum(cancelled_qty)    as cancelled_qty,
 
         -- 服务类指标：用“加权”方式更合理（用订单数当权重）
-        case when sum(order_count) = 0 then null else sum(on_time_orders)::float / sum(order_count) end as on_time_rate,
-        case when sum(order_count) = 0 then null else sum(in_full_orders)::float / sum(order_count) end as in_full_rate,
-        case when sum(order_count) = 0 then null else sum(otif_orders)::float     / sum(order_count) end as otif_rate
+        case when sum(order_count) = 0 then null else sum(on_time_orders)::double precision / sum(order_count) end as on_time_rate,
+        case when sum(order_count) = 0 then null else sum(in_full_orders)::double precision / sum(order_count) end as in_full_rate,
+        case when sum(order_count) = 0 then null else sum(otif_orders)::double precision     / sum(order_count) end as otif_rate
 
     from {{ ref('sales_daily_revenue') }}
     group by
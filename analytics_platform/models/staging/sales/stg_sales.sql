@@ -19,12 +19,12 @@ select
         invoicelineno  as invoice_line_number,
 
         -- 数量 & 金额
-        quantity::numeric        as quantity,
-        listprice::numeric       as list_price,
-        discountamount::numeric  as discount_amount,
-        netsales::numeric        as net_sales,
-        cogs::numeric            as cogs,
-        grossmargin::numeric     as gross_margin,
+        quantity::{{ dbt.type_numeric() }}        as quantity,
+        listprice::{{ dbt.type_numeric() }}       as list_price,
+        discountamount::{{ dbt.type_numeric() }}  as discount_amount,
+        netsales::{{ dbt.type_numeric() }}        as net_sales,
+        cogs::{{ dbt.type_numeric() }}            as cogs,
+        grossmargin::{{ dbt.type_numeric() }}     as gross_margin,
 
         -- 货币
         currency        as currency
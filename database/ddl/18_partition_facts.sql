@@ -0,0 +1,171 @@
+-- 18_partition_facts.sql
+-- Purpose: Convert the date-driven fact tables to native RANGE partitioning
+--          with one partition per calendar month.
+--
+--   Partition key:
+--     - factorders                         -> orderdatekey
+--     - factsales, factinventory,
+--       factproduction, factfinancepl/bs/cf -> datekey
+--   (factsalestarget stays a plain table: ~100 rows a year.)
+--
+--   Bounds are integer DateKeys, e.g. factsales_p202512 holds
+--   FOR VALUES FROM (20251201) TO (20260101).
+--
+-- Run after 17_constraints_indexes.sql. Existing rows, sequences, FKs and
+-- indexes are carried over; primary keys become (id, partition key) because
+-- PostgreSQL requires the partition key in every unique constraint.
+--
+-- Views that read the facts are dropped by the conversion. Re-run
+-- 03_create_views.sql and `dbt run` afterwards.
+--
+-- Loading: database/etl loaders with --mode attach build a month in a
+-- standalone table and swap it in (etl_common/partitions.py). Retention:
+--   python database/etl/manage_partitions.py detach --before 20240101
+
+SET search_path TO analytics;
+
+------------------------------------------------------------
+-- 1. ensure_month_partitions: create missing monthly partitions
+--    covering [p_from_key, p_to_key] (inclusive DateKeys)
+------------------------------------------------------------
+CREATE OR REPLACE FUNCTION analytics.ensure_month_partitions(
+    p_parent   TEXT,
+    p_from_key INTEGER,
+    p_to_key   INTEGER
+) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    m       DATE := date_trunc('month', to_date(p_from_key::TEXT, 'YYYYMMDD'))::DATE;
+    last_m  DATE := date_trunc('month', to_date(p_to_key::TEXT, 'YYYYMMDD'))::DATE;
+    part    TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE m <= last_m LOOP
+        part := format('%s_p%s', p_parent, to_char(m, 'YYYYMM'));
+
+        -- Skip months that already have a partition (any name).
+        IF NOT EXISTS (
+            SELECT 1
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = format('analytics.%I', p_parent)::regclass
+              AND pg_get_expr(c.relpartbound, c.oid) =
+                  format('FOR VALUES FROM (%s) TO (%s)',
+                         to_char(m, 'YYYYMMDD'),
+                         to_char((m + INTERVAL '1 month')::DATE, 'YYYYMMDD'))
+        ) THEN
+            EXECUTE format(
+                'CREATE TABLE analytics.%I PARTITION OF analytics.%I FOR VALUES FROM (%s) TO (%s)',
+                part, p_parent,
+                to_char(m, 'YYYYMMDD'),
+                to_char((m + INTERVAL '1 month')::DATE, 'YYYYMMDD')
+            );
+            created := created + 1;
+        END IF;
+
+        m := (m + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+
+------------------------------------------------------------
+-- 2. convert_fact_to_partitioned: swap a heap fact for a
+--    partitioned one with the same columns, FKs and indexes
+------------------------------------------------------------
+CREATE OR REPLACE FUNCTION analytics.convert_fact_to_partitioned(
+    p_table  TEXT,
+    p_id_col TEXT,
+    p_key    TEXT
+) RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+    heap    TEXT := p_table || '_heap';
+    seq     TEXT;
+    con     RECORD;
+    idx     RECORD;
+    lo      INTEGER;
+    hi      INTEGER;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table
+               WHERE partrelid = format('analytics.%I', p_table)::regclass) THEN
+        RAISE NOTICE '% is already partitioned, skip.', p_table;
+        RETURN;
+    END IF;
+
+    seq := pg_get_serial_sequence(format('analytics.%I', p_table), p_id_col);
+
+    EXECUTE format('ALTER TABLE analytics.%I RENAME TO %I', p_table, heap);
+    -- Free the <table>_pkey name for the new composite key.
+    EXECUTE format('ALTER TABLE analytics.%I DROP CONSTRAINT IF EXISTS %I', heap, p_table || '_pkey');
+
+    EXECUTE format(
+        'CREATE TABLE analytics.%I (LIKE analytics.%I INCLUDING DEFAULTS) PARTITION BY RANGE (%I)',
+        p_table, heap, p_key
+    );
+    EXECUTE format('ALTER TABLE analytics.%I ADD PRIMARY KEY (%I, %I)', p_table, p_id_col, p_key);
+
+    -- Keep the id sequence alive when the heap is dropped.
+    IF seq IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY analytics.%I.%I', seq, p_table, p_id_col);
+    END IF;
+
+    -- Foreign keys (deduplicated: 02 declares them inline, 17 declares them again by name).
+    FOR con IN
+        SELECT DISTINCT ON (pg_get_constraintdef(c.oid)) c.conname, pg_get_constraintdef(c.oid) AS def
+        FROM pg_constraint c
+        WHERE c.conrelid = format('analytics.%I', heap)::regclass
+          AND c.contype = 'f'
+        ORDER BY pg_get_constraintdef(c.oid), (c.conname LIKE 'fk\_%') DESC, c.conname
+    LOOP
+        EXECUTE format('ALTER TABLE analytics.%I ADD CONSTRAINT %I %s', p_table, con.conname, con.def);
+    END LOOP;
+
+    -- Secondary indexes, re-created on the parent (cascades to partitions).
+    FOR idx IN
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        JOIN pg_index x ON x.indexrelid = format('analytics.%I', i.indexname)::regclass
+        WHERE i.schemaname = 'analytics'
+          AND i.tablename = heap
+          AND NOT x.indisprimary
+    LOOP
+        EXECUTE format('DROP INDEX analytics.%I', idx.indexname);
+        EXECUTE replace(idx.indexdef, format('analytics.%s ', heap), format('analytics.%s ', p_table));
+    END LOOP;
+
+    -- One partition per month of the date dimension (facts can't fall outside it).
+    SELECT MIN(datekey), MAX(datekey) INTO lo, hi FROM analytics.dimdate;
+    IF lo IS NOT NULL THEN
+        PERFORM analytics.ensure_month_partitions(p_table, lo, hi);
+    END IF;
+
+    EXECUTE format('INSERT INTO analytics.%I SELECT * FROM analytics.%I', p_table, heap);
+    EXECUTE format('DROP TABLE analytics.%I CASCADE', heap);
+END;
+$$;
+
+
+------------------------------------------------------------
+-- 3. Convert the facts
+------------------------------------------------------------
+BEGIN;
+
+DROP VIEW IF EXISTS analytics.vw_sales_daily;
+DROP VIEW IF EXISTS analytics.vw_finance_pl_monthly;
+DROP VIEW IF EXISTS analytics.vw_inventory_monthend;
+
+SELECT analytics.convert_fact_to_partitioned('factsales',      'salesid',      'datekey');
+SELECT analytics.convert_fact_to_partitioned('factorders',     'orderid',      'orderdatekey');
+SELECT analytics.convert_fact_to_partitioned('factinventory',  'inventoryid',  'datekey');
+SELECT analytics.convert_fact_to_partitioned('factproduction', 'productionid', 'datekey');
+SELECT analytics.convert_fact_to_partitioned('factfinancepl',  'financeplid',  'datekey');
+SELECT analytics.convert_fact_to_partitioned('factfinancebs',  'financebsid',  'datekey');
+SELECT analytics.convert_fact_to_partitioned('factfinancecf',  'financecfid',  'datekey');
+
+COMMIT;
+
+-- 检查分区
+-- SELECT inhparent::regclass, inhrelid::regclass, pg_get_expr(c.relpartbound, c.oid)
+-- FROM pg_inherits JOIN pg_class c ON c.oid = inhrelid ORDER BY 1, 2;
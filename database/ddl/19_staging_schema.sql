@@ -0,0 +1,20 @@
+-- 19_staging_schema.sql
+-- Purpose: Staging schema for the two-phase fact load.
+--
+--   Phase 1: loaders COPY each fact file into an UNLOGGED table
+--            analytics_staging.<fact> and validate it there (NOT NULL + FKs).
+--            Partitioned facts also build their replacement months here.
+--   Phase 2: a short publish right before COMMIT - DETACH / ATTACH PARTITION
+--            for partitioned facts (metadata-only), DELETE + INSERT otherwise.
+--
+-- BI / dbt never read half-loaded facts and are not blocked by the COPY.
+-- The loaders create the schema if it is missing; this file documents it and
+-- lets a DBA grant it up front.
+
+CREATE SCHEMA IF NOT EXISTS analytics_staging;
+
+COMMENT ON SCHEMA analytics_staging IS
+    'ETL work area: UNLOGGED fact stages and month tables waiting to be swapped into analytics.';
+
+-- Nothing here is read by BI users.
+REVOKE ALL ON SCHEMA analytics_staging FROM PUBLIC;
@@ -0,0 +1,26 @@
+-- 20_load_manifest.sql
+-- Purpose: Load manifest used by the ETL to skip unchanged input files.
+--
+--   One row per (target table, input file). A loader skips a file when the
+--   same path, size and SHA-256 were already loaded into the same table
+--   (see database/etl/etl_common/manifest.py); --force reloads anyway.
+--   Entries are written in the same transaction as the load.
+--
+-- The loaders create the table if it is missing.
+
+SET search_path TO analytics;
+
+CREATE TABLE IF NOT EXISTS analytics.etl_load_manifest (
+    target_table TEXT        NOT NULL,
+    file_path    TEXT        NOT NULL,   -- relative to database/, e.g. mock_data/csv/daily/20251221/factsales.csv
+    file_size    BIGINT      NOT NULL,
+    content_hash TEXT        NOT NULL,   -- SHA-256 hex
+    row_count    BIGINT,
+    load_mode    TEXT        NOT NULL,   -- full / partition / attach / bulk / upsert
+    loaded_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (target_table, file_path)
+);
+
+-- 最近加载
+-- SELECT target_table, file_path, row_count, load_mode, loaded_at
+-- FROM analytics.etl_load_manifest ORDER BY loaded_at DESC LIMIT 20;
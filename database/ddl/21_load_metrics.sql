@@ -0,0 +1,33 @@
+-- 21_load_metrics.sql
+-- Purpose: Per-run load metrics written by the ETL (etl_common/metrics.py).
+--
+--   One row per run, fact table and partition: rows streamed by the client
+--   and reported by COPY, bytes, COPY / stage / publish durations and COPY
+--   throughput. Used to spot throughput regressions against Neon.
+--
+-- The loaders create the table if it is missing.
+
+SET search_path TO analytics;
+
+CREATE TABLE IF NOT EXISTS analytics.etl_load_metrics (
+    metric_id       BIGSERIAL PRIMARY KEY,
+    run_id          TEXT        NOT NULL,   -- one per process, or $ETL_RUN_ID
+    target_table    TEXT        NOT NULL,
+    partition_key   TEXT,                   -- daily folder, e.g. 20251221
+    load_mode       TEXT        NOT NULL,
+    client_rows     BIGINT,
+    server_rows     BIGINT,
+    bytes           BIGINT,
+    copy_seconds    NUMERIC(12,3),
+    stage_seconds   NUMERIC(12,3),          -- COPY + validation + month builds
+    publish_seconds NUMERIC(12,3),
+    rows_per_sec    NUMERIC(14,1),          -- server_rows / copy_seconds
+    recorded_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_etl_load_metrics_table_time
+    ON analytics.etl_load_metrics (target_table, recorded_at);
+
+-- 吞吐趋势
+-- SELECT target_table, recorded_at::date, round(avg(rows_per_sec)) AS rows_per_sec
+-- FROM analytics.etl_load_metrics GROUP BY 1, 2 ORDER BY 1, 2;
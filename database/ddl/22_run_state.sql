@@ -0,0 +1,38 @@
+-- 22_run_state.sql
+-- Purpose: Run state used by run_all.py to resume failed runs (etl_common/runstate.py).
+--
+--   etl_run       : one row per pipeline run of a (run_date, mode), with its
+--                   status (running / failed / succeeded / abandoned) and the
+--                   number of attempts. A failed run is resumed by the next
+--                   run_all for the same run_date and mode (--restart abandons it).
+--   etl_run_state : one checkpoint per table committed by a run, written in the
+--                   same transaction as the table's data. A resumed run skips
+--                   the checkpointed tables.
+--
+-- The loaders create the tables if they are missing.
+
+SET search_path TO analytics;
+
+CREATE TABLE IF NOT EXISTS analytics.etl_run (
+    run_id      TEXT        PRIMARY KEY,    -- RUN_ID of the first attempt, or $ETL_RUN_ID
+    run_date    TEXT        NOT NULL,       -- daily folder, e.g. 20251221
+    load_mode   TEXT        NOT NULL,
+    status      TEXT        NOT NULL,
+    attempt     INT         NOT NULL DEFAULT 1,
+    started_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS analytics.etl_run_state (
+    run_id       TEXT        NOT NULL REFERENCES analytics.etl_run ON DELETE CASCADE,
+    step         TEXT        NOT NULL,      -- dimensions / sales / operations / finance
+    target_table TEXT        NOT NULL,
+    row_count    BIGINT,                    -- NULL when the file was unchanged and skipped
+    finished_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (run_id, target_table)
+);
+
+-- 未完成的运行
+-- SELECT r.run_id, r.run_date, r.load_mode, r.status, r.attempt, count(s.*) AS tables_done
+-- FROM analytics.etl_run r LEFT JOIN analytics.etl_run_state s USING (run_id)
+-- WHERE r.status <> 'succeeded' GROUP BY 1, 2, 3, 4, 5;
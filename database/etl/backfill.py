@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""
+Backfill every daily fact partition in a date range.
+
+Finds csv/daily/YYYYMMDD folders between START and END (inclusive) and
+loads them table by table:
+
+- Dimensions (and dimglaccount) are upserted once up front.
+- Each fact table is one stream holding one pooled connection
+  (etl_common.db) for every day; up to --workers streams run concurrently.
+- Within a stream, a reader thread resolves and validates
+  (etl_common.validate) the next partitions (up to --prefetch of them) while
+  the current one is COPYed. The COPY streams the file through its
+  transforms, so no partition is held in memory. A rejected day stops its
+  table's stream.
+- Every day is staged, published and committed on its own, so a failed
+  backfill keeps the finished days and can simply be re-run; days already
+  in the load manifest (etl_common.manifest) are skipped unless --force.
+
+Usage:
+  python database/etl/backfill.py 20250101 20250331
+  python database/etl/backfill.py 20250101 20250331 --workers 4 --mode attach
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import load_dimensions
+import load_finance
+import load_operations
+import load_sales
+from etl_common.db import connection
+from etl_common.facts import publish_fact, stage_fact
+from etl_common.keys import SURROGATE_KEYS
+from etl_common.manifest import fingerprint, is_loaded
+from etl_common.sources import find_source
+from etl_common.transform import open_transformed
+from etl_common.validate import DIMENSION_KEYS, PartitionRejected, load_rules, validate_file
+
+SCHEMA = "analytics"
+FACT_DAILY_ROOT = load_finance.FACT_DAILY_ROOT
+
+LOADERS = [load_sales, load_operations, load_finance]
+
+# Modes that replace only the partition's own date keys (full / bulk would
+# wipe the previous days on every iteration).
+BACKFILL_MODES = ("partition", "attach")
+
+_print_lock = threading.Lock()
+_DONE = object()
+
+
+def log(line: str, stream=sys.stdout):
+    with _print_lock:
+        print(line, file=stream, flush=True)
+
+
+def fact_specs() -> dict[str, tuple[list[str], dict]]:
+    """table -> (columns, transforms), collected from the domain loaders."""
+    specs = {}
+    for loader in LOADERS:
+        transforms = getattr(loader, "FACT_TRANSFORMS", {})
+        for t in loader.FACT_TABLES:
+            specs.setdefault(t, (loader.FACT_COLUMN_MAP[t], transforms))
+    return specs
+
+
+def find_partitions(start: str, end: str) -> list[Path]:
+    if not FACT_DAILY_ROOT.exists():
+        raise FileNotFoundError(f"Daily root not found: {FACT_DAILY_ROOT}")
+    days = [
+        d for d in FACT_DAILY_ROOT.iterdir()
+        if d.is_dir() and d.name.isdigit() and start <= d.name <= end
+    ]
+    return sorted(days, key=lambda d: d.name)
+
+
+class TableStream:
+    """Load one fact table for every day, prefetching the next partitions."""
+
+    def __init__(self, table_name: str, columns: list[str], transforms: dict, days: list[Path],
+                 mode: str, prefetch: int, cancelled: threading.Event, force: bool = False):
+        self.table_name = table_name
+        self.columns = columns
+        self.transforms = transforms
+        self.days = days
+        self.mode = mode
+        self.force = force
+        self.cancelled = cancelled
+        self.rules = None
+        self.ready: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+        self.rows = 0
+        self.days_loaded = 0
+        self.days_skipped = 0
+        self.parse_seconds = 0.0
+        self.load_seconds = 0.0
+
+    def _read_ahead(self):
+        try:
+            for day in self.days:
+                if self.cancelled.is_set():
+                    break
+                csv_path = find_source(day, self.table_name)
+                t0 = time.perf_counter()
+                fp = fingerprint(csv_path)
+                check = validate_file(csv_path, self.rules)
+                self.parse_seconds += time.perf_counter() - t0
+                self.ready.put((day, csv_path, fp, check))
+        except Exception as ex:
+            self.ready.put(ex)
+            return
+        self.ready.put(_DONE)
+
+    def run(self):
+        with connection() as conn:
+            cur = conn.cursor()
+            self.rules = load_rules(cur, SCHEMA, self.table_name, self.columns)
+            # Resolve natural codes up front: the loader holds a connection for the whole stream.
+            for day in self.days:
+                csv_path = find_source(day, self.table_name)
+                SURROGATE_KEYS.prepare(cur, SCHEMA, {self.table_name: (csv_path, self.columns)})
+        reader = threading.Thread(target=self._read_ahead, name=f"read-{self.table_name}", daemon=True)
+        reader.start()
+
+        try:
+            with connection() as conn:
+                self._load_all(conn)
+        except Exception:
+            self.cancelled.set()
+            raise
+        finally:
+            # Unblock the reader if it is waiting on a full queue.
+            while reader.is_alive():
+                try:
+                    self.ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def _load_all(self, conn):
+        cur = conn.cursor()
+        while True:
+            item = self.ready.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if self.cancelled.is_set():
+                break
+
+            day, csv_path, fp, check = item
+            if not self.force and is_loaded(cur, SCHEMA, self.table_name, fp, self.mode):
+                conn.rollback()
+                self.days_skipped += 1
+                log(f"   ⏭ {day.name} {self.table_name}: unchanged since last load, skipped")
+                continue
+            if not check.ok:
+                raise PartitionRejected([check])
+            if check.warnings:
+                log(f"   ⚠ {day.name} {check.summary().strip()}")
+
+            t0 = time.perf_counter()
+            try:
+                with open_transformed(csv_path, self.transforms, self.columns) as src:
+                    staged = stage_fact(
+                        cur, SCHEMA, self.table_name, self.columns, src, self.mode, fp, day.name
+                    )
+                replaced, inserted = publish_fact(cur, staged)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            elapsed = time.perf_counter() - t0
+
+            self.load_seconds += elapsed
+            self.rows += inserted
+            self.days_loaded += 1
+            log(f"   ✔ {day.name} {self.table_name}: {replaced} old rows -> {inserted} rows ({elapsed:.2f}s)")
+
+
+def load_dimensions_once(force: bool = False):
+    load_dimensions.main(["--force"] if force else [])
+    with connection() as conn:
+        load_finance.upsert_dim_glaccount(conn.cursor(), force)
+        conn.commit()
+    DIMENSION_KEYS.invalidate(*load_dimensions.DIM_TABLES, load_finance.DIM_TABLE)
+
+
+def report(streams: list[TableStream], wall: float):
+    log("\n📊 Backfill summary")
+    log(f"   {'table':<18} {'days':>5} {'skip':>5} {'rows':>12} {'parse s':>9} {'load s':>9} {'rows/s':>10}")
+    total_rows = 0
+    for s in streams:
+        rate = s.rows / s.load_seconds if s.load_seconds else 0.0
+        total_rows += s.rows
+        log(
+            f"   {s.table_name:<18} {s.days_loaded:>5} {s.days_skipped:>5} {s.rows:>12,} "
+            f"{s.parse_seconds:>9.2f} {s.load_seconds:>9.2f} {rate:>10,.0f}"
+        )
+    rate = total_rows / wall if wall else 0.0
+    log(f"   {'total (wall)':<18} {'':>5} {'':>5} {total_rows:>12,} {'':>9} {wall:>9.2f} {rate:>10,.0f}")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Backfill daily fact partitions in a date range.")
+    p.add_argument("start", help="First YYYYMMDD partition (inclusive)")
+    p.add_argument("end", help="Last YYYYMMDD partition (inclusive)")
+    p.add_argument("--workers", type=int, default=3, help="Fact tables loaded concurrently (default: 3)")
+    p.add_argument("--prefetch", type=int, default=2, help="Partitions parsed ahead per table (default: 2)")
+    p.add_argument("--mode", choices=BACKFILL_MODES, default="partition", help="Fact load mode per day")
+    p.add_argument("--skip-dimensions", action="store_true", help="Do not upsert the dimensions first")
+    p.add_argument("--force", action="store_true", help="Reload days the load manifest marks as unchanged")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    days = find_partitions(args.start, args.end)
+    if not days:
+        raise FileNotFoundError(f"No daily partitions between {args.start} and {args.end} under {FACT_DAILY_ROOT}")
+
+    print(f"📅 Backfilling {len(days)} partitions: {days[0].name} .. {days[-1].name}")
+    print(f"🧭 Mode     : {args.mode} (workers={args.workers}, prefetch={args.prefetch})")
+
+    start = time.perf_counter()
+    if not args.skip_dimensions:
+        load_dimensions_once(args.force)
+
+    cancelled = threading.Event()
+    streams = [
+        TableStream(t, columns, transforms, days, args.mode, args.prefetch, cancelled, args.force)
+        for t, (columns, transforms) in fact_specs().items()
+    ]
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(s.run): s for s in streams}
+        for fut, s in futures.items():
+            try:
+                fut.result()
+            except Exception as ex:
+                failed.append(s.table_name)
+                log(f"❌ {s.table_name} failed: {ex}", sys.stderr)
+
+    report(streams, time.perf_counter() - start)
+
+    if failed:
+        log(f"❌ Backfill failed for: {', '.join(failed)}. Finished days are committed; re-run to resume.", sys.stderr)
+        sys.exit(1)
+    print("✅ Backfill completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark --mode bulk against the default staged load (--mode full).
+
+For each size a synthetic CSV is generated for the fact with the
+vectorized, typed generator of bench_etl.py (FK columns draw from the
+dimension files, values respect the validation ranges), then loaded once
+per mode in its own transaction. Every run is ROLLED BACK, so the
+database is left as it was; the COMMIT / WAL flush is therefore not part
+of the timings.
+
+Usage:
+  python database/etl/bench_bulk_load.py
+  python database/etl/bench_bulk_load.py --table factsales --sizes 10000,100000,1000000,5000000
+
+The crossover is the smallest size at which bulk beats full. The existing
+rows of the table matter (bulk rebuilds indexes over everything it loads,
+full deletes the old rows), so run it against a realistically sized copy.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_etl import FACT_COLUMN_MAP, column_types, fact_dates, key_pools, write_fact
+from etl_common.db import connection
+from etl_common.facts import publish_fact, stage_fact
+from etl_common.sources import DATA_DIR
+
+SCHEMA = "analytics"
+
+MODES = ["full", "bulk"]
+
+
+def time_load(table_name: str, columns: list[str], csv_path: Path, mode: str) -> float:
+    with connection() as conn:
+        cur = conn.cursor()
+        t0 = time.perf_counter()
+        with csv_path.open("r", encoding="utf-8") as f:
+            staged = stage_fact(cur, SCHEMA, table_name, columns, f, mode)
+        publish_fact(cur, staged)
+        elapsed = time.perf_counter() - t0
+        conn.rollback()
+    return elapsed
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark bulk vs staged fact loading.")
+    p.add_argument(
+        "--table", choices=FACT_COLUMN_MAP, default="factinventory", help="Fact table to load (default: factinventory)"
+    )
+    p.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated row counts")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per mode and size; the best is kept")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    with connection() as conn:
+        cur = conn.cursor()
+        types = column_types(cur, args.table)
+        pools = key_pools(cur, DATA_DIR)
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.{args.table}")
+        existing = cur.fetchone()[0]
+    columns = FACT_COLUMN_MAP[args.table]
+    dates = fact_dates(pools)
+
+    print(f"⏱ {SCHEMA}.{args.table}: {existing:,} existing rows, modes {', '.join(MODES)}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            csv_path = Path(tmp) / f"{args.table}_{n}.csv"
+            write_fact(csv_path, args.table, types, pools[args.table], dates, n, np.random.default_rng([42, n]))
+            timings = {m: min(time_load(args.table, columns, csv_path, m) for _ in range(args.repeat)) for m in MODES}
+            results.append((n, timings))
+            print(
+                f"   {n:>12,} rows  "
+                + "  ".join(f"{m} {t:8.2f}s ({n / t:>10,.0f} rows/s)" for m, t in timings.items())
+            )
+
+    crossover = next((n for n, t in results if t["bulk"] < t["full"]), None)
+    if crossover is None:
+        print("📉 bulk was not faster at any tested size.")
+    else:
+        print(f"📈 bulk is faster from {crossover:,} rows (smallest tested size where it wins).")
+
+
+if __name__ == "__main__":
+    main()
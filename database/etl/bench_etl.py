@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+"""
+ETL throughput benchmark suite against a disposable local PostgreSQL.
+
+For every size, synthetic daily partitions are generated for all eight
+facts (FK columns draw from the dimension files, values respect the
+validation ranges), then each step runs as its own process exactly as in
+production: load_dimensions, load_sales, load_operations, load_finance and
+run_all (--force, so nothing is skipped). Per step the suite records wall
+time and peak RSS of the process, and per table the metrics the loaders
+write to analytics.etl_load_metrics (rows, COPY / stage / publish seconds,
+rows/s). Results go to one JSON file.
+
+The database is disposable:
+
+- default: a private cluster is created with initdb in a temporary
+  directory (``initdb`` / ``pg_ctl`` from $PATH or --pg-bin), started on a
+  Unix socket and removed at the end;
+- --admin-url: a scratch database is created on that local server
+  (``etl_bench_<id>``), the DDL from database/ddl applied, and dropped at
+  the end (--keep keeps it).
+
+Only local servers are accepted; never point this at Neon.
+
+Usage:
+  python database/etl/bench_etl.py
+  python database/etl/bench_etl.py --sizes 10000,1000000,50000000 --repeat 3
+  python database/etl/bench_etl.py --admin-url postgresql://postgres@localhost/postgres --mode partition
+  python database/etl/bench_etl.py --baseline etl_bench_20260101T020000.json --tolerance 0.15
+
+With --baseline, every table whose rows/s (or step whose wall time) is more
+than --tolerance worse than the baseline's at the same size is reported and
+the exit code is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import extensions
+
+import load_dimensions
+import load_finance
+import load_operations
+import load_sales
+from etl_common.facts import LOAD_MODES
+from etl_common.metrics import METRICS_TABLE
+from etl_common.sources import DATA_DIR, find_source
+from etl_common.staging import foreign_keys
+from etl_common.validate import NATURAL_KEYS, RANGES, read_partition
+
+SCHEMA = "analytics"
+
+ETL_DIR = Path(__file__).resolve().parent
+DDL_DIR = ETL_DIR.parent / "ddl"
+
+# Applied in this order to the disposable database.
+DDL_FILES = [
+    "01_create_dimensions.sql",
+    "02_create_facts.sql",
+    "17_constraints_indexes.sql",
+    "18_partition_facts.sql",
+    "19_staging_schema.sql",
+    "20_load_manifest.sql",
+    "21_load_metrics.sql",
+    "22_run_state.sql",
+]
+
+# step -> (script, fact tables it loads)
+STEPS = {
+    "dimensions": ("load_dimensions.py", []),
+    "sales": ("load_sales.py", load_sales.FACT_TABLES),
+    "operations": ("load_operations.py", load_operations.FACT_TABLES),
+    "finance": ("load_finance.py", load_finance.FACT_TABLES),
+    "run_all": ("run_all.py", load_sales.FACT_TABLES + load_operations.FACT_TABLES + load_finance.FACT_TABLES),
+}
+
+FACT_COLUMN_MAP = {**load_sales.FACT_COLUMN_MAP, **load_operations.FACT_COLUMN_MAP, **load_finance.FACT_COLUMN_MAP}
+
+# Partition folder the synthetic facts are written to.
+RUN_DATE = "20990101"
+
+# Rows generated and written per pandas frame.
+CHUNK_ROWS = 1_000_000
+
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+
+
+def is_local(dsn: str) -> bool:
+    host = extensions.parse_dsn(dsn).get("host", "")
+    return all(h.startswith("/") or h in LOCAL_HOSTS for h in host.split(","))
+
+
+# ---------------------------------------------------------------------------
+# Disposable database
+# ---------------------------------------------------------------------------
+
+def _free_port() -> int:
+    with closing(socket.socket()) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def private_cluster(pg_bin: str | None):
+    """A throwaway cluster (initdb + pg_ctl) listening on a Unix socket only."""
+    def tool(name: str) -> str:
+        path = shutil.which(name, path=pg_bin) if pg_bin else shutil.which(name)
+        if path is None:
+            raise SystemExit(f"{name} not found; put the PostgreSQL binaries on $PATH, pass --pg-bin or --admin-url")
+        return path
+
+    initdb, pg_ctl = tool("initdb"), tool("pg_ctl")
+    with tempfile.TemporaryDirectory(prefix="etl_pg_") as tmp:
+        data = Path(tmp) / "data"
+        port = _free_port()
+        subprocess.run(
+            [initdb, "-D", str(data), "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        subprocess.run(
+            [pg_ctl, "-D", str(data), "-l", str(Path(tmp) / "server.log"), "-w",
+             "-o", f"-k {tmp} -p {port} -c listen_addresses=''", "start"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        try:
+            yield extensions.make_dsn(host=tmp, port=port, user="postgres", dbname="postgres")
+        finally:
+            subprocess.run([pg_ctl, "-D", str(data), "-m", "immediate", "stop"], stdout=subprocess.DEVNULL)
+
+
+@contextmanager
+def _given(admin_dsn: str):
+    yield admin_dsn
+
+
+@contextmanager
+def scratch_database(admin_dsn: str, keep: bool = False):
+    """Create ``etl_bench_<id>`` with the warehouse DDL; drop it afterwards."""
+    name = f"etl_bench_{uuid.uuid4().hex[:8]}"
+    with closing(psycopg2.connect(admin_dsn)) as admin:
+        admin.autocommit = True
+        admin.cursor().execute(f"CREATE DATABASE {name}")
+    dsn = extensions.make_dsn(admin_dsn, dbname=name)
+    try:
+        with closing(psycopg2.connect(dsn)) as conn:
+            cur = conn.cursor()
+            for ddl in DDL_FILES:
+                cur.execute((DDL_DIR / ddl).read_text(encoding="utf-8"))
+            conn.commit()
+        yield dsn
+    finally:
+        if keep:
+            print(f"🗄  Kept database {name}")
+        else:
+            with closing(psycopg2.connect(admin_dsn)) as admin:
+                admin.autocommit = True
+                admin.cursor().execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic partitions
+# ---------------------------------------------------------------------------
+
+def copy_dimensions(src: Path, dst: Path):
+    for t in load_dimensions.DIM_TABLES + [load_finance.DIM_TABLE]:
+        path = find_source(src, t)
+        shutil.copy(path, dst / path.name)
+
+
+def key_pools(cur, data_dir: Path) -> dict[str, dict[str, np.ndarray]]:
+    """{table: {fk column: referenced keys}} read from the dimension files."""
+    pools = {}
+    for t in FACT_COLUMN_MAP:
+        pools[t] = {}
+        for _, col, ref_table, ref_col in foreign_keys(cur, SCHEMA, t):
+            ref = ref_table.rsplit(".", 1)[-1]
+            keys = read_partition(find_source(data_dir, ref), [ref_col])[ref_col].dropna().unique()
+            pools[t][col] = np.asarray(keys)
+    return pools
+
+
+def fact_dates(pools: dict) -> np.ndarray:
+    """ISO dates of the dimdate keys, for the facts' DATE columns."""
+    datekeys = pools["factsales"]["datekey"]
+    return pd.to_datetime(pd.Series(datekeys).astype(str), format="%Y%m%d").dt.strftime("%Y-%m-%d").to_numpy()
+
+
+def column_types(cur, table_name: str) -> dict[str, str]:
+    cur.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = %s AND table_name = %s",
+        (SCHEMA, table_name),
+    )
+    return dict(cur.fetchall())
+
+
+def _column(table_name, col, dtype, pool, dates, start, n, rng):
+    lo, hi = RANGES.get(table_name, {}).get(col, (None, None))
+    if pool is not None:
+        return rng.choice(pool, n)
+    if dtype in ("integer", "bigint", "smallint"):
+        return rng.integers(1 if lo is None else lo, 11 if hi is None else hi + 1, n)
+    if dtype in ("numeric", "double precision", "real"):
+        return np.round(rng.uniform(0 if lo is None else lo, 10_000 if hi is None else hi, n), 2)
+    if dtype == "boolean":
+        return rng.random(n) < 0.5
+    if dtype == "date":
+        return rng.choice(dates, n)
+    if col in NATURAL_KEYS.get(table_name, []):  # invoice / order numbers: unique per row
+        return pd.Series(np.arange(start, start + n)).astype(str).radd(f"B{table_name[4:7].upper()}")
+    return np.full(n, "USD")
+
+
+def write_fact(path: Path, table_name: str, types: dict[str, str], pools: dict, dates: np.ndarray,
+               rows: int, rng: np.random.Generator):
+    """Write ``rows`` synthetic rows in chunks, so memory stays flat at any size."""
+    columns = FACT_COLUMN_MAP[table_name]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        f.write(",".join(columns) + "\n")
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            df = pd.DataFrame(
+                {c: _column(table_name, c, types[c], pools.get(c), dates, start, n, rng) for c in columns}
+            )
+            df.to_csv(f, header=False, index=False)
+
+
+def write_partition(cur, data_dir: Path, rows: int, seed: int) -> float:
+    """Synthetic ``daily/RUN_DATE`` with ``rows`` rows per fact; returns seconds taken."""
+    t0 = time.perf_counter()
+    part = data_dir / "daily" / RUN_DATE
+    shutil.rmtree(part, ignore_errors=True)
+    part.mkdir(parents=True)
+
+    pools = key_pools(cur, data_dir)
+    dates = fact_dates(pools)
+    rng = np.random.default_rng([seed, rows])
+    for t in FACT_COLUMN_MAP:
+        write_fact(part / f"{t}.csv", t, column_types(cur, t), pools[t], dates, rows, rng)
+    return time.perf_counter() - t0
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def _peak_rss_mb(usage) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def run_step(step: str, dsn: str, data_dir: Path, mode: str, run_id: str, log_path: Path) -> dict:
+    script, _ = STEPS[step]
+    argv = [sys.executable, str(ETL_DIR / script), RUN_DATE, "--mode", mode, "--force"]
+    if step == "run_all":
+        argv.append("--restart")
+    env = {**os.environ, "NEON_CONN_STR": dsn, "ETL_DATA_DIR": str(data_dir), "ETL_RUN_ID": run_id}
+
+    with log_path.open("a", encoding="utf-8") as log:
+        log.write(f"\n==== {run_id}: {' '.join(argv[1:])}\n")
+        log.flush()
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=ETL_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} failed with exit code {proc.returncode}; see {log_path}")
+    return {"wall_seconds": round(wall, 3), "peak_rss_mb": round(_peak_rss_mb(usage), 1)}
+
+
+def table_metrics(cur, run_id: str) -> list[dict]:
+    cur.execute(
+        f"""
+        SELECT target_table, server_rows, bytes, copy_seconds, stage_seconds, publish_seconds, rows_per_sec
+        FROM {SCHEMA}.{METRICS_TABLE}
+        WHERE run_id = %s
+        ORDER BY metric_id
+        """,
+        (run_id,),
+    )
+    names = ["table", "rows", "bytes", "copy_seconds", "stage_seconds", "publish_seconds", "rows_per_sec"]
+    return [{k: (float(v) if k.endswith("seconds") or k == "rows_per_sec" else v) for k, v in zip(names, r)}
+            for r in cur.fetchall()]
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def environment(cur, args) -> dict:
+    cur.execute("SELECT version()")
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ETL_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "postgres": cur.fetchone()[0],
+        "mode": args.mode,
+        "sizes": [int(n) for n in args.sizes.split(",")],
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "settings": {k: v for k, v in os.environ.items() if k.startswith("ETL_")},
+    }
+
+
+def best_of(runs: list[dict]) -> dict:
+    """The fastest repetition (by wall time) of a step."""
+    return min(runs, key=lambda r: r["wall_seconds"])
+
+
+def regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    base = {(r["size"], r["step"]): r for r in baseline}
+    found = []
+    for r in results:
+        b = base.get((r["size"], r["step"]))
+        if b is None:
+            continue
+        if r["wall_seconds"] > b["wall_seconds"] * (1 + tolerance):
+            found.append(f"{r['step']} @ {r['size']:,}: wall {b['wall_seconds']:.2f}s -> {r['wall_seconds']:.2f}s")
+        base_tables = {t["table"]: t for t in b["tables"]}
+        for t in r["tables"]:
+            bt = base_tables.get(t["table"])
+            if bt and bt["rows_per_sec"] and t["rows_per_sec"] < bt["rows_per_sec"] * (1 - tolerance):
+                found.append(
+                    f"{r['step']}/{t['table']} @ {r['size']:,}: "
+                    f"{bt['rows_per_sec']:,.0f} -> {t['rows_per_sec']:,.0f} rows/s"
+                )
+    return found
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the ETL loaders against a disposable local PostgreSQL.")
+    p.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated rows per fact (e.g. up to 50000000)")
+    p.add_argument("--steps", default=",".join(STEPS), help=f"Comma-separated steps (default: {','.join(STEPS)})")
+    p.add_argument("--mode", choices=LOAD_MODES, default="partition", help="Load mode passed to the loaders")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per step and size; the fastest is kept")
+    p.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data")
+    p.add_argument("--admin-url", default=None, help="Local server to create the scratch database on (default: private initdb cluster)")
+    p.add_argument("--pg-bin", default=None, help="Directory with initdb / pg_ctl for the private cluster")
+    p.add_argument("--keep", action="store_true", help="Keep the scratch database (--admin-url only)")
+    p.add_argument("--dims-from", type=Path, default=DATA_DIR, help="Where to take the dimension files from")
+    p.add_argument("--out", type=Path, default=None, help="JSON results file (default: etl_bench_<timestamp>.json)")
+    p.add_argument("--baseline", type=Path, default=None, help="Earlier results to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs --baseline (default: 0.2)")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    steps = args.steps.split(",")
+    unknown = [s for s in steps if s not in STEPS]
+    if unknown:
+        raise SystemExit(f"Unknown steps: {', '.join(unknown)}")
+    if args.admin_url and not is_local(args.admin_url):
+        raise SystemExit("--admin-url must point at a local server (localhost or a Unix socket)")
+    out = args.out or Path(f"etl_bench_{datetime.now():%Y%m%dT%H%M%S}.json")
+    tag = uuid.uuid4().hex[:6]
+
+    server = private_cluster(args.pg_bin) if args.admin_url is None else _given(args.admin_url)
+    with server as admin_dsn, scratch_database(admin_dsn, args.keep) as dsn, \
+            tempfile.TemporaryDirectory(prefix="etl_bench_") as tmp, closing(psycopg2.connect(dsn)) as conn:
+        conn.autocommit = True
+        cur = conn.cursor()
+        data_dir = Path(tmp)
+        log_path = out.with_suffix(".log")
+        copy_dimensions(args.dims_from, data_dir)
+        report = {"environment": environment(cur, args), "results": []}
+        print(f"⏱ ETL benchmark: sizes {', '.join(f'{n:,}' for n in sizes)}, mode {args.mode}, log {log_path}")
+        # Every fact step needs the dimensions (and their month partitions) in place.
+        run_step("dimensions", dsn, data_dir, args.mode, f"bench-{tag}-setup", log_path)
+
+        for n in sizes:
+            gen = write_partition(cur, data_dir, n, args.seed)
+            print(f"\n📦 {n:,} rows per fact (generated in {gen:.1f}s)")
+            for step in steps:
+                runs = []
+                for rep in range(args.repeat):
+                    run_id = f"bench-{tag}-{n}-{step}-{rep}"
+                    result = run_step(step, dsn, data_dir, args.mode, run_id, log_path)
+                    result["tables"] = table_metrics(cur, run_id)
+                    runs.append(result)
+                best = {"size": n, "step": step, **best_of(runs)}
+                report["results"].append(best)
+                print(f"   {step:<11} {best['wall_seconds']:8.2f}s  peak RSS {best['peak_rss_mb']:8.1f} MB")
+                for t in best["tables"]:
+                    print(f"      {t['table']:<16} {t['rows']:>12,} rows  {t['rows_per_sec']:>12,.0f} rows/s  "
+                          f"stage {t['stage_seconds']:7.2f}s  publish {t['publish_seconds']:7.2f}s")
+
+    out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"\n💾 Results written to {out}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        found = regressions(report["results"], baseline, args.tolerance)
+        if found:
+            print(f"📉 Regressions vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in found:
+                print(f"   - {line}")
+            raise SystemExit(1)
+        print(f"📈 No regressions vs {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
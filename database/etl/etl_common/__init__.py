@@ -0,0 +1,6 @@
+"""
+Shared building blocks for the ETL loaders in database/etl.
+
+The loaders are run as scripts (python database/etl/load_*.py), which puts
+database/etl on sys.path, so they import this package as ``etl_common``.
+"""
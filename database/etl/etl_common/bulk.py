@@ -0,0 +1,138 @@
+"""
+Bulk-load fast path for large backfills (``--mode bulk``).
+
+Instead of COPYing against live constraints and indexes, a bulk load:
+
+1. drops the fact's PK, secondary indexes and FKs (definitions are kept),
+2. TRUNCATEs it and COPYs WITH (FREEZE) in the same transaction, so rows
+   are written already frozen and never need a hint-bit / anti-wraparound
+   rewrite (PostgreSQL refuses FREEZE on a partitioned parent; those are
+   COPYed normally),
+3. checks every FK with one set-based anti-join over the loaded rows,
+4. rebuilds the PK and indexes with parallel maintenance workers and puts
+   the FKs back.
+
+The table is ACCESS EXCLUSIVE locked from the TRUNCATE until COMMIT, so
+this is for maintenance windows, not for daytime loads.
+"""
+
+import os
+
+from etl_common.metrics import CopyStats, metered_copy
+from etl_common.staging import StageValidationError
+
+# Parallel workers per index build and memory for each build.
+INDEX_WORKERS = int(os.environ.get("ETL_INDEX_WORKERS", "4"))
+MAINTENANCE_WORK_MEM = os.environ.get("ETL_MAINTENANCE_WORK_MEM", "512MB")
+
+
+def capture_indexes(cur, schema: str, table_name: str) -> list[str]:
+    """Secondary index definitions (not backing a constraint), runnable on the parent."""
+    cur.execute(
+        """
+        SELECT pg_get_indexdef(x.indexrelid)
+        FROM pg_index x
+        WHERE x.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        ORDER BY x.indexrelid
+        """,
+        (f"{schema}.{table_name}",),
+    )
+    # A partitioned index prints as "ON ONLY parent"; rebuild it on every partition.
+    return [r[0].replace(" ON ONLY ", " ON ", 1) for r in cur.fetchall()]
+
+
+def capture_constraints(cur, schema: str, table_name: str, contypes: str) -> list[tuple[str, str]]:
+    """[(conname, definition), ...] of the table's own constraints of the given types ('p', 'f', ...)."""
+    cur.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = ANY(%s) AND conparentid = 0
+        ORDER BY contype DESC, conname
+        """,
+        (f"{schema}.{table_name}", list(contypes)),
+    )
+    return cur.fetchall()
+
+
+def drop_indexes_and_constraints(cur, schema: str, table_name: str) -> tuple[list[tuple[str, str]], list[str]]:
+    """Drop PK, FKs and secondary indexes; returns (constraints, index_defs) to restore."""
+    target = f"{schema}.{table_name}"
+    constraints = capture_constraints(cur, schema, table_name, "pf")
+    indexes = capture_indexes(cur, schema, table_name)
+
+    cur.execute(
+        """
+        SELECT x.indexrelid::regclass::text
+        FROM pg_index x
+        WHERE x.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        """,
+        (target,),
+    )
+    for (index_name,) in cur.fetchall():
+        cur.execute(f"DROP INDEX {index_name}")
+    for conname, _ in constraints:
+        cur.execute(f"ALTER TABLE {target} DROP CONSTRAINT {conname}")
+
+    return constraints, indexes
+
+
+def copy_freeze(cur, schema: str, table_name: str, columns: list[str], src, partitioned: bool) -> CopyStats:
+    """TRUNCATE + COPY (FREEZE where allowed) in the current transaction."""
+    target = f"{schema}.{table_name}"
+    col_list_sql = ", ".join(columns)
+    freeze = "" if partitioned else ", FREEZE true"
+
+    cur.execute(f"TRUNCATE {target} RESTART IDENTITY")
+    return metered_copy(
+        cur,
+        f"COPY {target} ({col_list_sql}) FROM STDIN WITH (FORMAT csv, HEADER true, NULL ''{freeze})",
+        src,
+    )
+
+
+def check_foreign_keys(cur, schema: str, table_name: str, fks: list[tuple[str, str, str, str]]):
+    """One pass over the fact, LEFT JOINed to every referenced dimension; raise on orphans."""
+    if not fks:
+        return
+    joins, counts = [], []
+    for i, (_, col, ref_table, ref_col) in enumerate(fks):
+        joins.append(f"LEFT JOIN {ref_table} r{i} ON r{i}.{ref_col} = f.{col}")
+        counts.append(f"COUNT(*) FILTER (WHERE f.{col} IS NOT NULL AND r{i}.{ref_col} IS NULL)")
+
+    cur.execute(f"SELECT {', '.join(counts)} FROM {schema}.{table_name} f {' '.join(joins)}")
+    orphans = cur.fetchone()
+
+    problems = [
+        f"{n} rows violate {conname} ({col} -> {ref_table})"
+        for n, (conname, col, ref_table, _) in zip(orphans, fks)
+        if n
+    ]
+    if problems:
+        raise StageValidationError(
+            f"Validation failed for {schema}.{table_name}:\n  - " + "\n  - ".join(problems)
+        )
+
+
+def rebuild_indexes_and_constraints(
+    cur, schema: str, table_name: str, constraints: list[tuple[str, str]], indexes: list[str]
+):
+    """Re-create PK and indexes (parallel builds), then the FKs, then ANALYZE."""
+    target = f"{schema}.{table_name}"
+    cur.execute("SELECT set_config('max_parallel_maintenance_workers', %s, true)", (str(INDEX_WORKERS),))
+    cur.execute("SELECT set_config('maintenance_work_mem', %s, true)", (MAINTENANCE_WORK_MEM,))
+
+    for conname, definition in constraints:
+        if definition.startswith("PRIMARY KEY"):
+            cur.execute(f"ALTER TABLE {target} ADD CONSTRAINT {conname} {definition}")
+    for indexdef in indexes:
+        cur.execute(indexdef)
+    # Orphans were ruled out by check_foreign_keys(); PostgreSQL's own check
+    # on ADD CONSTRAINT is a single anti-join per FK as well, not per row.
+    for conname, definition in constraints:
+        if definition.startswith("FOREIGN KEY"):
+            cur.execute(f"ALTER TABLE {target} ADD CONSTRAINT {conname} {definition}")
+
+    cur.execute(f"ANALYZE {target}")
@@ -0,0 +1,158 @@
+"""
+Shared PostgreSQL connection provider for the ETL.
+
+All loaders take their connections from one process-wide
+ThreadedConnectionPool: run_all.py / backfill.py reuse the pooled
+connections across loaders instead of opening (and authenticating) a new
+one per loader.
+
+Environment:
+  PGHOST, PGPORT (5432), PGDATABASE, PGUSER, PGPASSWORD
+  PGSSLMODE         sslmode (default: require)
+  NEON_CONN_STR     full connection string, overrides the PG* variables
+  ETL_POOL_SIZE     max pooled connections (default: 4); borrowers beyond
+                    that wait for a free connection
+  ETL_COPY_WORKERS  connections per parallel COPY of one file
+                    (etl_common.parallel_copy, default: 1 = no parallel COPY)
+  ETL_COPY_POOL_SIZE  size of the separate pool serving COPY connections
+                    (default: max(ETL_COPY_WORKERS, 3))
+
+Connections use TCP keepalives, so a long COPY through the Neon pooler is
+not cut by an idle NAT / load balancer, and a dead peer is noticed within
+about a minute instead of hanging.
+
+Usage:
+    with connection() as conn:
+        cur = conn.cursor()
+        ...
+        conn.commit()
+
+A connection is rolled back (if a transaction is still open) before it
+goes back to the pool; broken connections are discarded.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+POOL_SIZE = int(os.environ.get("ETL_POOL_SIZE", "4"))
+# Parallel COPY workers borrow from their own pool: a loader holding a main
+# connection must never wait for a worker slot taken by another loader's
+# main connection.
+COPY_WORKERS = int(os.environ.get("ETL_COPY_WORKERS", "1"))
+COPY_POOL_SIZE = int(os.environ.get("ETL_COPY_POOL_SIZE", str(max(COPY_WORKERS, 3))))
+
+CONNECT_KWARGS = {
+    "application_name": "etl",
+    "connect_timeout": 10,
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 5,
+}
+
+
+class EtlConnection(extensions.connection):
+    aborted = False
+
+    def commit(self):
+        if self.aborted:
+            self.rollback()
+            raise extensions.QueryCanceledError("ETL run cancelled; transaction rolled back")
+        super().commit()
+
+
+_pools: dict[str, ThreadedConnectionPool] = {}
+_pool_lock = threading.Lock()
+_in_use: set = set()
+# psycopg2's pool raises when exhausted; make borrowers wait instead.
+_slots = {
+    "main": threading.BoundedSemaphore(max(1, POOL_SIZE)),
+    "copy": threading.BoundedSemaphore(max(1, COPY_POOL_SIZE)),
+}
+
+
+def conn_str() -> str:
+    if os.environ.get("NEON_CONN_STR"):
+        return os.environ["NEON_CONN_STR"]
+    host = os.environ["PGHOST"]
+    port = os.environ.get("PGPORT", "5432")
+    db = os.environ["PGDATABASE"]
+    user = os.environ["PGUSER"]
+    pwd = os.environ["PGPASSWORD"]
+    sslmode = os.environ.get("PGSSLMODE", "require")
+    return f"postgresql://{user}:{pwd}@{host}:{port}/{db}?sslmode={sslmode}"
+
+
+def get_pool(name: str = "main") -> ThreadedConnectionPool:
+    with _pool_lock:
+        if name not in _pools:
+            size = POOL_SIZE if name == "main" else COPY_POOL_SIZE
+            _pools[name] = ThreadedConnectionPool(
+                1, max(1, size), conn_str(), connection_factory=EtlConnection, **CONNECT_KWARGS
+            )
+        return _pools[name]
+
+
+@contextmanager
+def connection(pool_name: str = "main"):
+    """Borrow a pooled connection (autocommit off) for the duration of the block."""
+    pool = get_pool(pool_name)
+    slots = _slots[pool_name]
+    slots.acquire()
+    try:
+        conn = pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    conn.autocommit = False
+    conn.aborted = False
+    with _pool_lock:
+        _in_use.add(conn)
+    broken = False
+    try:
+        yield conn
+    finally:
+        with _pool_lock:
+            _in_use.discard(conn)
+        if conn.closed:
+            broken = True
+        elif conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        pool.putconn(conn, close=broken)
+        slots.release()
+
+
+def copy_connection():
+    """Borrow a connection from the COPY pool (parallel / concurrent COPY workers)."""
+    return connection("copy")
+
+
+def cancel_all():
+    """
+    Abort every borrowed connection (used on pipeline failure): the running
+    statement is cancelled, and a later commit() rolls back and raises, so a
+    borrower caught between statements cannot publish either.
+    """
+    with _pool_lock:
+        conns = list(_in_use)
+    for conn in conns:
+        conn.aborted = True
+        try:
+            conn.cancel()
+        except psycopg2.Error:
+            pass
+
+
+def close_pool():
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
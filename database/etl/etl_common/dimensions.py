@@ -0,0 +1,213 @@
+"""
+Diff-based dimension sync.
+
+A dimension file is COPYed into a temp staging table and compared with the
+live table by natural key using a row hash (md5 over the non-key columns).
+Only the difference is written:
+
+- insert     : natural key not in the table yet
+- update     : natural key present, row hash differs
+- deactivate : active row whose natural key is missing from the file
+               (dimensions with an ``isactive`` column only; rows are never
+               deleted, facts keep referencing them)
+- adopt      : inferred member (negative key, see etl_common.keys) whose
+               code the file now brings: it takes the file's key and the
+               facts referencing it are repointed
+
+The diff is materialized once and applied with a single MERGE, so an
+unchanged dimension writes nothing and a reload never TRUNCATE ... CASCADEs
+into the facts. Surrogate keys come from the file on insert and are never
+changed on update; inferred members are placeholders, so they are never
+deactivated and only their key is replaced, once, on adoption.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from etl_common.keys import DIMENSIONS, SURROGATE_KEYS, inferred_lock
+from etl_common.sources import open_source
+
+SOFT_DELETE_COLUMN = "isactive"
+
+
+@dataclass
+class DimensionSync:
+    rows: int          # rows in the file
+    inserted: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    adopted: int = 0   # inferred members re-keyed to the file's key
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deactivated + self.adopted
+
+    def __str__(self) -> str:
+        adopted = f"{self.adopted} adopted, " if self.adopted else ""
+        return (
+            f"{self.rows} rows: {self.inserted} inserted, {self.updated} updated, {adopted}"
+            f"{self.deactivated} deactivated, {self.rows - self.inserted - self.updated - self.adopted} unchanged"
+        )
+
+
+def referencing_columns(cur, target: str) -> list[tuple[str, str]]:
+    """[(table, column), ...] with a single-column FK to ``target`` (partitioned parents, not partitions)."""
+    cur.execute(
+        """
+        SELECT c.conrelid::regclass::text, a.attname
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.confrelid = to_regclass(%s)
+          AND c.contype = 'f'
+          AND c.conparentid = 0
+          AND array_length(c.conkey, 1) = 1
+        ORDER BY 1, 2
+        """,
+        (target,),
+    )
+    return cur.fetchall()
+
+
+def adopt_inferred(cur, target: str, key: str, code: str, columns: list[str], tmp_table: str) -> int:
+    """
+    Re-key the inferred members of ``target`` whose code is in ``tmp_table``:
+    insert the file's row, repoint the referencing facts from the negative
+    key to the file's key, then delete the placeholder. Returns the members
+    adopted.
+    """
+    adopt_table = f"{tmp_table}_adopt"
+    # Serializes with etl_common.keys inferring members of the same dimension.
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (inferred_lock(target),))
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE {adopt_table} ON COMMIT DROP AS
+        SELECT t.{key} AS old_key, s.{key} AS new_key, s.{code} AS code
+        FROM {target} t
+        JOIN {tmp_table} s ON t.{code} = s.{code}
+        WHERE t.{key} < 0
+        """
+    )
+    adopted = cur.rowcount
+    if adopted:
+        col_list_sql = ", ".join(columns)
+        cur.execute(
+            f"""
+            INSERT INTO {target} ({col_list_sql})
+            SELECT {col_list_sql} FROM {tmp_table}
+            WHERE {key} IN (SELECT new_key FROM {adopt_table})
+            """
+        )
+        for table, column in referencing_columns(cur, target):
+            cur.execute(
+                f"""
+                UPDATE {table} f SET {column} = m.new_key
+                FROM {adopt_table} m
+                WHERE f.{column} = m.old_key
+                """
+            )
+        cur.execute(f"DELETE FROM {target} WHERE {key} IN (SELECT old_key FROM {adopt_table})")
+        cur.execute(f"SELECT code FROM {adopt_table}")
+        SURROGATE_KEYS.forget(key, [r[0] for r in cur.fetchall()])
+    cur.execute(f"DROP TABLE {adopt_table}")
+    return adopted
+
+
+def sync_dimension(
+    cur,
+    schema: str,
+    table_name: str,
+    key: str,
+    natural_key: list[str],
+    columns: list[str],
+    csv_path: Path,
+) -> DimensionSync:
+    """Apply the difference between ``csv_path`` and ``schema.table_name``."""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV not found for dim table: {csv_path}")
+
+    target = f"{schema}.{table_name}"
+    col_list_sql = ", ".join(columns)
+    tmp_table = f"tmp_{table_name}"
+    diff_table = f"tmp_{table_name}_diff"
+    compared = [c for c in columns if c != key and c not in natural_key]
+    on_sql = " AND ".join(f"t.{c} = s.{c}" for c in natural_key)
+
+    def row_hash(alias: str) -> str:
+        return f"md5(ROW({', '.join(f'{alias}.{c}' for c in compared)})::text)"
+
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE {tmp_table}
+        (LIKE {target} INCLUDING DEFAULTS)
+        ON COMMIT DROP
+        """
+    )
+    with open_source(csv_path) as f:
+        cur.copy_expert(
+            f"COPY {tmp_table} ({col_list_sql}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+            f,
+        )
+    result = DimensionSync(cur.rowcount)
+
+    dim = DIMENSIONS.get(key)
+    if dim is not None and natural_key == [dim.code]:
+        result.adopted = adopt_inferred(cur, target, key, dim.code, columns, tmp_table)
+
+    deactivate_sql = ""
+    if SOFT_DELETE_COLUMN in columns:
+        # Inferred members (negative keys) are never in the file; leave them active.
+        deactivate_sql = f"""
+        UNION ALL
+        SELECT {', '.join(f't.{c}' for c in columns)}, 'deactivate'
+        FROM {target} t
+        WHERE t.{SOFT_DELETE_COLUMN}
+          AND t.{key} >= 0
+          AND NOT EXISTS (SELECT 1 FROM {tmp_table} s WHERE {on_sql})
+        """
+
+    cur.execute(
+        f"""
+        CREATE TEMP TABLE {diff_table} ON COMMIT DROP AS
+        SELECT {', '.join(f's.{c}' for c in columns)},
+               CASE WHEN t.{key} IS NULL THEN 'insert' ELSE 'update' END AS action
+        FROM {tmp_table} s
+        LEFT JOIN {target} t ON {on_sql}
+        WHERE t.{key} IS NULL OR {row_hash('t')} <> {row_hash('s')}
+        {deactivate_sql}
+        """
+    )
+    cur.execute(f"SELECT action, COUNT(*) FROM {diff_table} GROUP BY action")
+    counts = dict(cur.fetchall())
+    result.inserted = counts.get("insert", 0)
+    result.updated = counts.get("update", 0)
+    result.deactivated = counts.get("deactivate", 0)
+
+    if result.changed:
+        update_sql = ", ".join(f"{c} = s.{c}" for c in compared)
+        deactivate_when = ""
+        if deactivate_sql:
+            deactivate_when = f"""
+            WHEN MATCHED AND s.action = 'deactivate' THEN
+                UPDATE SET {SOFT_DELETE_COLUMN} = false"""
+        cur.execute(
+            f"""
+            MERGE INTO {target} t
+            USING {diff_table} s ON {on_sql}{deactivate_when}
+            WHEN MATCHED THEN
+                UPDATE SET {update_sql}
+            WHEN NOT MATCHED THEN
+                INSERT ({col_list_sql}) VALUES ({', '.join(f's.{c}' for c in columns)})
+            """
+        )
+
+    # Keys come from the CSV, so keep BIGSERIAL sequences ahead of them.
+    if result.inserted or result.adopted:
+        cur.execute(
+            f"""
+            SELECT setval(seq::regclass, (SELECT MAX({key}) FROM {target}))
+            FROM pg_get_serial_sequence('{target}', '{key}') AS seq
+            WHERE seq IS NOT NULL
+            """
+        )
+    cur.execute(f"DROP TABLE {diff_table}, {tmp_table}")
+    return result
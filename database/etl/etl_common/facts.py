@@ -0,0 +1,265 @@
+"""
+Two-phase fact loading shared by the domain loaders.
+
+Phase 1 - stage_fact(): COPY the file into an UNLOGGED table in
+analytics_staging, validate it there, and (for partitioned facts) build the
+replacement month tables. Only ACCESS SHARE is taken on live tables.
+
+Phase 2 - publish_fact(): make the staged data live. Loaders stage every
+table of a domain first and publish them together right before COMMIT, so
+locks on ``analytics`` facts are held for the publish step only.
+
+Load modes:
+- full      : the table ends up holding exactly the file's rows
+- partition : replace only the date keys present in the file (DELETE + INSERT)
+- attach    : replace only the file's date keys by swapping in rebuilt months
+- bulk      : backfill fast path; the table is truncated and reloaded with
+              indexes / FKs dropped and rebuilt afterwards (etl_common.bulk)
+
+How publishing works:
+- Natively partitioned facts (ddl/18_partition_facts.sql) in full / attach
+  mode: DETACH / ATTACH PARTITION per month. Indexes, FKs and the bound CHECK
+  are prepared in phase 1, so this is metadata-only (milliseconds).
+- Everything else: DELETE + INSERT from the stage in one statement pair.
+  That takes row locks only, so readers are never blocked and never see a
+  half-loaded table.
+
+Limitation: full mode on a table that is not partitioned is that same
+DELETE of every row + INSERT, not a swap. It rewrites the whole table
+and leaves one dead tuple per old row for autovacuum, so its cost grows
+with the table, not with the change. Partition large facts
+(ddl/18_partition_facts.sql) to get the metadata-only swap instead.
+
+Re-running the same partition is idempotent in every mode. Bulk mode is
+the exception to the lock rules above: it holds ACCESS EXCLUSIVE from the
+TRUNCATE in phase 1 until COMMIT.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+
+from etl_common.bulk import (
+    check_foreign_keys,
+    copy_freeze,
+    drop_indexes_and_constraints,
+    rebuild_indexes_and_constraints,
+)
+from etl_common.manifest import Fingerprint, record_load
+from etl_common.metrics import CopyStats, record_metrics
+from etl_common.parallel_copy import copy_into_stage
+from etl_common.partitions import (
+    build_month,
+    date_column,
+    is_partitioned,
+    list_partitions,
+    month_bounds,
+    swap_month,
+)
+from etl_common.staging import STAGING_SCHEMA, foreign_keys, validate_stage
+
+LOAD_MODES = ("full", "partition", "attach", "bulk")
+
+# Max wait for the publish locks; fail fast instead of queueing BI queries behind us.
+LOCK_TIMEOUT = os.environ.get("ETL_LOCK_TIMEOUT", "10s")
+
+
+@dataclass
+class StagedFact:
+    schema: str
+    table_name: str
+    columns: list[str]
+    mode: str
+    stage: str
+    rows: int = 0
+    # (new_table, old_partition, lo, hi) per month when publishing by exchange
+    months: list[tuple[str, str | None, int, int]] = field(default_factory=list)
+    replaced: int = 0
+    inserted: int = 0
+    # source file, recorded in the load manifest when published
+    fingerprint: Fingerprint | None = None
+    # metrics (etl_common.metrics), recorded when published
+    partition: str | None = None
+    copy: CopyStats | None = None
+    stage_seconds: float = 0.0
+    # bulk mode: what was dropped before the COPY and must be restored
+    foreign_keys: list[tuple[str, str, str, str]] = field(default_factory=list)
+    constraints: list[tuple[str, str]] = field(default_factory=list)
+    indexes: list[str] = field(default_factory=list)
+
+
+# Adding / dropping FKs locks the referenced dimensions (up to ACCESS EXCLUSIVE
+# when an old month is dropped). Two loads doing that concurrently deadlock,
+# so such transactions queue on this lock before they read any dimension.
+# It is taken after the per-table locks and after the COPY into the stage,
+# which touches no dimension, so concurrent loads still COPY in parallel.
+FK_DDL_LOCK = "etl:fk_ddl"
+
+
+def _lock(cur, target: str):
+    # Serialize concurrent reloads of the same table without blocking readers.
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (target,))
+
+
+def _needs_fk_ddl_lock(cur, schema: str, table_name: str, mode: str) -> bool:
+    return mode == "bulk" or (mode in ("full", "attach") and is_partitioned(cur, schema, table_name))
+
+
+def lock_tables(cur, schema: str, table_names: list[str]):
+    """
+    Take up front, in a fixed order, the per-table locks stage_fact() would
+    take. Needed before anything else touches the tables' stages in a
+    transaction that stages several facts.
+    """
+    for t in sorted(table_names):
+        _lock(cur, f"{schema}.{t}")
+
+
+def lock_fk_ddl(cur, schema: str, table_names: list[str], mode: str):
+    """
+    Take FK_DDL_LOCK if staging any of ``table_names`` in ``mode`` adds or
+    drops FKs. Call it before the transaction's first statement that locks a
+    dimension (a dimension sync, validate_stage(), build_month()).
+    """
+    if any(_needs_fk_ddl_lock(cur, schema, t, mode) for t in table_names):
+        _lock(cur, FK_DDL_LOCK)
+
+
+def stage_fact(
+    cur,
+    schema: str,
+    table_name: str,
+    columns: list[str],
+    src,
+    mode: str,
+    fingerprint: Fingerprint | None = None,
+    partition: str | None = None,
+    copied: tuple[str, CopyStats] | None = None,
+) -> StagedFact:
+    """
+    Phase 1: COPY ``src`` into the staging schema, validate, prepare months.
+
+    With ``fingerprint`` the source file is recorded in the load manifest
+    (etl_common.manifest) when the fact is published; COPY metrics are
+    recorded per ``partition`` (etl_common.metrics). ``copied`` is a
+    (stage, stats) already filled by copy_stages_concurrently(); ``src`` is
+    then ignored.
+    """
+    t0 = time.perf_counter()
+    staged = _stage(cur, schema, table_name, columns, src, mode, copied)
+    staged.stage_seconds = time.perf_counter() - t0
+    staged.fingerprint = fingerprint
+    staged.partition = partition
+    return staged
+
+
+def _stage(
+    cur, schema: str, table_name: str, columns: list[str], src, mode: str, copied: tuple[str, CopyStats] | None
+) -> StagedFact:
+    exchange = mode in ("full", "attach") and is_partitioned(cur, schema, table_name)
+    _lock(cur, f"{schema}.{table_name}")
+
+    if mode == "bulk":
+        lock_fk_ddl(cur, schema, [table_name], mode)
+        return _bulk_stage(cur, schema, table_name, columns, src)
+
+    if copied is not None:
+        stage, stats = copied
+    else:
+        # Large files are COPYed over several connections (etl_common.parallel_copy).
+        stage, stats = copy_into_stage(cur, schema, table_name, columns, src)
+    staged = StagedFact(schema, table_name, columns, mode, stage, rows=stats.server_rows, copy=stats)
+    cur.execute(f"ANALYZE {stage}")
+
+    # Validation reads the dimensions and build_month() adds FKs to them.
+    lock_fk_ddl(cur, schema, [table_name], mode)
+    validate_stage(cur, schema, table_name, columns, stage)
+
+    if exchange:
+        datecol = date_column(table_name)
+        cur.execute(f"SELECT DISTINCT {datecol} / 100 * 100 + 1 FROM {stage}")
+        bounds = {month_bounds(r[0]) for r in cur.fetchall()}
+        if mode == "full":
+            # Months not in the file are swapped for empty ones.
+            bounds |= {(lo, hi) for _, lo, hi in list_partitions(cur, schema, table_name)}
+
+        for lo, hi in sorted(bounds):
+            new, old, replaced, inserted = build_month(
+                cur, schema, table_name, columns, stage, STAGING_SCHEMA, lo, hi,
+                keep_other_days=(mode == "attach"),
+            )
+            staged.months.append((new, old, lo, hi))
+            staged.replaced += replaced
+            staged.inserted += inserted
+
+    return staged
+
+
+def _bulk_stage(cur, schema: str, table_name: str, columns: list[str], src) -> StagedFact:
+    target = f"{schema}.{table_name}"
+    staged = StagedFact(schema, table_name, columns, "bulk", target)
+    cur.execute(f"SELECT COUNT(*) FROM {target}")
+    staged.replaced = cur.fetchone()[0]
+
+    staged.foreign_keys = foreign_keys(cur, schema, table_name)
+    staged.constraints, staged.indexes = drop_indexes_and_constraints(cur, schema, table_name)
+    staged.copy = copy_freeze(cur, schema, table_name, columns, src, is_partitioned(cur, schema, table_name))
+    staged.rows = staged.inserted = staged.copy.server_rows
+    return staged
+
+
+def _bulk_publish(cur, staged: StagedFact) -> tuple[int, int]:
+    check_foreign_keys(cur, staged.schema, staged.table_name, staged.foreign_keys)
+    rebuild_indexes_and_constraints(cur, staged.schema, staged.table_name, staged.constraints, staged.indexes)
+    return staged.replaced, staged.inserted
+
+
+def publish_fact(cur, staged: StagedFact) -> tuple[int, int]:
+    """Phase 2: make ``staged`` live. Returns (rows_replaced, rows_inserted)."""
+    t0 = time.perf_counter()
+    replaced, inserted = _publish(cur, staged)
+    publish_seconds = time.perf_counter() - t0
+
+    if staged.fingerprint is not None:
+        record_load(cur, staged.schema, staged.table_name, staged.fingerprint, staged.rows, staged.mode)
+    if staged.copy is not None:
+        record_metrics(
+            cur, staged.schema, staged.table_name, staged.partition, staged.mode,
+            staged.copy, staged.stage_seconds, publish_seconds,
+        )
+    return replaced, inserted
+
+
+def _publish(cur, staged: StagedFact) -> tuple[int, int]:
+    target = f"{staged.schema}.{staged.table_name}"
+    col_list_sql = ", ".join(staged.columns)
+
+    if staged.mode == "bulk":
+        return _bulk_publish(cur, staged)
+
+    cur.execute("SELECT set_config('lock_timeout', %s, true)", (LOCK_TIMEOUT,))
+
+    if staged.months:
+        for new, old, lo, hi in staged.months:
+            swap_month(cur, staged.schema, staged.table_name, new, old, lo, hi)
+
+    else:
+        if staged.mode == "full":
+            # Not a swap: every old row becomes a dead tuple (see module docstring).
+            cur.execute(f"DELETE FROM {target}")
+        else:
+            datecol = date_column(staged.table_name)
+            cur.execute(
+                f"""
+                DELETE FROM {target} t
+                USING (SELECT DISTINCT {datecol} FROM {staged.stage}) s
+                WHERE t.{datecol} = s.{datecol}
+                """
+            )
+        staged.replaced = cur.rowcount
+
+        cur.execute(f"INSERT INTO {target} ({col_list_sql}) SELECT {col_list_sql} FROM {staged.stage}")
+        staged.inserted = cur.rowcount
+
+    cur.execute(f"DROP TABLE {staged.stage}")
+    return staged.replaced, staged.inserted
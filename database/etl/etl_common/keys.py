@@ -0,0 +1,325 @@
+"""
+Natural-key -> surrogate-key resolution for fact files.
+
+Upstream extracts may carry natural codes instead of surrogate keys:
+
+    customercode  -> customerkey  (dimcustomer)
+    productcode   -> productkey   (dimproduct)
+    warehousecode -> warehousekey (dimwarehouse)
+    glaccountcode -> glaccountkey (dimglaccount)
+
+A fact file may use either column; when the key column is missing and the
+code column is there, the code is resolved. ``open_source()`` then yields
+CSV with the key columns, chunk by chunk, so COPY, the transforms and the
+pre-load validation see the same layout as before.
+
+``SURROGATE_KEYS`` holds one index per dimension: a unique ``pd.Index`` of
+codes and a parallel array of keys, read once from the table. Resolving a
+column is a single ``get_indexer`` + ``take`` over the whole chunk.
+
+Codes that are in neither the table nor a dimension file synced by the same
+load (``add_file()``) become inferred members: ``prepare()`` inserts them in
+one statement per dimension, with placeholder attributes, and commits them
+on the caller's connection before the load starts. Inferred members get
+negative keys, so they never collide with the keys the dimension files
+assign; a later dimension sync matches them by code and fills in the real
+attributes. Concurrent loaders serialize on an advisory lock per dimension,
+so a code is inferred only once.
+
+When a dimension file later brings an inferred code, the sync adopts the
+file's key (etl_common.dimensions): the member is re-keyed and the facts
+referencing it are repointed, under the same advisory lock. Until then the
+file's key already wins over the placeholder when resolving.
+
+The cache is shared by the loaders of a process (run_all.py / backfill.py)
+and never cleared: a code keeps its key for good, except an adopted
+inferred member, whose code is dropped from the index (``forget()``) and
+read again by the next ``prepare()``.
+"""
+
+import io
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from etl_common.streams import BlockStream
+
+# Rows resolved per block when streaming a file.
+RESOLVE_CHUNK_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class Dimension:
+    table_name: str
+    key: str
+    code: str
+    # NOT NULL attributes of an inferred member; "{code}" is replaced by the code
+    inferred: tuple[tuple[str, str], ...]
+
+
+DIMENSIONS = {
+    d.key: d
+    for d in [
+        Dimension("dimcustomer", "customerkey", "customercode", (("customername", "Inferred customer {code}"),)),
+        Dimension("dimproduct", "productkey", "productcode", (("productname", "Inferred product {code}"),)),
+        Dimension("dimwarehouse", "warehousekey", "warehousecode", (("warehousename", "Inferred warehouse {code}"),)),
+        Dimension(
+            "dimglaccount",
+            "glaccountkey",
+            "glaccountcode",
+            (("glaccountname", "Inferred account {code}"), ("statementtype", "NA")),
+        ),
+    ]
+}
+
+
+class UnresolvedCodes(KeyError):
+    pass
+
+
+def file_columns(path: Path) -> list[str]:
+    """Column names of a CSV (plain / compressed) or Parquet file, lower-cased."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(path).names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return [c.lower() for c in names]
+
+
+def code_columns(path: Path, columns: list[str]) -> dict[str, str]:
+    """{key column: code column} for the wanted key columns that ``path`` carries as codes."""
+    if not any(c in DIMENSIONS for c in columns):
+        return {}
+    header = set(file_columns(path))
+    return {
+        c: DIMENSIONS[c].code
+        for c in columns
+        if c in DIMENSIONS and c not in header and DIMENSIONS[c].code in header
+    }
+
+
+def _read_codes(path: Path, code_cols: list[str]) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+        df.columns = [c.lower() for c in df.columns]
+        return df[code_cols].astype("string")
+    return pd.read_csv(path, usecols=code_cols, dtype="string", keep_default_na=False)
+
+
+def _as_codes(values: pd.Series) -> pd.Series:
+    codes = values.astype("string")
+    return codes.mask(codes == "")
+
+
+def inferred_lock(target: str) -> str:
+    """Advisory lock serializing inferring and adopting members of ``target``."""
+    return f"etl:inferred:{target}"
+
+
+class SurrogateKeyCache:
+    """Thread-safe code -> key indexes, one per dimension."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: dict[str, tuple[pd.Index, np.ndarray]] = {}
+        self._files: dict[str, tuple[pd.Index, np.ndarray]] = {}
+        self._merged: dict[str, tuple[pd.Index, np.ndarray]] = {}
+
+    @staticmethod
+    def _index(codes, keys) -> tuple[pd.Index, np.ndarray]:
+        # Lowest key wins when a code is duplicated (ddl/16_clean_dimensions.sql keeps that one).
+        frame = pd.DataFrame({"code": pd.array(codes, dtype="string"), "key": np.asarray(keys, dtype="int64")})
+        frame = frame.dropna().sort_values("key").drop_duplicates("code")
+        return pd.Index(frame["code"]), frame["key"].to_numpy()
+
+    def _load(self, cur, schema: str, dim: Dimension):
+        if dim.key in self._tables:
+            return
+        cur.execute(f"SELECT {dim.code}, {dim.key} FROM {schema}.{dim.table_name}")
+        rows = cur.fetchall()
+        index = self._index([r[0] for r in rows], [r[1] for r in rows])
+        with self._lock:
+            self._tables[dim.key] = index
+            self._merged.pop(dim.key, None)
+
+    def _lookup_index(self, key_col: str) -> tuple[pd.Index, np.ndarray]:
+        with self._lock:
+            merged = self._merged.get(key_col)
+            if merged is not None:
+                return merged
+            if key_col not in self._tables:
+                raise UnresolvedCodes(f"No key index for {key_col}; call SURROGATE_KEYS.prepare() first")
+            codes, keys = self._tables[key_col]
+            extra = self._files.get(key_col)
+            if extra is not None:
+                # Table rows win, except inferred members (negative keys) the
+                # file brings: the sync adopts the file's key for those.
+                adopted = (keys < 0) & codes.isin(extra[0])
+                codes, keys = codes[~adopted], keys[~adopted]
+                new = ~extra[0].isin(codes)
+                codes, keys = codes.append(extra[0][new]), np.concatenate([keys, extra[1][new]])
+            self._merged[key_col] = (codes, keys)
+            return codes, keys
+
+    def add_file(self, table_name: str, path: Path):
+        """Also resolve against a dimension file that is synced in the same load."""
+        dim = next((d for d in DIMENSIONS.values() if d.table_name == table_name), None)
+        if dim is None:  # no natural code to resolve
+            return
+        if path.suffix == ".parquet":
+            df = pd.read_parquet(path)
+            df.columns = [c.lower() for c in df.columns]
+        else:
+            df = pd.read_csv(path, usecols=[dim.code, dim.key], dtype={dim.code: "string"})
+        index = self._index(df[dim.code], df[dim.key])
+        with self._lock:
+            self._files[dim.key] = index
+            self._merged.pop(dim.key, None)
+
+    def forget(self, key_col: str, codes):
+        """Drop ``codes`` from the table index (their key changed); the next prepare() reads them again."""
+        with self._lock:
+            if key_col in self._tables:
+                table_codes, keys = self._tables[key_col]
+                keep = ~table_codes.isin(list(codes))
+                self._tables[key_col] = (table_codes[keep], keys[keep])
+                self._merged.pop(key_col, None)
+
+    def resolve(self, key_col: str, values: pd.Series) -> pd.arrays.IntegerArray:
+        """Keys of the codes in ``values`` (NULL codes -> NULL keys); raises UnresolvedCodes."""
+        codes = _as_codes(values)
+        index, keys = self._lookup_index(key_col)
+        pos = index.get_indexer(codes)
+        missing = pos < 0
+        unknown = missing & codes.notna().to_numpy()
+        if unknown.any():
+            sample = ", ".join(pd.unique(codes[unknown])[:5])
+            raise UnresolvedCodes(f"{int(unknown.sum())} {DIMENSIONS[key_col].code} values not resolved (e.g. {sample})")
+        out = pd.array(keys.take(pos) if len(keys) else np.zeros(len(pos), "int64"), dtype="Int64")
+        out[missing] = pd.NA
+        return out
+
+    def resolve_frame(self, df: pd.DataFrame, codes: dict[str, str]) -> pd.DataFrame:
+        """Replace the code columns of ``df`` with their key columns."""
+        for key_col, code_col in codes.items():
+            df[key_col] = self.resolve(key_col, df[code_col])
+        return df.drop(columns=list(codes.values()))
+
+    def prepare(self, cur, schema: str, files: dict[str, tuple[Path, list[str]]]):
+        """
+        Load the indexes ``{table: (path, columns)}`` needs and insert the
+        inferred members for its unknown codes. Runs on the caller's cursor and
+        commits its transaction, so call it before the load transaction starts.
+        """
+        needed: dict[str, list[pd.Series]] = {}
+        for path, columns in files.values():
+            codes = code_columns(path, columns)
+            if codes:
+                df = _read_codes(path, list(codes.values()))
+                for key_col, code_col in codes.items():
+                    needed.setdefault(key_col, []).append(_as_codes(df[code_col]).dropna().unique())
+        if not needed:
+            return
+
+        inferred = {}
+        for key_col in sorted(needed):
+            dim = DIMENSIONS[key_col]
+            self._load(cur, schema, dim)
+            wanted = pd.Index(np.concatenate(needed[key_col])).unique()
+            unknown = wanted[~wanted.isin(self._lookup_index(key_col)[0])]
+            if len(unknown):
+                inferred[key_col] = self._infer(cur, schema, dim, list(unknown))
+        cur.connection.commit()
+
+        with self._lock:
+            for key_col, (codes, keys) in inferred.items():
+                old_codes, old_keys = self._tables[key_col]
+                self._tables[key_col] = (old_codes.append(codes), np.concatenate([old_keys, keys]))
+                self._merged.pop(key_col, None)
+
+    def _infer(self, cur, schema: str, dim: Dimension, codes: list[str]) -> tuple[pd.Index, np.ndarray]:
+        target = f"{schema}.{dim.table_name}"
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (inferred_lock(target),))
+        # Another loader may have inferred some of them since the index was read.
+        cur.execute(f"SELECT {dim.code}, {dim.key} FROM {target} WHERE {dim.code} = ANY(%s)", (codes,))
+        found = dict(cur.fetchall())
+        new = [c for c in codes if c not in found]
+        if new:
+            attrs = ", ".join(c for c, _ in dim.inferred)
+            values = ", ".join("replace(%s, '{code}', c.code)" for _ in dim.inferred)
+            cur.execute(
+                f"""
+                INSERT INTO {target} ({dim.key}, {dim.code}, {attrs})
+                SELECT (SELECT LEAST(MIN({dim.key}), 0) FROM {target}) - c.n, c.code, {values}
+                FROM unnest(%s::text[]) WITH ORDINALITY AS c(code, n)
+                RETURNING {dim.code}, {dim.key}
+                """,
+                [v for _, v in dim.inferred] + [new],
+            )
+            found.update(cur.fetchall())
+            print(f"   ✚ {len(new)} inferred {dim.table_name} members for unknown {dim.code} values.")
+        return self._index(list(found), list(found.values()))
+
+
+SURROGATE_KEYS = SurrogateKeyCache()
+
+
+class ResolvedCSV(BlockStream):
+    """
+    CSV text stream of ``columns`` from ``path``, with the key columns in
+    ``codes`` resolved from their code columns. The header row is emitted
+    (COPY ``HEADER true``); NULL keys are empty cells (``NULL ''``). Other
+    CSV cells are passed through as text; Parquet is written by Arrow, as in
+    ``sources.ParquetCSV``.
+    """
+
+    def __init__(self, path: Path, columns: list[str], codes: dict[str, str], chunk_rows: int = RESOLVE_CHUNK_ROWS):
+        super().__init__()
+        self.columns = columns
+        self.codes = codes
+        self.rows = 0
+        self._read = [codes.get(c, c) for c in columns]
+        if path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(path)
+            by_lower = {n.lower(): n for n in parquet.schema_arrow.names}
+            self._batches = parquet.iter_batches(batch_size=chunk_rows, columns=[by_lower[c] for c in self._read])
+            self._chunks = None
+        else:
+            self._chunks = pd.read_csv(path, usecols=self._read, dtype="string", keep_default_na=False, chunksize=chunk_rows)
+        self._pending = ",".join(columns) + "\n"
+
+    def _fill(self) -> str:
+        if self._chunks is None:
+            return self._fill_parquet()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            return ""
+        self.rows += len(chunk)
+        chunk = SURROGATE_KEYS.resolve_frame(chunk, self.codes)
+        return chunk[self.columns].to_csv(index=False, header=False, lineterminator="\n")
+
+    def _fill_parquet(self) -> str:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        batch = next(self._batches, None)
+        if batch is None:
+            self._exhausted = True
+            return ""
+        self.rows += batch.num_rows
+        arrays = dict(zip(self._read, batch.columns))
+        for key_col, code_col in self.codes.items():
+            keys = SURROGATE_KEYS.resolve(key_col, arrays[code_col].to_pandas())
+            arrays[code_col] = pa.array(keys, type=pa.int64())
+        table = pa.table([arrays[c] for c in self._read], names=self.columns)
+        buf = io.BytesIO()
+        pa_csv.write_csv(table, buf, pa_csv.WriteOptions(include_header=False))
+        return buf.getvalue().decode("utf-8")
@@ -0,0 +1,122 @@
+"""
+Load manifest: skip files that were already loaded with the same content.
+
+Every successful load records (target table, file, size, SHA-256, rows,
+mode, timestamp) in analytics.etl_load_manifest in the same transaction as
+the load itself, so the manifest never claims a load that rolled back.
+
+A file is skipped when the manifest holds the same path, size and hash for
+the same table, and the previous load covers the requested mode:
+
+- partition / attach (replace the file's date keys): any previous load of
+  the file does.
+- full / bulk (the table must end up equal to the file): only a previous
+  full / bulk load does. Such a load also clears the table's other
+  entries, since it replaced whatever they had loaded.
+
+Loaders take ``--force`` to load regardless.
+"""
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+MANIFEST_TABLE = "etl_load_manifest"
+
+# Modes after which the table holds exactly the file's rows.
+REPLACE_MODES = ("full", "bulk")
+
+_BASE_DIR = Path(__file__).resolve().parents[2]  # /database
+
+# (path, size, mtime) -> Fingerprint, so pre-load validation and the load
+# itself hash each file once.
+_hashed: dict[tuple[str, int, int], "Fingerprint"] = {}
+_hashed_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    path: str
+    size: int
+    sha256: str
+
+
+def fingerprint(path: Path, block_size: int = 1 << 20) -> Fingerprint:
+    """Size + SHA-256 of ``path``; the path is stored relative to database/ when possible."""
+    resolved = path.resolve()
+    st = resolved.stat()
+    memo = (resolved.as_posix(), st.st_size, st.st_mtime_ns)
+    with _hashed_lock:
+        if memo in _hashed:
+            return _hashed[memo]
+
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    try:
+        key = resolved.relative_to(_BASE_DIR).as_posix()
+    except ValueError:
+        key = resolved.as_posix()
+    fp = Fingerprint(key, st.st_size, h.hexdigest())
+    with _hashed_lock:
+        _hashed[memo] = fp
+    return fp
+
+
+def ensure_manifest_table(cur, schema: str):
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{MANIFEST_TABLE} (
+            target_table TEXT        NOT NULL,
+            file_path    TEXT        NOT NULL,
+            file_size    BIGINT      NOT NULL,
+            content_hash TEXT        NOT NULL,
+            row_count    BIGINT,
+            load_mode    TEXT        NOT NULL,
+            loaded_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (target_table, file_path)
+        )
+        """
+    )
+
+
+def is_loaded(cur, schema: str, table_name: str, fp: Fingerprint, mode: str = "partition") -> bool:
+    ensure_manifest_table(cur, schema)
+    cur.execute(
+        f"""
+        SELECT load_mode
+        FROM {schema}.{MANIFEST_TABLE}
+        WHERE target_table = %s AND file_path = %s AND file_size = %s AND content_hash = %s
+        """,
+        (table_name, fp.path, fp.size, fp.sha256),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return False
+    return mode not in REPLACE_MODES or row[0] in REPLACE_MODES
+
+
+def record_load(cur, schema: str, table_name: str, fp: Fingerprint, rows: int | None, mode: str = "partition"):
+    """Upsert the manifest entry for ``fp``; call inside the load's transaction."""
+    ensure_manifest_table(cur, schema)
+    if mode in REPLACE_MODES:
+        cur.execute(
+            f"DELETE FROM {schema}.{MANIFEST_TABLE} WHERE target_table = %s AND file_path <> %s",
+            (table_name, fp.path),
+        )
+    cur.execute(
+        f"""
+        INSERT INTO {schema}.{MANIFEST_TABLE}
+            (target_table, file_path, file_size, content_hash, row_count, load_mode, loaded_at)
+        VALUES (%s, %s, %s, %s, %s, %s, now())
+        ON CONFLICT (target_table, file_path) DO UPDATE SET
+            file_size    = EXCLUDED.file_size,
+            content_hash = EXCLUDED.content_hash,
+            row_count    = EXCLUDED.row_count,
+            load_mode    = EXCLUDED.load_mode,
+            loaded_at    = EXCLUDED.loaded_at
+        """,
+        (table_name, fp.path, fp.size, fp.sha256, rows, mode),
+    )
@@ -0,0 +1,137 @@
+"""
+Load metrics: metered COPY and a per-run history table.
+
+``metered_copy()`` streams a source into COPY through ``MeteredReader``,
+which counts the bytes and lines handed to the server on the way, so a file
+is read exactly once. The result carries the client counts, the row count
+reported by the server and the COPY duration.
+
+Each published fact writes one row to analytics.etl_load_metrics per run,
+table and partition (see etl_common.facts). RUN_ID is shared by every load
+in a process (run_all.py runs the loaders in-process), or taken from
+ETL_RUN_ID so an orchestrator can tag its runs. When run_all.py resumes a
+run, ``set_run_id()`` switches it to the resumed run's id, so the metrics
+join to its run state.
+
+Throughput history, e.g.:
+    SELECT target_table, date_trunc('day', recorded_at), avg(rows_per_sec)
+    FROM analytics.etl_load_metrics GROUP BY 1, 2 ORDER BY 1, 2;
+"""
+
+import io
+import os
+import time
+import uuid
+from dataclasses import dataclass
+
+METRICS_TABLE = "etl_load_metrics"
+
+RUN_ID = os.environ.get("ETL_RUN_ID") or uuid.uuid4().hex[:16]
+
+
+def set_run_id(run_id: str):
+    """Record the metrics of the following loads under ``run_id``."""
+    global RUN_ID
+    RUN_ID = run_id
+
+
+class MeteredReader(io.TextIOBase):
+    """Pass-through reader counting bytes (UTF-8) and newlines read from ``source``."""
+
+    def __init__(self, source):
+        self._source = source
+        self.bytes = 0
+        self.lines = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _count(self, chunk):
+        if chunk:
+            if isinstance(chunk, str):
+                self.bytes += len(chunk.encode("utf-8"))
+                self.lines += chunk.count("\n")
+            else:
+                self.bytes += len(chunk)
+                self.lines += chunk.count(b"\n")
+        return chunk
+
+    def read(self, size: int = -1):
+        return self._count(self._source.read(size))
+
+    def readline(self, size: int = -1):
+        return self._count(self._source.readline(size))
+
+
+@dataclass
+class CopyStats:
+    rows: int           # data lines streamed by the client (header excluded)
+    server_rows: int    # rows COPY reported
+    bytes: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.server_rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb(self) -> float:
+        return self.bytes / (1 << 20)
+
+
+def metered_copy(cur, copy_sql: str, src, header: bool = True) -> CopyStats:
+    """``cur.copy_expert(copy_sql, src)`` while counting what is streamed."""
+    reader = MeteredReader(src)
+    t0 = time.perf_counter()
+    cur.copy_expert(copy_sql, reader)
+    seconds = time.perf_counter() - t0
+    rows = max(0, reader.lines - (1 if header else 0))
+    return CopyStats(rows, cur.rowcount, reader.bytes, seconds)
+
+
+def ensure_metrics_table(cur, schema: str):
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{METRICS_TABLE} (
+            metric_id       BIGSERIAL PRIMARY KEY,
+            run_id          TEXT        NOT NULL,
+            target_table    TEXT        NOT NULL,
+            partition_key   TEXT,
+            load_mode       TEXT        NOT NULL,
+            client_rows     BIGINT,
+            server_rows     BIGINT,
+            bytes           BIGINT,
+            copy_seconds    NUMERIC(12,3),
+            stage_seconds   NUMERIC(12,3),
+            publish_seconds NUMERIC(12,3),
+            rows_per_sec    NUMERIC(14,1),
+            recorded_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def record_metrics(
+    cur,
+    schema: str,
+    table_name: str,
+    partition: str | None,
+    mode: str,
+    stats: CopyStats,
+    stage_seconds: float,
+    publish_seconds: float,
+):
+    ensure_metrics_table(cur, schema)
+    cur.execute(
+        f"""
+        INSERT INTO {schema}.{METRICS_TABLE}
+            (run_id, target_table, partition_key, load_mode, client_rows, server_rows, bytes,
+             copy_seconds, stage_seconds, publish_seconds, rows_per_sec)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        (
+            RUN_ID, table_name, partition, mode, stats.rows, stats.server_rows, stats.bytes,
+            round(stats.seconds, 3), round(stage_seconds, 3), round(publish_seconds, 3),
+            round(stats.rows_per_sec, 1),
+        ),
+    )
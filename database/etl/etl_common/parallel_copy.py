@@ -0,0 +1,190 @@
+"""
+Parallel chunked COPY of one large fact file into its stage.
+
+A single COPY is bound to one server backend, i.e. one core parsing CSV.
+For big files the stage is instead filled by several connections at once:
+
+1. the file is cut into chunks of ``chunk_rows`` CSV records. Cuts are made
+   on record boundaries only: a newline inside a quoted field (odd number of
+   quotes so far) never ends a record.
+2. the stage is created and COMMITTED on a worker connection, so the other
+   workers (and the loader's own transaction) can see it. It lives in
+   analytics_staging and is UNLOGGED; nothing in ``analytics`` changes.
+3. ``workers`` connections from the COPY pool (etl_common.db) take chunks
+   from a bounded queue and COPY them into the stage, then commit.
+
+The loader's transaction then validates and publishes the stage as usual,
+so the live tables still change in one atomic COMMIT. A failed run leaves
+only the stage behind, which the next load of the table drops.
+
+Files that fit in one chunk are COPYed in the loader's transaction as before.
+
+``copy_stages_concurrently()`` applies the same idea across tables: each
+file of a domain gets its own COPY connection, so independent facts are
+COPYed at the same time and then published in the loader's one COMMIT.
+
+Environment:
+  ETL_COPY_WORKERS     connections per parallel COPY (default: 1 = off);
+                       throughput scales with it up to the server's cores
+  ETL_COPY_CHUNK_ROWS  records per chunk (default: 100000)
+"""
+
+import contextvars
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from etl_common.db import COPY_WORKERS, copy_connection
+from etl_common.metrics import CopyStats, MeteredReader, metered_copy
+from etl_common.staging import copy_sql, create_stage
+
+CHUNK_ROWS = int(os.environ.get("ETL_COPY_CHUNK_ROWS", "100000"))
+
+
+def iter_records(src):
+    """Yield complete CSV records (header included), keeping quoted newlines inside their record."""
+    pending = []
+    in_quotes = False
+    for line in iter(src.readline, ""):
+        pending.append(line)
+        # Escaped quotes are doubled, so only an odd count flips the state.
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            yield "".join(pending)
+            pending = []
+    if pending:
+        yield "".join(pending)
+
+
+def iter_chunks(records, chunk_rows: int):
+    """Group ``records`` into strings of at most ``chunk_rows`` records."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def copy_into_stage(
+    cur,
+    schema: str,
+    table_name: str,
+    columns: list[str],
+    src,
+    workers: int = COPY_WORKERS,
+    chunk_rows: int = CHUNK_ROWS,
+) -> tuple[str, CopyStats]:
+    """Create the stage and fill it from ``src``; returns (stage, stats)."""
+    if workers <= 1:
+        stage = create_stage(cur, schema, table_name, columns)
+        return stage, metered_copy(cur, copy_sql(stage, columns), src)
+
+    reader = MeteredReader(src)
+    t0 = time.perf_counter()
+    records = iter_records(reader)
+    next(records, None)  # header
+    chunks = iter_chunks(records, chunk_rows)
+    first = next(chunks, "")
+    second = next(chunks, None)
+
+    if second is None:
+        # Small file: one COPY in the loader's own transaction.
+        stage = create_stage(cur, schema, table_name, columns)
+        cur.copy_expert(copy_sql(stage, columns, header=False), io.StringIO(first))
+        return stage, CopyStats(max(0, reader.lines - 1), cur.rowcount, reader.bytes, time.perf_counter() - t0)
+
+    with copy_connection() as conn:
+        stage = create_stage(conn.cursor(), schema, table_name, columns)
+        conn.commit()
+
+    server_rows = _parallel_copy(copy_sql(stage, columns, header=False), [first, second], chunks, workers)
+    return stage, CopyStats(max(0, reader.lines - 1), server_rows, reader.bytes, time.perf_counter() - t0)
+
+
+def _parallel_copy(sql: str, head: list[str], chunks, workers: int) -> int:
+    work: queue.Queue = queue.Queue(maxsize=workers * 2)
+    failed = threading.Event()
+    errors: list[BaseException] = []
+    counts: list[int] = []
+    lock = threading.Lock()
+
+    def worker():
+        rows = 0
+        done = False
+        try:
+            with copy_connection() as conn:
+                cur = conn.cursor()
+                while (chunk := work.get()) is not None:
+                    if failed.is_set():
+                        continue  # drain so the producer is never blocked
+                    cur.copy_expert(sql, io.StringIO(chunk))
+                    rows += cur.rowcount
+                done = True
+                conn.commit()
+        except BaseException as ex:
+            failed.set()
+            with lock:
+                errors.append(ex)
+            while not done and work.get() is not None:
+                pass
+            return
+        with lock:
+            counts.append(rows)
+
+    # Workers run in a copy of the caller's context (e.g. run_all.py's [step] output prefix).
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(worker,), name=f"copy-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for chunk in head:
+            work.put(chunk)
+        for chunk in chunks:
+            if failed.is_set():
+                break
+            work.put(chunk)
+    finally:
+        for _ in threads:
+            work.put(None)
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+    return sum(counts)
+
+
+def copy_stages_concurrently(
+    schema: str,
+    tables: dict[str, tuple[list[str], Callable[[], object]]],
+    workers: int = 3,
+) -> dict[str, tuple[str, CopyStats]]:
+    """
+    COPY each ``{table: (columns, open_src)}`` into its committed stage on
+    its own COPY-pool connection; returns ``{table: (stage, stats)}``.
+
+    ``open_src()`` returns a context manager yielding the CSV stream. The
+    caller must already hold the tables' locks (etl_common.facts.lock_tables).
+    """
+
+    def copy_one(table_name: str) -> tuple[str, CopyStats]:
+        columns, open_src = tables[table_name]
+        with copy_connection() as conn, open_src() as src:
+            # One connection per table; no nested parallel COPY from the same pool.
+            stage, stats = copy_into_stage(conn.cursor(), schema, table_name, columns, src, workers=1)
+            conn.commit()
+        return stage, stats
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="copy") as pool:
+        futures = {t: pool.submit(contextvars.copy_context().run, copy_one, t) for t in tables}
+        return {t: fut.result() for t, fut in futures.items()}
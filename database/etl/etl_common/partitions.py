@@ -0,0 +1,226 @@
+"""
+Date partitioning of the fact tables.
+
+Every fact is partitioned by a DateKey column (FACT_DATE_COLUMN). With the
+native layout from ddl/18_partition_facts.sql the date-driven facts are
+RANGE-partitioned by calendar month, e.g. factsales_p202512 holds
+FOR VALUES FROM (20251201) TO (20260101).
+
+build_month() rebuilds one month in a standalone table (with its indexes,
+validated FKs and a CHECK matching the bound) without locking the live
+table; swap_month() then exchanges it with DETACH / ATTACH, which is
+metadata-only. detach_before() does the same for retention: old months are
+detached (and optionally dropped) without a DELETE.
+"""
+
+import re
+
+# Date column that defines a fact's partition (FactOrders is keyed by order date).
+FACT_DATE_COLUMN = {
+    "factorders": "orderdatekey",
+}
+
+# Facts converted to monthly partitions by ddl/18_partition_facts.sql.
+PARTITIONED_FACTS = [
+    "factsales",
+    "factorders",
+    "factinventory",
+    "factproduction",
+    "factfinancepl",
+    "factfinancebs",
+    "factfinancecf",
+]
+
+_BOUND_RE = re.compile(r"FROM \((\d+)\) TO \((\d+)\)")
+_INDEX_RE = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ ")
+
+
+def date_column(table_name: str) -> str:
+    return FACT_DATE_COLUMN.get(table_name, "datekey")
+
+
+def month_bounds(datekey: int) -> tuple[int, int]:
+    """20251221 -> (20251201, 20260101)"""
+    year, month = divmod(datekey // 100, 100)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (year * 100 + month) * 100 + 1, (next_year * 100 + next_month) * 100 + 1
+
+
+def partition_name(table_name: str, lo: int) -> str:
+    return f"{table_name}_p{lo // 100}"
+
+
+def is_partitioned(cur, schema: str, table_name: str) -> bool:
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+        (f"{schema}.{table_name}",),
+    )
+    return cur.fetchone()[0]
+
+
+def list_partitions(cur, schema: str, table_name: str) -> list[tuple[str, int, int]]:
+    """[(partition_name, lo, hi), ...] ordered by lower bound; DEFAULT partitions are skipped."""
+    cur.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (f"{schema}.{table_name}",),
+    )
+    parts = []
+    for name, bound in cur.fetchall():
+        m = _BOUND_RE.search(bound or "")
+        if m:
+            parts.append((name, int(m.group(1)), int(m.group(2))))
+    return sorted(parts, key=lambda p: p[1])
+
+
+def ensure_partitions(cur, schema: str, table_name: str, from_key: int, to_key: int) -> int:
+    """Create missing monthly partitions covering [from_key, to_key]."""
+    cur.execute(f"SELECT {schema}.ensure_month_partitions(%s, %s, %s)", (table_name, from_key, to_key))
+    return cur.fetchone()[0]
+
+
+def ensure_fact_partitions(cur, schema: str) -> dict[str, int]:
+    """Cover the whole date dimension with partitions for every partitioned fact."""
+    cur.execute(f"SELECT MIN(datekey), MAX(datekey) FROM {schema}.dimdate")
+    lo, hi = cur.fetchone()
+    created = {}
+    if lo is None:
+        return created
+    for t in PARTITIONED_FACTS:
+        if is_partitioned(cur, schema, t):
+            created[t] = ensure_partitions(cur, schema, t, lo, hi)
+    return created
+
+
+def _copy_indexes(cur, schema: str, table_name: str, target: str):
+    """Build ``target``'s copies of the parent's PK and indexes (after it is filled)."""
+    cur.execute(
+        """
+        SELECT i.indexdef, x.indisprimary
+        FROM pg_indexes i
+        JOIN pg_index x ON x.indexrelid = to_regclass(quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))
+        WHERE i.schemaname = %s AND i.tablename = %s
+        """,
+        (schema, table_name),
+    )
+    for indexdef, is_primary in cur.fetchall():
+        if is_primary:
+            cols = indexdef[indexdef.rindex("(") + 1:indexdef.rindex(")")]
+            cur.execute(f"ALTER TABLE {target} ADD PRIMARY KEY ({cols})")
+        else:
+            cur.execute(_INDEX_RE.sub(rf"CREATE \1INDEX ON {target} ", indexdef, count=1))
+
+
+def _copy_foreign_keys(cur, schema: str, table_name: str, target: str):
+    """Give ``target`` the parent's FKs, validated now so ATTACH can reuse them without a scan."""
+    cur.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f' AND conparentid = 0
+        """,
+        (f"{schema}.{table_name}",),
+    )
+    for conname, definition in cur.fetchall():
+        cur.execute(f"ALTER TABLE {target} ADD CONSTRAINT {conname} {definition}")
+
+
+def build_month(
+    cur,
+    schema: str,
+    table_name: str,
+    columns: list[str],
+    stage: str,
+    build_schema: str,
+    lo: int,
+    hi: int,
+    keep_other_days: bool = True,
+) -> tuple[str, str | None, int, int]:
+    """
+    Build the replacement for month [lo, hi) of ``schema.table_name`` as a
+    standalone table in ``build_schema``.
+
+    The new month holds the staged rows plus, with ``keep_other_days``, the
+    live partition's rows for date keys *not* present in ``stage`` (so a
+    daily load only replaces its own days). Indexes, PK, validated FKs and a
+    CHECK matching the bound are added here, so the later swap_month() is
+    metadata-only. Only ACCESS SHARE is taken on the live table.
+
+    Returns (new_table, old_partition_or_None, rows_replaced, rows_inserted).
+    """
+    datecol = date_column(table_name)
+    parent = f"{schema}.{table_name}"
+    name = partition_name(table_name, lo)
+    new = f"{build_schema}.{name}"
+    col_list_sql = ", ".join(columns)
+
+    old = next((p for p, p_lo, p_hi in list_partitions(cur, schema, table_name) if p_lo == lo and p_hi == hi), None)
+
+    cur.execute(f"DROP TABLE IF EXISTS {new}")
+    cur.execute(f"CREATE TABLE {new} (LIKE {parent} INCLUDING DEFAULTS)")
+
+    replaced = 0
+    if old:
+        cur.execute(f"SELECT COUNT(*) FROM {schema}.{old}")
+        replaced = cur.fetchone()[0]
+        if keep_other_days:
+            cur.execute(
+                f"""
+                INSERT INTO {new}
+                SELECT * FROM {schema}.{old} o
+                WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE s.{datecol} = o.{datecol})
+                """
+            )
+            replaced -= cur.rowcount
+
+    cur.execute(
+        f"""
+        INSERT INTO {new} ({col_list_sql})
+        SELECT {col_list_sql} FROM {stage}
+        WHERE {datecol} >= %s AND {datecol} < %s
+        """,
+        (lo, hi),
+    )
+    inserted = cur.rowcount
+
+    _copy_indexes(cur, schema, table_name, new)
+    _copy_foreign_keys(cur, schema, table_name, new)
+    # A CHECK matching the bound lets ATTACH skip its validation scan.
+    cur.execute(
+        f"ALTER TABLE {new} ADD CONSTRAINT {name}_bound "
+        f"CHECK ({datecol} >= {lo} AND {datecol} < {hi})"
+    )
+    cur.execute(f"ANALYZE {new}")
+
+    return new, old, replaced, inserted
+
+
+def swap_month(cur, schema: str, table_name: str, new: str, old: str | None, lo: int, hi: int):
+    """Exchange the live month partition for ``new`` (built by build_month)."""
+    parent = f"{schema}.{table_name}"
+    name = partition_name(table_name, lo)
+
+    if old:
+        cur.execute(f"ALTER TABLE {parent} DETACH PARTITION {schema}.{old}")
+        cur.execute(f"DROP TABLE {schema}.{old}")
+    cur.execute(f"ALTER TABLE {new} SET SCHEMA {schema}")
+    cur.execute(f"ALTER TABLE {parent} ATTACH PARTITION {schema}.{name} FOR VALUES FROM ({lo}) TO ({hi})")
+    cur.execute(f"ALTER TABLE {schema}.{name} DROP CONSTRAINT {name}_bound")
+
+
+def detach_before(cur, schema: str, table_name: str, before_key: int, drop: bool = False) -> list[str]:
+    """Detach (and optionally drop) every partition whose range ends on or before ``before_key``."""
+    parent = f"{schema}.{table_name}"
+    detached = []
+    for name, _, hi in list_partitions(cur, schema, table_name):
+        if hi > before_key:
+            continue
+        cur.execute(f"ALTER TABLE {parent} DETACH PARTITION {schema}.{name}")
+        if drop:
+            cur.execute(f"DROP TABLE {schema}.{name}")
+        detached.append(name)
+    return detached
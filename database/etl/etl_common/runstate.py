@@ -0,0 +1,192 @@
+"""
+Run state: checkpointed, resumable pipeline runs.
+
+run_all.py opens a run per (run_date, mode) in analytics.etl_run and passes
+its id to every loader (``--run-id``). The loaders publish table by table,
+each in its own transaction (``load_unit()``), and record a checkpoint in
+analytics.etl_run_state in that same transaction, so a checkpoint exists
+exactly for the tables whose data was committed.
+
+When a run fails, the next run_all for the same run_date and mode resumes
+it: tables with a checkpoint are skipped (even with ``--force``) and the
+load restarts at the first table that did not finish. ``--restart``
+abandons the unfinished run and starts a new one.
+
+A unit whose connection drops (Neon restarts, pooler timeouts, ...) is
+retried on a fresh connection, up to ETL_TABLE_RETRIES times (default 2)
+with a growing pause of ETL_RETRY_DELAY seconds (default 5). Only lost
+connections are retried; SQL errors and cancelled runs fail right away.
+"""
+
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import psycopg2
+
+from etl_common.db import connection
+from etl_common.metrics import RUN_ID
+
+RUN_TABLE = "etl_run"
+RUN_STATE_TABLE = "etl_run_state"
+
+TABLE_RETRIES = int(os.environ.get("ETL_TABLE_RETRIES", "2"))
+RETRY_DELAY = float(os.environ.get("ETL_RETRY_DELAY", "5"))
+
+
+@dataclass
+class Run:
+    run_id: str
+    run_date: str
+    mode: str
+    attempt: int = 1
+
+    @property
+    def resumed(self) -> bool:
+        return self.attempt > 1
+
+
+def ensure_run_tables(cur, schema: str):
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{RUN_TABLE} (
+            run_id      TEXT        PRIMARY KEY,
+            run_date    TEXT        NOT NULL,
+            load_mode   TEXT        NOT NULL,
+            status      TEXT        NOT NULL,
+            attempt     INT         NOT NULL DEFAULT 1,
+            started_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        )
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{RUN_STATE_TABLE} (
+            run_id       TEXT        NOT NULL REFERENCES {schema}.{RUN_TABLE} ON DELETE CASCADE,
+            step         TEXT        NOT NULL,
+            target_table TEXT        NOT NULL,
+            row_count    BIGINT,
+            finished_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (run_id, target_table)
+        )
+        """
+    )
+
+
+def begin_run(cur, schema: str, run_date: str, mode: str, restart: bool = False) -> Run:
+    """Resume the unfinished run for (run_date, mode), or start a new one."""
+    ensure_run_tables(cur, schema)
+    cur.execute(
+        f"""
+        SELECT run_id, attempt
+        FROM {schema}.{RUN_TABLE}
+        WHERE run_date = %s AND load_mode = %s AND status IN ('running', 'failed')
+        ORDER BY started_at DESC
+        LIMIT 1
+        FOR UPDATE
+        """,
+        (run_date, mode),
+    )
+    row = cur.fetchone()
+    if row is not None and not restart:
+        run = Run(row[0], run_date, mode, row[1] + 1)
+        cur.execute(
+            f"UPDATE {schema}.{RUN_TABLE} SET status = 'running', attempt = %s, finished_at = NULL WHERE run_id = %s",
+            (run.attempt, run.run_id),
+        )
+        return run
+
+    if row is not None:
+        cur.execute(
+            f"UPDATE {schema}.{RUN_TABLE} SET status = 'abandoned', finished_at = now() WHERE run_id = %s",
+            (row[0],),
+        )
+    run = Run(RUN_ID, run_date, mode)
+    cur.execute(
+        f"INSERT INTO {schema}.{RUN_TABLE} (run_id, run_date, load_mode, status) VALUES (%s, %s, %s, 'running')",
+        (run.run_id, run_date, mode),
+    )
+    return run
+
+
+def get_run(cur, schema: str, run_id: str) -> Run:
+    ensure_run_tables(cur, schema)
+    cur.execute(
+        f"SELECT run_date, load_mode, attempt FROM {schema}.{RUN_TABLE} WHERE run_id = %s",
+        (run_id,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        raise LookupError(f"Unknown ETL run: {run_id}")
+    return Run(run_id, *row)
+
+
+def finish_run(cur, schema: str, run: Run, ok: bool):
+    cur.execute(
+        f"UPDATE {schema}.{RUN_TABLE} SET status = %s, finished_at = now() WHERE run_id = %s",
+        ("succeeded" if ok else "failed", run.run_id),
+    )
+
+
+def completed_tables(cur, schema: str, run: Run | None) -> set[str]:
+    """Tables checkpointed by ``run`` (nothing when not part of a run)."""
+    if run is None:
+        return set()
+    cur.execute(f"SELECT target_table FROM {schema}.{RUN_STATE_TABLE} WHERE run_id = %s", (run.run_id,))
+    return {r[0] for r in cur.fetchall()}
+
+
+def mark_done(cur, schema: str, run: Run, step: str, table_name: str, rows: int | None = None):
+    """Checkpoint ``table_name``; call inside the transaction that published it."""
+    cur.execute(
+        f"""
+        INSERT INTO {schema}.{RUN_STATE_TABLE} (run_id, step, target_table, row_count)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (run_id, target_table) DO UPDATE SET
+            row_count   = EXCLUDED.row_count,
+            finished_at = now()
+        """,
+        (run.run_id, step, table_name, rows),
+    )
+
+
+def _connection_lost(ex: Exception, conn) -> bool:
+    if getattr(conn, "aborted", False):  # cancelled by run_all, not lost
+        return False
+    # conn is None when the connect itself failed
+    return isinstance(ex, psycopg2.InterfaceError) or conn is None or bool(conn.closed)
+
+
+def load_unit(
+    schema: str,
+    run: Run | None,
+    step: str,
+    load: Callable[..., dict[str, int | None]],
+    retries: int = TABLE_RETRIES,
+) -> dict[str, int | None]:
+    """
+    Run ``load(cur)`` in its own transaction and commit it together with a
+    checkpoint for every table in the ``{table: rows}`` it returns. A lost
+    connection restarts the unit on a new one.
+    """
+    for attempt in itertools.count(1):
+        conn = None
+        try:
+            with connection() as conn:
+                cur = conn.cursor()
+                loaded = load(cur)
+                if run is not None:
+                    for table_name, rows in loaded.items():
+                        mark_done(cur, schema, run, step, table_name, rows)
+                conn.commit()
+                return loaded
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as ex:
+            if attempt > retries or not _connection_lost(ex, conn):
+                raise
+            delay = RETRY_DELAY * attempt
+            reason = (str(ex).strip() or type(ex).__name__).splitlines()[0]
+            print(f"⚠ Connection lost ({reason}); retry {attempt}/{retries} in {delay:g}s ...")
+            time.sleep(delay)
@@ -0,0 +1,104 @@
+"""
+UNLOGGED staging schema used by the two-phase fact load.
+
+Phase 1 COPYs each fact file into ``analytics_staging.<table>`` (UNLOGGED,
+so no WAL is written for data that may still be rejected) and validates it
+there: NOT NULL columns and foreign keys of the live table are checked with
+set-based queries before anything touches ``analytics``. Phase 2 publishes
+(see etl_common.facts).
+"""
+
+STAGING_SCHEMA = "analytics_staging"
+
+
+class StageValidationError(ValueError):
+    pass
+
+
+def ensure_staging_schema(cur):
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {STAGING_SCHEMA}")
+
+
+def create_stage(cur, schema: str, table_name: str, columns: list[str]) -> str:
+    """(Re)create an empty UNLOGGED stage with ``columns`` of ``schema.table_name``."""
+    stage = f"{STAGING_SCHEMA}.{table_name}"
+    col_list_sql = ", ".join(columns)
+    ensure_staging_schema(cur)
+    cur.execute(f"DROP TABLE IF EXISTS {stage}")
+    cur.execute(
+        f"""
+        CREATE UNLOGGED TABLE {stage} AS
+        SELECT {col_list_sql} FROM {schema}.{table_name} WITH NO DATA
+        """
+    )
+    return stage
+
+
+def copy_sql(target: str, columns: list[str], header: bool = True) -> str:
+    col_list_sql = ", ".join(columns)
+    return f"COPY {target} ({col_list_sql}) FROM STDIN WITH (FORMAT csv, HEADER {str(header).lower()}, NULL '')"
+
+
+def not_null_columns(cur, schema: str, table_name: str) -> list[str]:
+    cur.execute(
+        """
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND is_nullable = 'NO'
+        ORDER BY ordinal_position
+        """,
+        (schema, table_name),
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def foreign_keys(cur, schema: str, table_name: str) -> list[tuple[str, str, str, str]]:
+    """[(constraint, column, referenced_table, referenced_column), ...] for single-column FKs."""
+    cur.execute(
+        """
+        SELECT DISTINCT ON (a.attname, c.confrelid)
+               c.conname, a.attname, c.confrelid::regclass::text, af.attname
+        FROM pg_constraint c
+        JOIN pg_attribute a  ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        JOIN pg_attribute af ON af.attrelid = c.confrelid AND af.attnum = c.confkey[1]
+        WHERE c.conrelid = to_regclass(%s)
+          AND c.contype = 'f'
+          AND array_length(c.conkey, 1) = 1
+        ORDER BY a.attname, c.confrelid, c.conname
+        """,
+        (f"{schema}.{table_name}",),
+    )
+    return cur.fetchall()
+
+
+def validate_stage(cur, schema: str, table_name: str, columns: list[str], stage: str) -> None:
+    """Raise StageValidationError listing every NOT NULL / FK violation in ``stage``."""
+    problems = []
+
+    for col in not_null_columns(cur, schema, table_name):
+        if col not in columns:
+            continue
+        cur.execute(f"SELECT COUNT(*) FROM {stage} WHERE {col} IS NULL")
+        n = cur.fetchone()[0]
+        if n:
+            problems.append(f"{n} rows with NULL {col}")
+
+    for conname, col, ref_table, ref_col in foreign_keys(cur, schema, table_name):
+        if col not in columns:
+            continue
+        cur.execute(
+            f"""
+            SELECT COUNT(*), MIN(s.{col}::text)
+            FROM {stage} s
+            WHERE s.{col} IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM {ref_table} r WHERE r.{ref_col} = s.{col})
+            """
+        )
+        n, sample = cur.fetchone()
+        if n:
+            problems.append(f"{n} rows violate {conname} ({col} -> {ref_table}, e.g. {sample})")
+
+    if problems:
+        raise StageValidationError(
+            f"Validation failed for {schema}.{table_name}:\n  - " + "\n  - ".join(problems)
+        )
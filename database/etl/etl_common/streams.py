@@ -0,0 +1,58 @@
+"""
+Base class for the read-only text streams handed to ``cursor.copy_expert``.
+
+Subclasses produce their output one block at a time in ``_fill()``;
+``BlockStream`` serves ``read()`` / ``readline()`` from that buffer, so only
+about one block is held in memory at a time.
+"""
+
+import io
+
+
+class BlockStream(io.TextIOBase):
+    def __init__(self):
+        self._pending = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self) -> str:
+        """Return the next block of text; set ``self._exhausted`` after the last one."""
+        raise NotImplementedError
+
+    def _ensure(self, size: int) -> None:
+        # Keep at least ``size`` unread chars buffered (or everything that is left).
+        if len(self._pending) - self._pos < size and not self._exhausted:
+            parts = [self._pending[self._pos:]]
+            have = len(parts[0])
+            while have < size and not self._exhausted:
+                parts.append(self._fill())
+                have += len(parts[-1])
+            self._pending, self._pos = "".join(parts), 0
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            parts = [self._pending[self._pos:]]
+            while not self._exhausted:
+                parts.append(self._fill())
+            self._pending, self._pos = "", 0
+            return "".join(parts)
+
+        self._ensure(size)
+        chunk = self._pending[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        idx = self._pending.find("\n", self._pos)
+        while idx < 0 and not self._exhausted:
+            self._ensure(len(self._pending) - self._pos + 1)
+            idx = self._pending.find("\n", self._pos)
+        end = len(self._pending) if idx < 0 else idx + 1
+        if size is not None and 0 <= size < end - self._pos:
+            end = self._pos + size
+        line = self._pending[self._pos:end]
+        self._pos = end
+        return line
@@ -0,0 +1,220 @@
+"""
+Load targets: where the loaders write.
+
+- postgres (default): the warehouse (Neon), through the staged COPY path of
+  etl_common.facts / etl_common.dimensions, with validation, the load
+  manifest, metrics and run checkpoints.
+- duckdb: an embedded DuckDB file (ETL_DUCKDB_PATH, default
+  database/local/warehouse.duckdb) for local iteration, benchmarks and CI
+  perf tests without any network. It loads the same dimension files and
+  daily partitions (CSV, .gz / .zst, Parquet) with DuckDB's own readers
+  into an ``analytics`` schema of the same table and column names, so dbt
+  (``--target local``) and the ML scripts (ML_TARGET=duckdb) read it as
+  they read Postgres.
+
+The target is chosen with ``--target`` on every loader and run_all.py, or
+ETL_TARGET. The DuckDB target keeps the load semantics (dimensions synced
+by natural key with soft deactivation; facts replaced in full or per date
+key of the partition, ``attach`` / ``bulk`` act as ``partition`` / ``full``)
+but has no constraints to validate against, no manifest and no run state.
+Each loader's tables are written in one DuckDB transaction. DuckDB needs
+the optional ``duckdb`` package.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from etl_common.dimensions import SOFT_DELETE_COLUMN, DimensionSync
+from etl_common.partitions import date_column
+
+TARGETS = ("postgres", "duckdb")
+DEFAULT_TARGET = os.environ.get("ETL_TARGET", "postgres")
+
+DUCKDB_PATH = Path(
+    os.environ.get("ETL_DUCKDB_PATH") or Path(__file__).resolve().parents[2] / "local" / "warehouse.duckdb"
+)
+
+# Surrogate id of each fact (BIGSERIAL in ddl/02_create_facts.sql); the dbt
+# staging models select it, so DuckDB fills it from a sequence.
+FACT_ID_COLUMNS = {
+    "factsales": "salesid",
+    "factsalestarget": "salestargetid",
+    "factorders": "orderid",
+    "factinventory": "inventoryid",
+    "factproduction": "productionid",
+    "factfinancepl": "financeplid",
+    "factfinancebs": "financebsid",
+    "factfinancecf": "financecfid",
+}
+
+
+def _quote(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _reader(path: Path) -> str:
+    """DuckDB table function reading ``path`` (compression is detected from the suffix)."""
+    if path.suffix == ".parquet":
+        return f"read_parquet({_quote(path)})"
+    return f"read_csv({_quote(path)}, header = true)"
+
+
+class DuckDBTarget:
+    """One process-wide DuckDB database; loads are serialized, each statement runs multi-threaded."""
+
+    name = "duckdb"
+
+    def __init__(self, path: Path = DUCKDB_PATH, schema: str = "analytics"):
+        try:
+            import duckdb
+        except ImportError as ex:
+            raise ImportError("The duckdb target requires the 'duckdb' package") from ex
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self._db = duckdb.connect(str(path))
+        self._lock = threading.Lock()
+        self._db.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+
+    def _columns(self, cur, table_name: str) -> dict[str, str] | None:
+        """{column: type} of ``table_name``, or None when it does not exist yet."""
+        cur.execute(
+            """
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = ? AND table_name = ?
+            ORDER BY ordinal_position
+            """,
+            [self.schema, table_name],
+        )
+        rows = cur.fetchall()
+        return dict(rows) if rows else None
+
+    def _select(self, cur, table_name: str, columns: list[str], path: Path) -> str:
+        """SELECT of ``columns`` from ``path``, cast to the table's types (keys to BIGINT for a new table)."""
+        types = self._columns(cur, table_name)
+        if types is None:
+            # Nullable keys may be written as 2.0 / blank; keep them integers.
+            types = {c: "BIGINT" for c in columns if c.endswith("key")}
+        select = ", ".join(f"CAST({c} AS {types[c]}) AS {c}" if c in types else c for c in columns)
+        return f"SELECT {select} FROM {_reader(path)}"
+
+    def _ensure_fact_id(self, cur, table_name: str):
+        """Add the fact's id column, numbered from ``<table>_id_seq`` (existing rows too)."""
+        id_col = FACT_ID_COLUMNS.get(table_name)
+        if id_col is None or id_col in self._columns(cur, table_name):
+            return
+        seq = f"{self.schema}.{table_name}_id_seq"
+        cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {seq}")
+        cur.execute(f"ALTER TABLE {self.schema}.{table_name} ADD COLUMN {id_col} BIGINT DEFAULT nextval('{seq}')")
+
+    def _stage(self, cur, name: str, table_name: str, columns: list[str], path: Path) -> int:
+        cur.execute(f"CREATE OR REPLACE TEMP TABLE {name} AS {self._select(cur, table_name, columns, path)}")
+        cur.execute(f"SELECT COUNT(*) FROM {name}")
+        return cur.fetchone()[0]
+
+    def sync_dimension(
+        self, table_name: str, key: str, natural_key: list[str], columns: list[str], path: Path
+    ) -> DimensionSync:
+        """
+        Insert new, update changed and soft-deactivate vanished rows, by
+        natural key. As in Postgres, an updated member keeps its key.
+        """
+        target = f"{self.schema}.{table_name}"
+        col_list = ", ".join(columns)
+        compared = [c for c in columns if c != key and c not in natural_key]
+        match = " AND ".join(f"t.{c} = s.{c}" for c in natural_key)
+        same = " AND ".join([match] + [f"t.{c} IS NOT DISTINCT FROM s.{c}" for c in compared])
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                src, changed = f"src_{table_name}", f"changed_{table_name}"
+                result = DimensionSync(self._stage(cur, src, table_name, columns, path))
+                if self._columns(cur, table_name) is None:
+                    cur.execute(f"CREATE TABLE {target} AS SELECT * FROM {src}")
+                    result.inserted = result.rows
+                else:
+                    cur.execute(
+                        f"CREATE OR REPLACE TEMP TABLE {changed} AS "
+                        f"SELECT * FROM {src} s WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {same})"
+                    )
+                    cur.execute(
+                        f"SELECT COUNT(*) FILTER (WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {match})), COUNT(*) "
+                        f"FROM {changed} s"
+                    )
+                    result.inserted, n_changed = cur.fetchone()
+                    result.updated = n_changed - result.inserted
+                    if result.updated and compared:
+                        update_sql = ", ".join(f"{c} = s.{c}" for c in compared)
+                        cur.execute(f"UPDATE {target} t SET {update_sql} FROM {changed} s WHERE {match}")
+                    cur.execute(
+                        f"INSERT INTO {target} ({col_list}) SELECT {col_list} FROM {changed} s "
+                        f"WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {match})"
+                    )
+                    if SOFT_DELETE_COLUMN in columns:
+                        cur.execute(
+                            f"UPDATE {target} t SET {SOFT_DELETE_COLUMN} = false "
+                            f"WHERE t.{SOFT_DELETE_COLUMN} AND NOT EXISTS (SELECT 1 FROM {src} s WHERE {match})"
+                        )
+                        result.deactivated = cur.fetchone()[0]
+                    cur.execute(f"DROP TABLE {changed}")
+                cur.execute(f"DROP TABLE {src}")
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            finally:
+                cur.close()
+        return result
+
+    def load_facts(self, facts: dict[str, tuple[Path, list[str]]], mode: str = "full") -> dict[str, tuple[int, int]]:
+        """
+        Load ``{table: (path, columns)}`` in one transaction; returns
+        ``{table: (rows replaced, rows inserted)}``.
+        """
+        loaded = {}
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                for table_name, (path, columns) in facts.items():
+                    target = f"{self.schema}.{table_name}"
+                    stage = f"stage_{table_name}"
+                    rows = self._stage(cur, stage, table_name, columns, path)
+                    if self._columns(cur, table_name) is None:
+                        cur.execute(f"CREATE TABLE {target} AS SELECT * FROM {stage} LIMIT 0")
+                    self._ensure_fact_id(cur, table_name)
+
+                    if mode in ("full", "bulk"):
+                        cur.execute(f"DELETE FROM {target}")
+                    else:  # partition / attach: replace the partition's date keys
+                        dcol = date_column(table_name)
+                        cur.execute(f"DELETE FROM {target} WHERE {dcol} IN (SELECT DISTINCT {dcol} FROM {stage})")
+                    replaced = cur.fetchone()[0]
+                    col_list = ", ".join(columns)
+                    cur.execute(f"INSERT INTO {target} ({col_list}) SELECT {col_list} FROM {stage}")
+                    cur.execute(f"DROP TABLE {stage}")
+                    loaded[table_name] = (replaced, rows)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            finally:
+                cur.close()
+        return loaded
+
+
+_targets: dict[str, DuckDBTarget] = {}
+_targets_lock = threading.Lock()
+
+
+def get_target(name: str) -> DuckDBTarget:
+    """The process-wide instance of a non-Postgres target (the loaders share it under run_all.py)."""
+    if name not in TARGETS or name == "postgres":
+        raise ValueError(f"Not an embedded load target: {name}")
+    with _targets_lock:
+        if name not in _targets:
+            _targets[name] = DuckDBTarget()
+        return _targets[name]
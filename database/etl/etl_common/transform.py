@@ -0,0 +1,143 @@
+"""
+Streaming row transforms that feed COPY directly.
+
+``TransformedCSV`` wraps an open CSV file and exposes a file-like ``read()``
+that ``cursor.copy_expert`` can consume. Rows are parsed, fixed column by
+column and re-encoded one block at a time, so memory stays constant and no
+intermediate ``.clean.csv`` is ever written.
+
+Usage:
+    with open_transformed(csv_path, {"regionkey": nullable_int}) as src:
+        cur.copy_expert("COPY t (...) FROM STDIN WITH (FORMAT csv, HEADER true, NULL '')", src)
+
+A transform takes the raw cell text and returns the cleaned text, or None for
+SQL NULL (written as an empty cell, so COPY must use ``NULL ''``).
+"""
+
+import csv
+import io
+import math
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable
+
+from etl_common.sources import open_source
+from etl_common.streams import BlockStream
+
+Transform = Callable[[str], "str | None"]
+
+_NULL_TOKENS = {"", "nan", "NaN", "NULL", "null", "None", "<NA>"}
+
+
+# -------------------------------------------------------------------
+# Column transforms
+# -------------------------------------------------------------------
+def nullable_int(value: str) -> str | None:
+    """
+    '2' / '2.0' -> '2'; '' / 'nan' / garbage -> NULL.
+
+    Same semantics as pd.to_numeric(errors="coerce").astype("Int64"): values
+    that are not numbers become NULL, fractional values are an error.
+    """
+    if value in _NULL_TOKENS:
+        return None
+    try:
+        return str(int(value))
+    except ValueError:
+        pass
+    try:
+        num = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(num):
+        return None
+    if not num.is_integer():
+        raise ValueError(f"Cannot cast {value!r} to an integer key")
+    return str(int(num))
+
+
+def nullable_text(value: str) -> str | None:
+    """Map the usual pandas / Python null spellings to SQL NULL."""
+    return None if value in _NULL_TOKENS else value
+
+
+# -------------------------------------------------------------------
+# Stream adapter
+# -------------------------------------------------------------------
+class TransformedCSV(BlockStream):
+    """
+    Read-only text stream producing transformed CSV from a source CSV file.
+
+    - ``transforms`` maps column name -> Transform.
+    - ``columns`` (optional) projects / reorders output columns by header name.
+    - The header row is emitted, so COPY should use ``HEADER true``.
+    """
+
+    def __init__(
+        self,
+        source: Iterable[str],
+        transforms: dict[str, Transform] | None = None,
+        columns: list[str] | None = None,
+        block_rows: int = 5000,
+    ):
+        super().__init__()
+        self._reader = csv.reader(source)
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._block_rows = block_rows
+        self.rows = 0
+
+        header = next(self._reader, None)
+        if header is None:
+            self.header: list[str] = []
+            self._exhausted = True
+            return
+        self.header = header
+
+        out_cols = columns or header
+        missing = [c for c in out_cols if c not in header]
+        if missing:
+            raise KeyError(f"Columns not found in CSV header: {missing}")
+        unknown = [c for c in (transforms or {}) if c not in header]
+        if unknown:
+            raise KeyError(f"Transform columns not found in CSV header: {unknown}")
+
+        self._picks = [header.index(c) for c in out_cols]
+        self._fixes = [(header.index(c), fn) for c, fn in (transforms or {}).items()]
+        self._writer.writerow(out_cols)
+        self._pending = self._drain()
+
+    def _drain(self) -> str:
+        data = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return data
+
+    def _fill(self) -> str:
+        picks, fixes, write = self._picks, self._fixes, self._writer.writerow
+        n = 0
+        for row in self._reader:
+            for idx, fn in fixes:
+                row[idx] = fn(row[idx])
+            write([row[i] for i in picks])
+            n += 1
+            if n >= self._block_rows:
+                break
+        else:
+            self._exhausted = True
+        self.rows += n
+        return self._drain()
+
+
+@contextmanager
+def open_transformed(
+    csv_path: Path,
+    transforms: dict[str, Transform] | None = None,
+    columns: list[str] | None = None,
+):
+    """
+    Open ``csv_path`` (plain or compressed) and yield a TransformedCSV ready
+    for copy_expert. Parquet is typed already and is streamed as it is.
+    """
+    with open_source(csv_path, newline="", columns=columns) as f:
+        yield f if csv_path.suffix == ".parquet" else TransformedCSV(f, transforms, columns)
@@ -0,0 +1,342 @@
+"""
+Pre-load validation of fact partitions, before any load transaction.
+
+PostgreSQL only catches bad rows during COPY / the FK checks in phase 1,
+after the domain's earlier tables were already staged. The loaders
+therefore check each changed partition file first, with vectorized pandas
+operations over blocks of ``VALIDATE_CHUNK_ROWS`` rows (so memory does not
+grow with the file; the per-block findings are merged into one report):
+
+- NOT NULL : columns that are NOT NULL in the live table (catalog, i.e.
+             ddl/02_create_facts.sql)
+- FK       : every single-column FK value must exist in the referenced
+             dimension; key sets are read once and cached (``DIMENSION_KEYS``)
+- range    : value bounds from ``RANGES`` (non-negative quantities, ...)
+- duplicate: duplicate natural keys from ``NATURAL_KEYS``, also across
+             blocks (hashes of the keys already seen are kept)
+
+All problems of all files are collected into one compact reject report
+(count plus a few example rows per rule) and the load is refused with
+``PartitionRejected`` before a single row is COPYed. The DDL does not
+enforce the natural keys, so duplicates are only warnings unless
+ETL_STRICT_GRAIN=1.
+
+The checks use their own short read-only transaction; the key cache is
+shared by the loaders of a process (run_all.py / backfill.py), and a loader
+that upserts dimensions clears only those dimensions' entries.
+"""
+
+import os
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from etl_common.keys import SURROGATE_KEYS, code_columns
+from etl_common.staging import StageValidationError, foreign_keys, not_null_columns
+
+# Natural key per fact: the grain promised by ddl/02_create_facts.sql.
+NATURAL_KEYS = {
+    "factsales": ["invoicenumber", "invoicelineno"],
+    "factorders": ["ordernumber", "orderlineno"],
+    "factinventory": ["datekey", "productkey", "warehousekey"],
+    "factproduction": ["datekey", "productkey", "warehousekey"],
+    "factsalestarget": ["datekey", "regionkey", "salesrepkey", "productkey"],
+    "factfinancepl": ["datekey", "glaccountkey", "regionkey"],
+    "factfinancebs": ["datekey", "glaccountkey", "regionkey"],
+    "factfinancecf": ["datekey", "glaccountkey", "regionkey"],
+}
+
+# column -> (min, max); None = unbounded. Nulls are left to the NOT NULL rule.
+RANGES = {
+    "factsales": {"quantity": (0, None), "listprice": (0, None), "discountamount": (0, None)},
+    "factorders": {
+        "orderlineno": (1, None),
+        "orderedqty": (0, None),
+        "shippedqty": (0, None),
+        "cancelledqty": (0, None),
+    },
+    "factinventory": {"averageagedays": (0, None)},
+    "factproduction": {
+        "producedqty": (0, None),
+        "scrapqty": (0, None),
+        "machinehours": (0, 24),
+        "downtimehours": (0, 24),
+    },
+    "factsalestarget": {"targetrevenue": (0, None), "targetquantity": (0, None)},
+}
+
+# Example rows / values shown per problem in the report.
+SAMPLE = 5
+
+# Rows read and checked at a time.
+VALIDATE_CHUNK_ROWS = 500_000
+
+# Order of the rules in a report, as check_frame() applies them.
+RULE_ORDER = ("NOT NULL", "FK", "range", "duplicate")
+
+# Reject (instead of warn about) duplicate natural keys.
+STRICT_GRAIN = os.environ.get("ETL_STRICT_GRAIN", "0") == "1"
+
+
+class PartitionRejected(StageValidationError):
+    def __init__(self, reports: list["RejectReport"]):
+        self.reports = reports
+        super().__init__("Rejected before loading:\n" + "\n".join(r.summary() for r in reports))
+
+
+@dataclass
+class Problem:
+    rule: str
+    column: str
+    rows: int
+    examples: list[int]  # 1-based data row numbers (header not counted)
+    values: list = field(default_factory=list)
+
+    def __str__(self) -> str:
+        text = f"{self.rule} {self.column}: {self.rows:,} rows (e.g. row {', '.join(map(str, self.examples))}"
+        if self.values:
+            text += f"; values {', '.join(map(str, self.values))}"
+        return text + ")"
+
+
+@dataclass
+class RejectReport:
+    table_name: str
+    path: Path
+    rows: int
+    problems: list[Problem]
+    warnings: list[Problem] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def summary(self) -> str:
+        head = f"  {self.table_name} ({self.path.name}, {self.rows:,} rows)"
+        lines = [f"    - {p}" for p in self.problems] + [f"    ~ warning: {p}" for p in self.warnings]
+        return "\n".join([head] + lines)
+
+
+class KeyCache:
+    """Thread-safe cache of dimension key sets, keyed by (table, column)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: dict[tuple[str, str], pd.Index] = {}
+        self._extra: dict[tuple[str, str], pd.Index] = {}
+        # Bumped by invalidate(): a key set read before it is not cached.
+        self._generation = 0
+
+    @staticmethod
+    def _key(ref_table: str, ref_col: str) -> tuple[str, str]:
+        # regclass text may or may not carry the schema, depending on search_path
+        return ref_table.rsplit(".", 1)[-1], ref_col
+
+    def get(self, cur, ref_table: str, ref_col: str) -> pd.Index:
+        key = self._key(ref_table, ref_col)
+        with self._lock:
+            keys = self._keys.get(key)
+            generation = self._generation
+        if keys is None:
+            cur.execute(f"SELECT DISTINCT {ref_col} FROM {ref_table}")
+            keys = pd.Index([r[0] for r in cur.fetchall()])
+            with self._lock:
+                if self._generation == generation:
+                    self._keys[key] = keys
+        with self._lock:
+            extra = self._extra.get(key)
+        return keys if extra is None else keys.union(extra)
+
+    def add_file(self, ref_table: str, ref_col: str, path: Path):
+        """Also accept the keys of a dimension file that is upserted in the same load."""
+        keys = pd.Index(read_partition(path, [ref_col])[ref_col].dropna().unique())
+        with self._lock:
+            self._extra[self._key(ref_table, ref_col)] = keys
+
+    def invalidate(self, *ref_tables: str):
+        """Forget the key sets of ``ref_tables`` (every dimension when none is given) after upserting them."""
+        tables = {self._key(t, "")[0] for t in ref_tables}
+        with self._lock:
+            for cached in (self._keys, self._extra):
+                for key in [k for k in cached if not tables or k[0] in tables]:
+                    del cached[key]
+            self._generation += 1
+
+
+DIMENSION_KEYS = KeyCache()
+
+
+@dataclass
+class Rules:
+    table_name: str
+    columns: list[str]
+    not_null: list[str]
+    foreign_keys: list[tuple[str, str, pd.Index]]  # (column, referenced table, key set)
+    ranges: dict[str, tuple[float | None, float | None]]
+    natural_key: list[str]
+
+
+def load_rules(cur, schema: str, table_name: str, columns: list[str], keys: KeyCache = DIMENSION_KEYS) -> Rules:
+    """Read the table's constraints and the referenced key sets (the only database work)."""
+    return Rules(
+        table_name,
+        columns,
+        [c for c in not_null_columns(cur, schema, table_name) if c in columns],
+        [
+            (col, ref_table, keys.get(cur, ref_table, ref_col))
+            for _, col, ref_table, ref_col in foreign_keys(cur, schema, table_name)
+            if col in columns
+        ],
+        {c: b for c, b in RANGES.get(table_name, {}).items() if c in columns},
+        [c for c in NATURAL_KEYS.get(table_name, []) if c in columns],
+    )
+
+
+def read_partition(path: Path, columns: list[str]) -> pd.DataFrame:
+    """
+    The file's ``columns`` as a DataFrame (CSV, compressed CSV or Parquet);
+    keys the file carries as natural codes are resolved (etl_common.keys).
+    """
+    codes = code_columns(path, columns)
+    read = [codes.get(c, c) for c in columns]
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+        df.columns = [c.lower() for c in df.columns]
+        df = df[read]
+    else:
+        # compression is inferred from the suffix (.gz / .zst)
+        df = pd.read_csv(
+            path, usecols=read, keep_default_na=True, low_memory=False, dtype={c: "string" for c in codes.values()}
+        )
+    if codes:
+        df = SURROGATE_KEYS.resolve_frame(df, codes)
+    return df[columns]
+
+
+def iter_partition(path: Path, columns: list[str], chunk_rows: int = VALIDATE_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """read_partition() in blocks of ``chunk_rows``; each block's index continues the file's row numbers."""
+    codes = code_columns(path, columns)
+    read = [codes.get(c, c) for c in columns]
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        by_lower = {n.lower(): n for n in parquet.schema_arrow.names}
+        chunks = (
+            batch.to_pandas().rename(columns=str.lower)
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=[by_lower[c] for c in read])
+        )
+    else:
+        chunks = pd.read_csv(
+            path, usecols=read, keep_default_na=True, low_memory=False, dtype={c: "string" for c in codes.values()},
+            chunksize=chunk_rows,
+        )
+    start = 0
+    for df in chunks:
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        if codes:
+            df = SURROGATE_KEYS.resolve_frame(df, codes)
+        yield df[columns]
+
+
+class SeenKeys:
+    """Hashes of the natural keys of the blocks already checked, to find duplicates across blocks."""
+
+    def __init__(self):
+        self._hashes = np.empty(0, dtype="uint64")
+
+    def duplicated(self, df: pd.DataFrame, natural_key: list[str]) -> pd.Series:
+        hashes = pd.util.hash_pandas_object(df[natural_key], index=False).to_numpy()
+        dup = df.duplicated(natural_key, keep="first") | np.isin(hashes, self._hashes)
+        self._hashes = np.union1d(self._hashes, hashes)
+        return dup
+
+
+def _problem(rule: str, column: str, mask: pd.Series, values: pd.Series | None = None) -> Problem | None:
+    n = int(mask.sum())
+    if not n:
+        return None
+    examples = [int(i) + 1 for i in mask[mask].index[:SAMPLE]]
+    sample = [] if values is None else list(pd.unique(values[mask].head(SAMPLE * 4)))[:SAMPLE]
+    return Problem(rule, column, n, examples, sample)
+
+
+def check_frame(df: pd.DataFrame, rules: Rules, seen: SeenKeys | None = None) -> tuple[list[Problem], list[Problem]]:
+    """(problems, warnings) found in ``df``; with ``seen``, keys of earlier blocks count as duplicates too."""
+    problems, warnings = [], []
+
+    for col in rules.not_null:
+        problems.append(_problem("NOT NULL", col, df[col].isna()))
+
+    for col, ref_table, keys in rules.foreign_keys:
+        values = df[col]
+        # CSV keys with blanks come in as floats (2.0); compare numerically.
+        if values.dtype.kind == "f" and keys.dtype.kind in "iu":
+            keys = keys.astype("float64")
+        missing = values.notna() & ~values.isin(keys)
+        problems.append(_problem("FK", f"{col} -> {ref_table}", missing, values))
+
+    for col, (lo, hi) in rules.ranges.items():
+        values = pd.to_numeric(df[col], errors="coerce")
+        bad = df[col].notna() & values.isna()  # not a number at all
+        if lo is not None:
+            bad |= values < lo
+        if hi is not None:
+            bad |= values > hi
+        bounds = f"[{'' if lo is None else lo}, {'' if hi is None else hi}]"
+        problems.append(_problem("range", f"{col} {bounds}", bad, df[col]))
+
+    if rules.natural_key:
+        if seen is None:
+            dup = df.duplicated(rules.natural_key, keep="first")
+        else:
+            dup = seen.duplicated(df, rules.natural_key)
+        found = _problem("duplicate", "(" + ", ".join(rules.natural_key) + ")", dup)
+        (problems if STRICT_GRAIN else warnings).append(found)
+
+    return [p for p in problems if p is not None], [w for w in warnings if w is not None]
+
+
+def _merge(into: dict[tuple[str, str], Problem], found: list[Problem]):
+    """Add one block's problems to the file's: counts add up, examples are kept in row order."""
+    for p in found:
+        prev = into.setdefault((p.rule, p.column), Problem(p.rule, p.column, 0, []))
+        prev.rows += p.rows
+        prev.examples = (prev.examples + p.examples)[:SAMPLE]
+        prev.values = list(dict.fromkeys(prev.values + p.values))[:SAMPLE]
+
+
+def validate_file(path: Path, rules: Rules, chunk_rows: int = VALIDATE_CHUNK_ROWS) -> RejectReport:
+    problems: dict[tuple[str, str], Problem] = {}
+    warnings: dict[tuple[str, str], Problem] = {}
+    rows = 0
+    seen = SeenKeys()
+    for df in iter_partition(path, rules.columns, chunk_rows):
+        found, warned = check_frame(df, rules, seen)
+        _merge(problems, found)
+        _merge(warnings, warned)
+        rows += len(df)
+    def ordered(found: dict[tuple[str, str], Problem]) -> list[Problem]:
+        return sorted(found.values(), key=lambda p: RULE_ORDER.index(p.rule))
+
+    return RejectReport(rules.table_name, path, rows, ordered(problems), ordered(warnings))
+
+
+def reject_bad_partitions(cur, schema: str, files: dict[str, tuple[Path, list[str]]]) -> list[RejectReport]:
+    """
+    Validate ``{table: (path, columns)}``; raise PartitionRejected listing
+    every problem, or return the reports (which may carry warnings).
+    """
+    reports = [
+        validate_file(path, load_rules(cur, schema, table_name, columns))
+        for table_name, (path, columns) in files.items()
+    ]
+    rejected = [r for r in reports if not r.ok]
+    if rejected:
+        raise PartitionRejected(rejected)
+    return reports
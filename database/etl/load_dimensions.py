@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Load the shared (conformed) dimension CSVs into PostgreSQL.
+
+Tables covered:
+  - dimdate
+  - dimregion
+  - dimcustomer
+  - dimproduct
+  - dimwarehouse
+  - dimsalesrep
+
+Dimensions are synced by natural key (see etl_common.dimensions): only new,
+changed and vanished (soft-deactivated) rows are written, in one MERGE, and
+nothing is truncated, so facts that reference them are never cascaded away.
+This step runs first in run_all.py; the fact loaders depend on it. When the
+facts are natively partitioned (ddl/18_partition_facts.sql), any month
+newly covered by dimdate also gets its fact partitions here.
+
+Dimension files whose content was already loaded (etl_common.manifest) are
+skipped unless --force is given.
+
+Usage:
+  python database/etl/load_dimensions.py
+  python database/etl/load_dimensions.py --force
+
+Arguments passed by run_all.py (run_date, --mode) are accepted and ignored:
+dimensions are not date-partitioned and are always upserted. The dimensions
+are one unit of etl_common.runstate.load_unit: retried on a lost connection
+and, under run_all.py (--run-id), checkpointed so a resumed run skips them.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from etl_common.db import connection
+from etl_common.dimensions import sync_dimension
+from etl_common.manifest import fingerprint, is_loaded, record_load
+from etl_common.partitions import ensure_fact_partitions
+from etl_common.runstate import completed_tables, get_run, load_unit
+from etl_common.sources import DATA_DIR, find_source
+from etl_common.targets import DEFAULT_TARGET, TARGETS, get_target
+from etl_common.validate import DIMENSION_KEYS
+
+SCHEMA = "analytics"
+
+DIM_CSV_DIR = DATA_DIR
+
+# Load order matters: customer / warehouse / salesrep reference dimregion.
+DIM_TABLES = ["dimdate", "dimregion", "dimcustomer", "dimproduct", "dimwarehouse", "dimsalesrep"]
+
+DIM_KEY_MAP = {
+    "dimdate": "datekey",
+    "dimregion": "regionkey",
+    "dimcustomer": "customerkey",
+    "dimproduct": "productkey",
+    "dimwarehouse": "warehousekey",
+    "dimsalesrep": "salesrepkey",
+}
+
+# Natural key the file is diffed on (dimregion has none besides its key).
+DIM_NATURAL_KEY_MAP = {
+    "dimdate": ["datekey"],
+    "dimregion": ["regionkey"],
+    "dimcustomer": ["customercode"],
+    "dimproduct": ["productcode"],
+    "dimwarehouse": ["warehousecode"],
+    "dimsalesrep": ["employeecode"],
+}
+
+DIM_COLUMN_MAP = {
+    "dimdate": [
+        "datekey", "fulldate", "year", "quarter", "month", "monthname",
+        "dayofmonth", "dayofweek", "dayname", "isweekday",
+    ],
+    "dimregion": ["regionkey", "countrycode", "countryname", "regionname", "cityname"],
+    "dimcustomer": [
+        "customerkey", "customercode", "customername", "customertype",
+        "customersegment", "regionkey", "channel", "isactive",
+    ],
+    "dimproduct": [
+        "productkey", "productcode", "productname", "brand", "category",
+        "subcategory", "uom", "isactive",
+    ],
+    "dimwarehouse": ["warehousekey", "warehousecode", "warehousename", "regionkey", "isactive"],
+    "dimsalesrep": ["salesrepkey", "employeecode", "fullname", "regionkey", "email", "isactive"],
+}
+
+
+def upsert_dim_table(cur, table_name: str, csv_path: Path, force: bool = False) -> int | None:
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV not found for dim table: {csv_path}")
+    fp = fingerprint(csv_path)
+    if not force and is_loaded(cur, SCHEMA, table_name, fp):
+        print(f"⏭ DIM {table_name} unchanged since last load, skipped.")
+        return None
+
+    print(f"➡ Syncing DIM {table_name} from {csv_path} ...")
+    result = sync_dimension(
+        cur, SCHEMA, table_name, DIM_KEY_MAP[table_name], DIM_NATURAL_KEY_MAP[table_name],
+        DIM_COLUMN_MAP[table_name], csv_path,
+    )
+    record_load(cur, SCHEMA, table_name, fp, result.rows, "upsert")
+    print(f"   ✔ DIM {table_name} synced ({result}).")
+    return result.rows
+
+
+def sync_dimensions_into(target):
+    """Sync every shared dimension into an embedded target (etl_common.targets)."""
+    for t in DIM_TABLES:
+        csv_path = find_source(DIM_CSV_DIR, t)
+        print(f"➡ Syncing DIM {t} from {csv_path} ...")
+        result = target.sync_dimension(t, DIM_KEY_MAP[t], DIM_NATURAL_KEY_MAP[t], DIM_COLUMN_MAP[t], csv_path)
+        print(f"   ✔ DIM {t} synced ({result}).")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load the shared dimension CSVs into PostgreSQL.")
+    p.add_argument("run_date", nargs="?", default=None, help="Ignored (dimensions are not partitioned)")
+    p.add_argument("--mode", default="full", help="Ignored (dimensions are always upserted)")
+    p.add_argument("--force", action="store_true", help="Reload files even if the load manifest says they are unchanged")
+    p.add_argument("--run-id", default=None, help="Checkpoint into this run (etl_common.runstate; set by run_all.py)")
+    p.add_argument("--target", choices=TARGETS, default=DEFAULT_TARGET, help="Where to load (default: $ETL_TARGET or postgres)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.target != "postgres":
+        target = get_target(args.target)
+        print(f"🦆 Loading dimensions into {target.name} ({target.path})")
+        print(f"📁 DIM dir  : {DIM_CSV_DIR}")
+        sync_dimensions_into(target)
+        print("✅ Dimension ETL completed successfully.")
+        return
+
+    print("🔌 Connecting to PostgreSQL for Dimension ETL...")
+    print(f"📁 DIM dir  : {DIM_CSV_DIR}")
+
+    try:
+        with connection() as conn:
+            cur = conn.cursor()
+            run = get_run(cur, SCHEMA, args.run_id) if args.run_id else None
+            if completed_tables(cur, SCHEMA, run).issuperset(DIM_TABLES):
+                print(f"⏭ Dimensions already loaded in run {run.run_id}, skipped.")
+                return
+
+        def load(cur):
+            rows = {t: upsert_dim_table(cur, t, find_source(DIM_CSV_DIR, t), args.force) for t in DIM_TABLES}
+
+            # Partitioned facts get a partition for every month dimdate now covers.
+            for t, n in ensure_fact_partitions(cur, SCHEMA).items():
+                if n:
+                    print(f"   ✔ Created {n} monthly partitions for {t}.")
+            return rows
+
+        load_unit(SCHEMA, run, "dimensions", load)
+        # Fact validation must see the new keys.
+        DIMENSION_KEYS.invalidate(*DIM_TABLES)
+        print("✅ Dimension ETL completed successfully.")
+
+    except Exception as ex:
+        print("❌ Error during Dimension ETL. Transaction rolled back.", file=sys.stderr)
+        print(ex, file=sys.stderr)
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,47 @@
 #!/usr/bin/env python
+"""
+Load Finance CSVs (dimglaccount + PL/BS/CF facts) into PostgreSQL.
+
+Usage:
+  python database/etl/load_finance.py
+  python database/etl/load_finance.py 20251221
+  python database/etl/load_finance.py 20251221 --mode partition
+  python database/etl/load_finance.py 20251221 --mode attach
+  python database/etl/load_finance.py 20251221 --force
+
+Files whose content was already loaded (see etl_common.manifest) are
+skipped unless --force is given.
+
+dimglaccount and then each fact table are loaded and committed on their own
+(etl_common.runstate.load_unit), so a failure or a lost connection late in
+the load keeps the tables committed before it. Under run_all.py (--run-id)
+every committed table is checkpointed and a resumed run skips it.
+"""
+
+import argparse
 import sys
-import os
 from pathlib import Path
 
-import psycopg2
-import pandas as pd
+from etl_common.db import connection
+from etl_common.dimensions import sync_dimension
+from etl_common.facts import LOAD_MODES, publish_fact, stage_fact
+from etl_common.keys import SURROGATE_KEYS
+from etl_common.manifest import fingerprint, is_loaded, record_load
+from etl_common.runstate import completed_tables, get_run, load_unit
+from etl_common.sources import DATA_DIR, find_source
+from etl_common.targets import DEFAULT_TARGET, TARGETS, get_target
+from etl_common.transform import nullable_int, open_transformed
+from etl_common.validate import DIMENSION_KEYS, reject_bad_partitions
 
-host = os.environ["PGHOST"]
-port = os.environ.get("PGPORT", "5432")
-db   = os.environ["PGDATABASE"]
-user = os.environ["PGUSER"]
-pwd  = os.environ["PGPASSWORD"]
-
-CONN_STR = f"postgresql://{user}:{pwd}@{host}:{port}/{db}?sslmode=require"
-#CONN_STR = os.environ["NEON_CONN_STR"]
 SCHEMA = "analytics"
 
-BASE_DIR = Path(__file__).resolve().parents[1]  # /database
-DIM_CSV_DIR = BASE_DIR / "mock_data" / "csv"
+DIM_CSV_DIR = DATA_DIR
 FACT_DAILY_ROOT = DIM_CSV_DIR / "daily"
 
 DIM_TABLE = "dimglaccount"
+DIM_KEY = "glaccountkey"
+DIM_NATURAL_KEY = ["glaccountcode"]
+DIM_COLUMNS = ["glaccountkey", "glaccountcode", "glaccountname", "statementtype", "category", "subcategory"]
 
 FACT_TABLES = ["factfinancepl", "factfinancebs", "factfinancecf"]
 
@@ -30,9 +51,7 @@ FACT_COLUMN_MAP = {
     "factfinancecf": ["datekey", "glaccountkey", "regionkey", "cashflowamount", "currency"],
 }
 
-
-def get_conn():
-    return psycopg2.connect(CONN_STR)
+FACT_TRANSFORMS = {"regionkey": nullable_int}
 
 
 def resolve_fact_dir(run_date: str | None = None) -> Path:
@@ -52,82 +71,143 @@ def resolve_fact_dir(run_date: str | None = None) -> Path:
     return sorted(candidates, key=lambda x: x.name)[-1]
 
 
-def truncate_tables(cur):
-    table_list = ", ".join([f"{SCHEMA}.{t}" for t in FACT_TABLES] + [f"{SCHEMA}.{DIM_TABLE}"])
-    print(f"🧹 Truncating Finance tables:\n  {table_list}")
-    cur.execute(f"TRUNCATE {table_list} RESTART IDENTITY CASCADE;")
-
-
-def load_dim_glaccount(cur):
-    csv_path = DIM_CSV_DIR / f"{DIM_TABLE}.csv"
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV not found for dim table: {csv_path}")
-
-    print(f"➡ Loading DIM {DIM_TABLE} from {csv_path} ...")
-    with csv_path.open("r", encoding="utf-8") as f:
-        cur.copy_expert(
-            f"COPY {SCHEMA}.{DIM_TABLE} FROM STDIN WITH (FORMAT csv, HEADER true)",
-            f,
-        )
-    print(f"   ✔ DIM {DIM_TABLE} loaded.")
-
-
-def load_fact_table(cur, table_name: str, fact_dir: Path):
-    csv_path = fact_dir / f"{table_name}.csv"
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV not found for fact table: {csv_path}")
-
-    df = pd.read_csv(csv_path)
-
-    if "regionkey" in df.columns:
-        df["regionkey"] = pd.to_numeric(df["regionkey"], errors="coerce").astype("Int64")
-
-    tmp_path = csv_path.with_suffix(".clean.csv")
-    df.to_csv(tmp_path, index=False, na_rep="")
+def upsert_dim_glaccount(cur, force: bool = False) -> int | None:
+    csv_path = find_source(DIM_CSV_DIR, DIM_TABLE)
+    fp = fingerprint(csv_path)
+    if not force and is_loaded(cur, SCHEMA, DIM_TABLE, fp):
+        print(f"⏭ DIM {DIM_TABLE} unchanged since last load, skipped.")
+        return None
+    print(f"➡ Syncing DIM {DIM_TABLE} from {csv_path} ...")
+    result = sync_dimension(cur, SCHEMA, DIM_TABLE, DIM_KEY, DIM_NATURAL_KEY, DIM_COLUMNS, csv_path)
+    record_load(cur, SCHEMA, DIM_TABLE, fp, result.rows, "upsert")
+    print(f"   ✔ DIM {DIM_TABLE} synced ({result}).")
+    return result.rows
+
+
+def validate_fact_tables(cur, fact_dir: Path, mode: str = "full", force: bool = False, done: set[str] = frozenset()):
+    """Phase 0: vectorized checks of every changed fact file; raises PartitionRejected."""
+    files = {}
+    for t in FACT_TABLES:
+        if t in done:
+            continue
+        path = find_source(fact_dir, t)
+        if force or not is_loaded(cur, SCHEMA, t, fingerprint(path), mode):
+            files[t] = (path, FACT_COLUMN_MAP[t])
+    SURROGATE_KEYS.prepare(cur, SCHEMA, files)
+    for report in reject_bad_partitions(cur, SCHEMA, files):
+        if report.warnings:
+            print(f"⚠ {report.summary().strip()}")
+
+
+def stage_fact_table(cur, table_name: str, fact_dir: Path, mode: str = "full", force: bool = False):
+    csv_path = find_source(fact_dir, table_name)
+    fp = fingerprint(csv_path)
+    if not force and is_loaded(cur, SCHEMA, table_name, fp, mode):
+        print(f"⏭ FACT {table_name} unchanged since last load ({csv_path}), skipped.")
+        return None
 
     columns = FACT_COLUMN_MAP[table_name]
-    col_list_sql = ", ".join(columns)
-
-    print(f"➡ Loading FACT {table_name} from {tmp_path} ...")
-    with tmp_path.open("r", encoding="utf-8") as f:
-        cur.copy_expert(
-            f"COPY {SCHEMA}.{table_name} ({col_list_sql}) FROM STDIN WITH (FORMAT csv, HEADER true, NULL '')",
-            f,
-        )
-    print(f"   ✔ FACT {table_name} loaded.")
 
-
-def main():
-    run_date = sys.argv[1] if len(sys.argv) > 1 else None
-    fact_dir = resolve_fact_dir(run_date)
+    # regionkey may arrive as float text ("2.0") or blank; fix it while streaming.
+    print(f"➡ Staging FACT {table_name} from {csv_path} ...")
+    with open_transformed(csv_path, FACT_TRANSFORMS, columns) as src:
+        staged = stage_fact(cur, SCHEMA, table_name, columns, src, mode, fp, fact_dir.name)
+    c = staged.copy
+    print(f"   ✔ FACT {table_name} staged and validated ({staged.rows} rows, {c.mb:.1f} MB, {c.rows_per_sec:,.0f} rows/s).")
+    return staged
+
+
+def publish_fact_table(cur, staged):
+    replaced, inserted = publish_fact(cur, staged)
+    print(f"   ✔ FACT {staged.table_name} published ({replaced} old rows -> {inserted} rows).")
+
+
+def load_facts_into(target, fact_dir: Path, mode: str = "full"):
+    """Load every fact of the partition into an embedded target (etl_common.targets)."""
+    facts = {t: (find_source(fact_dir, t), FACT_COLUMN_MAP[t]) for t in FACT_TABLES}
+    print(f"➡ Loading FACT {', '.join(facts)} from {fact_dir} ...")
+    for t, (replaced, inserted) in target.load_facts(facts, mode).items():
+        print(f"   ✔ FACT {t} published ({replaced} old rows -> {inserted} rows).")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load Finance CSVs into PostgreSQL.")
+    p.add_argument("run_date", nargs="?", default=None, help="YYYYMMDD partition (default: latest)")
+    p.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="full",
+        help="full: replace the whole table; partition: replace only the partition's date keys; "
+        "attach: rebuild the touched months and swap them in as partitions; "
+        "bulk: truncate and COPY FREEZE without indexes/FKs, then rebuild (backfills)",
+    )
+    p.add_argument("--force", action="store_true", help="Reload files even if the load manifest says they are unchanged")
+    p.add_argument("--run-id", default=None, help="Checkpoint into this run (etl_common.runstate; set by run_all.py)")
+    p.add_argument("--target", choices=TARGETS, default=DEFAULT_TARGET, help="Where to load (default: $ETL_TARGET or postgres)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fact_dir = resolve_fact_dir(args.run_date)
+
+    if args.target != "postgres":
+        target = get_target(args.target)
+        print(f"🦆 Loading Finance into {target.name} ({target.path})")
+        print(f"📁 DIM dir  : {DIM_CSV_DIR}")
+        print(f"📁 FACT dir : {fact_dir}")
+        print(f"🧭 Mode     : {args.mode}")
+        csv_path = find_source(DIM_CSV_DIR, DIM_TABLE)
+        print(f"➡ Syncing DIM {DIM_TABLE} from {csv_path} ...")
+        result = target.sync_dimension(DIM_TABLE, DIM_KEY, DIM_NATURAL_KEY, DIM_COLUMNS, csv_path)
+        print(f"   ✔ DIM {DIM_TABLE} synced ({result}).")
+        load_facts_into(target, fact_dir, args.mode)
+        print("✅ Finance ETL completed successfully.")
+        return
 
     print("🔌 Connecting to PostgreSQL for Finance ETL...")
     print(f"📁 DIM dir  : {DIM_CSV_DIR}")
     print(f"📁 FACT dir : {fact_dir}")
-
-    conn = get_conn()
-    conn.autocommit = False
+    print(f"🧭 Mode     : {args.mode}")
 
     try:
-        cur = conn.cursor()
-
-        truncate_tables(cur)
-        load_dim_glaccount(cur)
+        # Phase 0: reject bad files before any table is loaded.
+        with connection() as conn:
+            cur = conn.cursor()
+            run = get_run(cur, SCHEMA, args.run_id) if args.run_id else None
+            done = completed_tables(cur, SCHEMA, run)
+            # dimglaccount is upserted by the load itself; accept its new keys too.
+            DIMENSION_KEYS.add_file(f"{SCHEMA}.{DIM_TABLE}", DIM_KEY, find_source(DIM_CSV_DIR, DIM_TABLE))
+            SURROGATE_KEYS.add_file(DIM_TABLE, find_source(DIM_CSV_DIR, DIM_TABLE))
+            validate_fact_tables(cur, fact_dir, args.mode, args.force, done)
+
+        if DIM_TABLE in done:
+            print(f"⏭ DIM {DIM_TABLE} already loaded in run {run.run_id}, skipped.")
+        else:
+            load_unit(SCHEMA, run, "finance", lambda cur: {DIM_TABLE: upsert_dim_glaccount(cur, args.force)})
+            DIMENSION_KEYS.invalidate(DIM_TABLE)
 
         for t in FACT_TABLES:
-            load_fact_table(cur, t, fact_dir)
+            if t in done:
+                print(f"⏭ FACT {t} already loaded in run {run.run_id}, skipped.")
+                continue
+
+            def load(cur, t=t):
+                # Stage + validate, then publish right before this table's COMMIT.
+                staged = stage_fact_table(cur, t, fact_dir, args.mode, args.force)
+                if staged is None:
+                    return {t: None}
+                publish_fact_table(cur, staged)
+                return {t: staged.rows}
+
+            load_unit(SCHEMA, run, "finance", load)
 
-        conn.commit()
         print("✅ Finance ETL completed successfully.")
 
     except Exception as ex:
-        conn.rollback()
-        print("❌ Error during Finance ETL. Transaction rolled back.", file=sys.stderr)
+        print("❌ Error during Finance ETL. The failed table was rolled back.", file=sys.stderr)
         print(ex, file=sys.stderr)
         raise
-    finally:
-        conn.close()
-        print("🔚 Connection closed.")
 
 
 if __name__ == "__main__":
@@ -3,30 +3,38 @@
 Task 12 - Load Inventory & Operations CSVs into PostgreSQL.
 
 Supports fact daily partitions:
-- Facts: database/mock_data/csv/daily/YYYYMMDD/*.csv
+- Facts: database/mock_data/csv/daily/YYYYMMDD/*.csv (or .csv.gz / .csv.zst)
 
 Usage:
   python database/etl/load_operations.py
   python database/etl/load_operations.py 20251221
+  python database/etl/load_operations.py 20251221 --force
+
+Files whose content was already loaded (see etl_common.manifest) are
+skipped unless --force is given.
+
+Each fact table is staged, published and committed on its own
+(etl_common.runstate.load_unit), so a failure or a lost connection in one
+table keeps the tables committed before it. Under run_all.py (--run-id)
+every committed table is checkpointed and a resumed run skips it.
 """
 
+import argparse
 import sys
-import os
 from pathlib import Path
 
-import psycopg2
+from etl_common.db import connection
+from etl_common.facts import LOAD_MODES, publish_fact, stage_fact
+from etl_common.keys import SURROGATE_KEYS
+from etl_common.manifest import fingerprint, is_loaded
+from etl_common.runstate import completed_tables, get_run, load_unit
+from etl_common.sources import DATA_DIR, find_source, open_source
+from etl_common.targets import DEFAULT_TARGET, TARGETS, get_target
+from etl_common.validate import reject_bad_partitions
 
-host = os.environ["PGHOST"]
-port = os.environ.get("PGPORT", "5432")
-db   = os.environ["PGDATABASE"]
-user = os.environ["PGUSER"]
-pwd  = os.environ["PGPASSWORD"]
-CONN_STR = f"postgresql://{user}:{pwd}@{host}:{port}/{db}?sslmode=require"
-#CONN_STR = os.environ["NEON_CONN_STR"]
 SCHEMA = "analytics"
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-DIM_CSV_DIR = BASE_DIR / "mock_data" / "csv"
+DIM_CSV_DIR = DATA_DIR
 FACT_DAILY_ROOT = DIM_CSV_DIR / "daily"
 
 FACT_TABLES = ["factinventory", "factproduction"]
@@ -43,10 +51,6 @@ FACT_COLUMN_MAP = {
 }
 
 
-def get_conn():
-    return psycopg2.connect(CONN_STR)
-
-
 def resolve_fact_dir(run_date: str | None = None) -> Path:
     if run_date:
         p = FACT_DAILY_ROOT / run_date
@@ -64,62 +68,118 @@ def resolve_fact_dir(run_date: str | None = None) -> Path:
     return sorted(candidates, key=lambda x: x.name)[-1]
 
 
-def truncate_tables(cur):
-    table_list = ", ".join(f"{SCHEMA}.{t}" for t in FACT_TABLES)
-    print(f"🧹 Truncating Operations fact tables:\n  {table_list}")
-    cur.execute(f"TRUNCATE {table_list} RESTART IDENTITY CASCADE;")
+def validate_fact_tables(cur, fact_dir: Path, mode: str = "full", force: bool = False, done: set[str] = frozenset()):
+    """Phase 0: vectorized checks of every changed fact file; raises PartitionRejected."""
+    files = {}
+    for t in FACT_TABLES:
+        if t in done:
+            continue
+        path = find_source(fact_dir, t)
+        if force or not is_loaded(cur, SCHEMA, t, fingerprint(path), mode):
+            files[t] = (path, FACT_COLUMN_MAP[t])
+    SURROGATE_KEYS.prepare(cur, SCHEMA, files)
+    for report in reject_bad_partitions(cur, SCHEMA, files):
+        if report.warnings:
+            print(f"⚠ {report.summary().strip()}")
 
 
-def load_fact_table(cur, table_name: str, csv_path: Path):
+def stage_fact_table(cur, table_name: str, csv_path: Path, mode: str = "full", force: bool = False):
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found for fact table: {csv_path}")
 
-    with csv_path.open("r", encoding="utf-8") as f:
-        rows = max(0, sum(1 for _ in f) - 1)
+    fp = fingerprint(csv_path)
+    if not force and is_loaded(cur, SCHEMA, table_name, fp, mode):
+        print(f"⏭ FACT {table_name} unchanged since last load ({csv_path}), skipped.")
+        return None
 
     columns = FACT_COLUMN_MAP[table_name]
-    col_list_sql = ", ".join(columns)
 
-    print(f"➡ Loading FACT {table_name} from {csv_path} ({rows} rows)...")
+    print(f"➡ Staging FACT {table_name} from {csv_path} ...")
+
+    with open_source(csv_path, columns=columns) as f:
+        staged = stage_fact(cur, SCHEMA, table_name, columns, f, mode, fp, csv_path.parent.name)
+
+    c = staged.copy
+    print(f"   ✔ FACT {table_name} staged and validated ({staged.rows} rows, {c.mb:.1f} MB, {c.rows_per_sec:,.0f} rows/s).")
+    return staged
+
+
+def publish_fact_table(cur, staged):
+    replaced, inserted = publish_fact(cur, staged)
+    print(f"   ✔ FACT {staged.table_name} published ({replaced} old rows -> {inserted} rows).")
 
-    with csv_path.open("r", encoding="utf-8") as f:
-        copy_sql = f"""
-            COPY {SCHEMA}.{table_name} ({col_list_sql})
-            FROM STDIN WITH (FORMAT csv, HEADER true)
-        """
-        cur.copy_expert(copy_sql, f)
 
-    print(f"   ✔ FACT {table_name} loaded.")
+def load_facts_into(target, fact_dir: Path, mode: str = "full"):
+    """Load every fact of the partition into an embedded target (etl_common.targets)."""
+    facts = {t: (find_source(fact_dir, t), FACT_COLUMN_MAP[t]) for t in FACT_TABLES}
+    print(f"➡ Loading FACT {', '.join(facts)} from {fact_dir} ...")
+    for t, (replaced, inserted) in target.load_facts(facts, mode).items():
+        print(f"   ✔ FACT {t} published ({replaced} old rows -> {inserted} rows).")
 
 
-def main():
-    run_date = sys.argv[1] if len(sys.argv) > 1 else None
-    fact_dir = resolve_fact_dir(run_date)
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load Operations CSVs into PostgreSQL.")
+    p.add_argument("run_date", nargs="?", default=None, help="YYYYMMDD partition (default: latest)")
+    p.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="full",
+        help="full: replace the whole table; partition: replace only the partition's date keys; "
+        "attach: rebuild the touched months and swap them in as partitions; "
+        "bulk: truncate and COPY FREEZE without indexes/FKs, then rebuild (backfills)",
+    )
+    p.add_argument("--force", action="store_true", help="Reload files even if the load manifest says they are unchanged")
+    p.add_argument("--run-id", default=None, help="Checkpoint into this run (etl_common.runstate; set by run_all.py)")
+    p.add_argument("--target", choices=TARGETS, default=DEFAULT_TARGET, help="Where to load (default: $ETL_TARGET or postgres)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fact_dir = resolve_fact_dir(args.run_date)
+
+    if args.target != "postgres":
+        target = get_target(args.target)
+        print(f"🦆 Loading Operations into {target.name} ({target.path})")
+        print(f"📁 FACT dir : {fact_dir}")
+        print(f"🧭 Mode     : {args.mode}")
+        load_facts_into(target, fact_dir, args.mode)
+        print("✅ Operations ETL completed successfully.")
+        return
 
     print("🔌 Connecting to PostgreSQL for Operations ETL...")
     print(f"📁 FACT dir : {fact_dir}")
-
-    conn = get_conn()
-    conn.autocommit = False
+    print(f"🧭 Mode     : {args.mode}")
 
     try:
-        cur = conn.cursor()
-        truncate_tables(cur)
+        # Phase 0: reject bad files before any table is loaded.
+        with connection() as conn:
+            cur = conn.cursor()
+            run = get_run(cur, SCHEMA, args.run_id) if args.run_id else None
+            done = completed_tables(cur, SCHEMA, run)
+            validate_fact_tables(cur, fact_dir, args.mode, args.force, done)
 
         for t in FACT_TABLES:
-            load_fact_table(cur, t, fact_dir / f"{t}.csv")
+            if t in done:
+                print(f"⏭ FACT {t} already loaded in run {run.run_id}, skipped.")
+                continue
+
+            def load(cur, t=t):
+                # Stage + validate, then publish right before this table's COMMIT.
+                staged = stage_fact_table(cur, t, find_source(fact_dir, t), args.mode, args.force)
+                if staged is None:
+                    return {t: None}
+                publish_fact_table(cur, staged)
+                return {t: staged.rows}
+
+            load_unit(SCHEMA, run, "operations", load)
 
-        conn.commit()
         print("✅ Operations ETL completed successfully.")
 
     except Exception as ex:
-        conn.rollback()
-        print("❌ Error during Operations ETL. Transaction rolled back.", file=sys.stderr)
+        print("❌ Error during Operations ETL. The failed table was rolled back.", file=sys.stderr)
         print(ex, file=sys.stderr)
         raise
-    finally:
-        conn.close()
-        print("🔚 Connection closed.")
 
 
 if __name__ == "__main__":
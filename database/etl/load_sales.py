@@ -1,72 +1,74 @@
 #!/usr/bin/env python
 """
-Task 12 - Load Inventory & Operations CSVs into PostgreSQL.
+Load Sales CSVs (shared dimensions + sales facts) into PostgreSQL.
 
 Tables covered:
-  Facts:
-    - factinventory
-    - factproduction
-
-Assumes Dimensions (dimdate, dimproduct, dimwarehouse, dimregion, etc.)
-have already been loaded by load_sales.py.
+  Dimensions (database/mock_data/csv/*.csv, synced as in load_dimensions.py):
+    - dimdate, dimregion, dimcustomer, dimproduct, dimwarehouse, dimsalesrep
+  Facts (database/mock_data/csv/daily/YYYYMMDD/):
+    - factsales
+    - factorders
+    - factsalestarget
+
+Everything is one transaction: the dimensions are synced, the facts are
+COPYed into their stages concurrently (one COPY-pool connection per table,
+see etl_common.parallel_copy), validated, and published together right
+before COMMIT. Readers see all of it or none of it.
+
+Usage:
+  python database/etl/load_sales.py
+  python database/etl/load_sales.py 20251221
+  python database/etl/load_sales.py 20251221 --mode partition --workers 3
+
+Files whose content was already loaded (see etl_common.manifest) are
+skipped unless --force is given. When the dimensions are checkpointed in the
+run (run_all.py's dimensions step, --run-id), they are not synced again and
+the transaction only touches the facts.
+
+The whole load is one unit of etl_common.runstate.load_unit: a lost
+connection retries it on a new one, and under run_all.py (--run-id) its
+fact tables are checkpointed together, so a resumed run skips them.
 """
 
+import argparse
 import sys
 from pathlib import Path
-from datetime import datetime
-
-import psycopg2
-
-import os
-host = os.environ["PGHOST"]
-port = os.environ.get("PGPORT", "5432")
-db   = os.environ["PGDATABASE"]
-user = os.environ["PGUSER"]
-pwd  = os.environ["PGPASSWORD"]
 
-CONN_STR = f"postgresql://{user}:{pwd}@{host}:{port}/{db}?sslmode=require"
-#CONN_STR = os.environ["NEON_CONN_STR"]
+import load_dimensions
+from etl_common.db import connection
+from etl_common.facts import LOAD_MODES, lock_fk_ddl, lock_tables, publish_fact, stage_fact
+from etl_common.keys import SURROGATE_KEYS
+from etl_common.manifest import fingerprint, is_loaded
+from etl_common.runstate import completed_tables, get_run, load_unit
+from etl_common.parallel_copy import copy_stages_concurrently
+from etl_common.sources import DATA_DIR, find_source, open_source
+from etl_common.targets import DEFAULT_TARGET, TARGETS, get_target
+from etl_common.validate import DIMENSION_KEYS, reject_bad_partitions
 
 SCHEMA = "analytics"
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-CSV_DIR = BASE_DIR / "mock_data" / "csv"
-DIM_CSV_DIR = BASE_DIR / "mock_data" / "csv"
+DIM_CSV_DIR = DATA_DIR
 FACT_DAILY_ROOT = DIM_CSV_DIR / "daily"
 
-FACT_TABLES = [
-    "factinventory",
-    "factproduction",
-]
+FACT_TABLES = ["factsales", "factorders", "factsalestarget"]
 
 FACT_COLUMN_MAP = {
-    "factinventory": [
-        "datekey",
-        "productkey",
-        "warehousekey",
-        "openingqty",
-        "inboundqty",
-        "outboundqty",
-        "closingqty",
-        "inventoryvalue",
-        "averageagedays",
-        "provisionamount",
+    "factsales": [
+        "datekey", "customerkey", "productkey", "regionkey", "salesrepkey", "warehousekey",
+        "invoicenumber", "invoicelineno", "quantity", "listprice", "discountamount",
+        "netsales", "cogs", "grossmargin", "currency",
     ],
-    "factproduction": [
-        "datekey",
-        "productkey",
-        "warehousekey",
-        "producedqty",
-        "scrapqty",
-        "machinehours",
-        "downtimehours",
+    "factorders": [
+        "ordernumber", "orderlineno", "orderdatekey", "customerkey", "productkey", "regionkey",
+        "warehousekey", "orderedqty", "requesteddeliverydate", "promiseddeliverydate",
+        "actualshipdate", "shippedqty", "cancelledqty", "isontime", "isinfull",
+    ],
+    "factsalestarget": [
+        "datekey", "regionkey", "salesrepkey", "productkey", "targetrevenue", "targetquantity",
     ],
 }
 
 
-def get_conn():
-    return psycopg2.connect(CONN_STR)
-
 def resolve_fact_dir(run_date: str | None = None) -> Path:
     """
     If run_date provided: use csv/daily/YYYYMMDD
@@ -85,76 +87,176 @@ def resolve_fact_dir(run_date: str | None = None) -> Path:
     if not candidates:
         raise FileNotFoundError(f"No daily partitions found under: {FACT_DAILY_ROOT}")
 
-    latest = sorted(candidates, key=lambda x: x.name)[-1]
-    return latest
-
-
-
-def truncate_tables(cur):
-    table_list = ", ".join(f"{SCHEMA}.{t}" for t in FACT_TABLES)
-    print(f"🧹 Truncating Operations fact tables:\n  {table_list}")
-    cur.execute(
-        f"""
-        TRUNCATE {table_list}
-        RESTART IDENTITY CASCADE;
-        """
+    return sorted(candidates, key=lambda x: x.name)[-1]
+
+
+def changed_fact_files(
+    cur, fact_dir: Path, mode: str = "full", force: bool = False, done: set[str] = frozenset()
+) -> dict[str, Path]:
+    """{table: path} of the facts whose file is not in the load manifest yet (or in ``done``)."""
+    files = {}
+    for t in FACT_TABLES:
+        if t in done:
+            continue
+        path = find_source(fact_dir, t)
+        if force or not is_loaded(cur, SCHEMA, t, fingerprint(path), mode):
+            files[t] = path
+    return files
+
+
+def validate_fact_tables(
+    cur,
+    fact_dir: Path,
+    mode: str = "full",
+    force: bool = False,
+    done: set[str] = frozenset(),
+    sync_dims: bool = True,
+):
+    """Phase 0: vectorized checks of every changed fact file; raises PartitionRejected."""
+    if sync_dims:
+        # The dimensions are synced in the load itself; accept their new keys too.
+        for t in load_dimensions.DIM_TABLES:
+            DIMENSION_KEYS.add_file(f"{SCHEMA}.{t}", load_dimensions.DIM_KEY_MAP[t], find_source(DIM_CSV_DIR, t))
+            SURROGATE_KEYS.add_file(t, find_source(DIM_CSV_DIR, t))
+    files = {t: (path, FACT_COLUMN_MAP[t]) for t, path in changed_fact_files(cur, fact_dir, mode, force, done).items()}
+    SURROGATE_KEYS.prepare(cur, SCHEMA, files)
+    for report in reject_bad_partitions(cur, SCHEMA, files):
+        if report.warnings:
+            print(f"⚠ {report.summary().strip()}")
+
+
+def sync_dimensions(cur, force: bool = False):
+    for t in load_dimensions.DIM_TABLES:
+        load_dimensions.upsert_dim_table(cur, t, find_source(DIM_CSV_DIR, t), force)
+
+
+def stage_fact_tables(cur, files: dict[str, Path], mode: str = "full", workers: int = 3) -> list:
+    if not files:
+        return []
+    copied = {}
+    if mode != "bulk":  # bulk COPYs FREEZE in this transaction (etl_common.bulk)
+        print(f"➡ COPYing FACT {', '.join(files)} into staging ({workers} connections) ...")
+        copied = copy_stages_concurrently(
+            SCHEMA,
+            {
+                t: (FACT_COLUMN_MAP[t], lambda p=path, c=FACT_COLUMN_MAP[t]: open_source(p, columns=c))
+                for t, path in files.items()
+            },
+            workers,
+        )
+
+    staged = []
+    for t, path in files.items():
+        columns = FACT_COLUMN_MAP[t]
+        print(f"➡ Staging FACT {t} from {path} ...")
+        if t in copied:
+            st = stage_fact(cur, SCHEMA, t, columns, None, mode, fingerprint(path), path.parent.name, copied[t])
+        else:
+            with open_source(path, columns=columns) as f:
+                st = stage_fact(cur, SCHEMA, t, columns, f, mode, fingerprint(path), path.parent.name)
+        c = st.copy
+        print(f"   ✔ FACT {t} staged and validated ({st.rows} rows, {c.mb:.1f} MB, {c.rows_per_sec:,.0f} rows/s).")
+        staged.append(st)
+    return staged
+
+
+def publish_fact_table(cur, staged):
+    replaced, inserted = publish_fact(cur, staged)
+    print(f"   ✔ FACT {staged.table_name} published ({replaced} old rows -> {inserted} rows).")
+
+
+def load_facts_into(target, fact_dir: Path, mode: str = "full"):
+    """Load every fact of the partition into an embedded target (etl_common.targets)."""
+    facts = {t: (find_source(fact_dir, t), FACT_COLUMN_MAP[t]) for t in FACT_TABLES}
+    print(f"➡ Loading FACT {', '.join(facts)} from {fact_dir} ...")
+    for t, (replaced, inserted) in target.load_facts(facts, mode).items():
+        print(f"   ✔ FACT {t} published ({replaced} old rows -> {inserted} rows).")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load Sales CSVs into PostgreSQL.")
+    p.add_argument("run_date", nargs="?", default=None, help="YYYYMMDD partition (default: latest)")
+    p.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="full",
+        help="full: replace the whole table; partition: replace only the partition's date keys; "
+        "attach: rebuild the touched months and swap them in as partitions; "
+        "bulk: truncate and COPY FREEZE without indexes/FKs, then rebuild (backfills)",
     )
-
-
-def load_fact_table(cur, table_name: str, csv_path: Path):
-    csv_path = CSV_DIR / f"{table_name}.csv"
-    if not csv_path.exists():
-        raise FileNotFoundError(f"CSV not found for fact table: {csv_path}")
-
-    with csv_path.open("r", encoding="utf-8") as f:
-        line_count = sum(1 for _ in f)
-    rows = max(0, line_count - 1)
-
-    columns = FACT_COLUMN_MAP[table_name]
-    col_list_sql = ", ".join(columns)
-
-    print(f"➡ Loading FACT {table_name} from {csv_path} ({rows} rows)...")
-
-    with csv_path.open("r", encoding="utf-8") as f:
-        copy_sql = f"""
-            COPY {SCHEMA}.{table_name} ({col_list_sql})
-            FROM STDIN
-            WITH (FORMAT csv, HEADER true)
-        """
-        cur.copy_expert(copy_sql, f)
-
-    print(f"   ✔ FACT {table_name} loaded.")
-
-
-def main():
-    run_date = sys.argv[1] if len(sys.argv) > 1 else None
-    fact_dir = resolve_fact_dir(run_date)
-
-    print("🔌 Connecting to PostgreSQL for Operations ETL...")
+    p.add_argument("--workers", type=int, default=3, help="Fact files COPYed concurrently (default: 3)")
+    p.add_argument("--force", action="store_true", help="Reload files even if the load manifest says they are unchanged")
+    p.add_argument("--run-id", default=None, help="Checkpoint into this run (etl_common.runstate; set by run_all.py)")
+    p.add_argument("--target", choices=TARGETS, default=DEFAULT_TARGET, help="Where to load (default: $ETL_TARGET or postgres)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fact_dir = resolve_fact_dir(args.run_date)
+
+    if args.target != "postgres":
+        target = get_target(args.target)
+        print(f"🦆 Loading Sales into {target.name} ({target.path})")
+        print(f"📁 DIM dir  : {DIM_CSV_DIR}")
+        print(f"📁 FACT dir : {fact_dir}")
+        print(f"🧭 Mode     : {args.mode}")
+        load_dimensions.sync_dimensions_into(target)
+        load_facts_into(target, fact_dir, args.mode)
+        print("✅ Sales ETL completed successfully.")
+        return
+
+    print("🔌 Connecting to PostgreSQL for Sales ETL...")
+    print(f"📁 DIM dir  : {DIM_CSV_DIR}")
     print(f"📁 FACT dir : {fact_dir}")
-    
-    conn = get_conn()
-    conn.autocommit = False
+    print(f"🧭 Mode     : {args.mode}")
 
     try:
-        cur = conn.cursor()
-        truncate_tables(cur)
-
-        for t in FACT_TABLES:
-            csv_path = fact_dir / f"{t}.csv"
-            load_fact_table(cur, t, csv_path)
-
-        conn.commit()
-        print("✅ Operations ETL completed successfully.")
+        # Phase 0: reject bad files before the load transaction starts.
+        with connection() as conn:
+            cur = conn.cursor()
+            run = get_run(cur, SCHEMA, args.run_id) if args.run_id else None
+            done = completed_tables(cur, SCHEMA, run)
+            # Already synced by this run's dimensions step: do not sync them again.
+            sync_dims = not done.issuperset(load_dimensions.DIM_TABLES)
+            validate_fact_tables(cur, fact_dir, args.mode, args.force, done, sync_dims)
+
+        if done.issuperset(FACT_TABLES):
+            print(f"⏭ Sales facts already loaded in run {run.run_id}, skipped.")
+            return
+
+        def load(cur):
+            files = changed_fact_files(cur, fact_dir, args.mode, args.force, done)
+            for t in FACT_TABLES:
+                if t not in files:
+                    print(f"⏭ FACT {t} unchanged since last load, skipped.")
+            # Locks first: the dimension writes below must not run ahead of them.
+            lock_tables(cur, SCHEMA, list(files))
+            if sync_dims:
+                lock_fk_ddl(cur, SCHEMA, list(files), args.mode)
+                sync_dimensions(cur, args.force)
+            else:
+                print(f"⏭ Dimensions already synced in run {run.run_id}, skipped.")
+
+            # Phase 1: stage + validate every changed fact; live tables are only read.
+            staged = stage_fact_tables(cur, files, args.mode, args.workers)
+
+            # Phase 2: publish together right before COMMIT.
+            print("🔁 Publishing Sales facts ...")
+            for st in staged:
+                publish_fact_table(cur, st)
+            rows = {st.table_name: st.rows for st in staged}
+            return {t: rows.get(t) for t in FACT_TABLES if t not in done}
+
+        load_unit(SCHEMA, run, "sales", load)
+        if sync_dims:
+            DIMENSION_KEYS.invalidate(*load_dimensions.DIM_TABLES)
+        print("✅ Sales ETL completed successfully.")
 
     except Exception as ex:
-        conn.rollback()
-        print("❌ Error during Operations ETL. Transaction rolled back.", file=sys.stderr)
+        print("❌ Error during Sales ETL. Transaction rolled back.", file=sys.stderr)
         print(ex, file=sys.stderr)
         raise
-    finally:
-        conn.close()
-        print("🔚 Connection closed.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Maintain the monthly fact partitions created by ddl/18_partition_facts.sql.
+
+Usage:
+  python database/etl/manage_partitions.py list [--table factsales]
+  python database/etl/manage_partitions.py ensure
+  python database/etl/manage_partitions.py detach --before 20240101 [--table factsales] [--drop]
+
+detach removes whole months from the live tables with a metadata-only
+DETACH PARTITION; without --drop the detached tables are kept (as plain
+tables in the analytics schema) for archiving.
+"""
+
+import argparse
+import sys
+
+from etl_common.db import connection
+from etl_common.partitions import (
+    PARTITIONED_FACTS,
+    detach_before,
+    ensure_fact_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+SCHEMA = "analytics"
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Maintain monthly fact partitions.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    ls = sub.add_parser("list", help="List partitions and their DateKey ranges")
+    ls.add_argument("--table", choices=PARTITIONED_FACTS)
+
+    sub.add_parser("ensure", help="Create missing partitions for the whole dimdate range")
+
+    det = sub.add_parser("detach", help="Detach months that end on or before --before")
+    det.add_argument("--before", type=int, required=True, help="YYYYMMDD, e.g. 20240101")
+    det.add_argument("--table", choices=PARTITIONED_FACTS)
+    det.add_argument("--drop", action="store_true", help="Drop detached partitions")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tables = [args.table] if getattr(args, "table", None) else PARTITIONED_FACTS
+
+    try:
+        with connection() as conn:
+            cur = conn.cursor()
+
+            if args.command == "list":
+                for t in tables:
+                    if not is_partitioned(cur, SCHEMA, t):
+                        print(f"{t}: not partitioned")
+                        continue
+                    for name, lo, hi in list_partitions(cur, SCHEMA, t):
+                        print(f"{t:<16} {name:<28} [{lo}, {hi})")
+
+            elif args.command == "ensure":
+                for t, n in ensure_fact_partitions(cur, SCHEMA).items():
+                    print(f"✔ {t}: {n} partitions created")
+
+            elif args.command == "detach":
+                for t in tables:
+                    if not is_partitioned(cur, SCHEMA, t):
+                        continue
+                    for name in detach_before(cur, SCHEMA, t, args.before, args.drop):
+                        print(f"✔ {'Dropped' if args.drop else 'Detached'} {name}")
+
+            conn.commit()
+
+    except Exception as ex:
+        print("❌ Partition maintenance failed. Transaction rolled back.", file=sys.stderr)
+        print(ex, file=sys.stderr)
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,294 @@
 #!/usr/bin/env python
 """
-Task 14 - Run all ETL steps in sequence:
+Task 14 - Run all ETL steps as a dependency-aware pipeline:
 
-  1) Sales (dimensions + sales/order facts)
-  2) Operations (inventory + production)
-  3) Finance (PL/BS/CF)
+  1) Dimensions (shared dims, must finish first)
+  2) Sales / Operations / Finance facts, concurrently
+
+Steps run in-process: each loader's main() is called on a worker thread and
+takes its connection from the shared pool (etl_common.db), so a run pays for
+one interpreter start and one TLS handshake per pooled connection. Output is
+streamed live with a [step] prefix, and per-step wall time is reported at
+the end. If any step fails, the statements of running steps are cancelled
+(their transactions roll back) and pending steps are skipped.
+
+Every invocation belongs to a run in analytics.etl_run (etl_common.runstate).
+The loaders commit table by table and checkpoint each table into the run,
+so rerunning a failed run_date (same --mode) resumes it at the first table
+that did not finish; --restart starts over with a new run.
+
+--target duckdb (or ETL_TARGET=duckdb) loads a local DuckDB file instead of
+PostgreSQL (etl_common.targets); no database connection or run state is
+used then.
 
 Usage (from repo root):
   python database/etl/run_all.py
   python database/etl/run_all.py 20251221
+  python database/etl/run_all.py 20251221 --workers 2
+  python database/etl/run_all.py 20251221 --mode partition
+  python database/etl/run_all.py 20251221 --force
+  python database/etl/run_all.py 20251221 --restart
+  python database/etl/run_all.py 20251221 --target duckdb
 """
 
-import subprocess
-from pathlib import Path
+import argparse
+import contextvars
+import importlib
+import os
 import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from etl_common.db import cancel_all, close_pool, connection
+from etl_common.facts import LOAD_MODES
+from etl_common.metrics import RUN_ID, set_run_id
+from etl_common.runstate import Run, begin_run, completed_tables, finish_run
+from etl_common.targets import DEFAULT_TARGET, TARGETS
+from load_sales import resolve_fact_dir
+
+SCHEMA = "analytics"
+
+# step name -> (loader module, upstream steps)
+STEPS = {
+    "dimensions": ("load_dimensions", []),
+    "sales": ("load_sales", ["dimensions"]),
+    "operations": ("load_operations", ["dimensions"]),
+    "finance": ("load_finance", ["dimensions"]),
+}
+
+DEFAULT_WORKERS = int(os.environ.get("ETL_WORKERS", "3"))
+
+_print_lock = threading.Lock()
+# Step whose output the current context writes; worker threads started by the
+# loaders run in a copy of it (etl_common.parallel_copy).
+_current_step: contextvars.ContextVar[str | None] = contextvars.ContextVar("etl_step", default=None)
+
+
+class StepOutput:
+    """
+    sys.stdout / sys.stderr stand-in that prefixes each line with the step
+    of the current context, including the loaders' worker threads. Lines
+    are written whole, under a lock, so concurrent steps never interleave
+    mid-line.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._partial = threading.local()
+
+    def write(self, text: str) -> int:
+        step = _current_step.get()
+        if step is None:
+            with _print_lock:
+                self.stream.write(text)
+            return len(text)
+
+        buf = getattr(self._partial, "buf", "") + text
+        *lines, self._partial.buf = buf.split("\n")
+        if lines:
+            with _print_lock:
+                for line in lines:
+                    self.stream.write(f"[{step}] {line}\n")
+                self.stream.flush()
+        return len(text)
 
+    def flush(self):
+        step = _current_step.get()
+        rest = getattr(self._partial, "buf", "")
+        if step is not None and rest:
+            self._partial.buf = ""
+            with _print_lock:
+                self.stream.write(f"[{step}] {rest}\n")
+        self.stream.flush()
 
-def run_script(path: Path, run_date: str | None):
-    print(f"\n🚀 Running: {path.name}" + (f" (run_date={run_date})" if run_date else ""))
 
-    cmd = [sys.executable, str(path)]
-    if run_date:
-        cmd.append(run_date)
+class Pipeline:
+    def __init__(self, run: Run, workers: int, force: bool = False, target: str = "postgres"):
+        self.run_id = run.run_id
+        self.run_date = run.run_date
+        self.mode = run.mode
+        self.force = force
+        self.target = target
+        self.workers = workers
+        self.cancelled = threading.Event()
+        self.status: dict[str, str] = {name: "pending" for name in STEPS}
+        self.elapsed: dict[str, float] = {}
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    def log(self, step: str, line: str, stream=None):
+        # Step threads are prefixed by StepOutput; the scheduler thread prefixes here.
+        if _current_step.get() is None:
+            line = f"[{step}] {line}"
+        print(line, file=stream or sys.stdout, flush=True)
 
-    if result.returncode != 0:
-        print(f"❌ Script failed: {path}", file=sys.stderr)
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print(result.stderr, file=sys.stderr)
-        raise SystemExit(result.returncode)
+    def run_step(self, name: str) -> int:
+        module_name, _ = STEPS[name]
+        argv = [self.run_date] if self.run_date else []
+        argv += ["--mode", self.mode, "--target", self.target]
+        if self.target == "postgres":
+            argv += ["--run-id", self.run_id]
+        if self.force:
+            argv.append("--force")
 
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print(result.stderr, file=sys.stderr)
+        token = _current_step.set(name)
+        start = time.perf_counter()
+        self.status[name] = "running"
+        try:
+            self.log(name, f"🚀 Running: {module_name}" + (f" (run_date={self.run_date})" if self.run_date else ""))
+            module = importlib.import_module(module_name)
+            try:
+                module.main(argv)
+                returncode = 0
+            except SystemExit as ex:
+                returncode = ex.code if isinstance(ex.code, int) else 1
+            except Exception:
+                if not self.cancelled.is_set():
+                    traceback.print_exc()
+                returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _current_step.reset(token)
+
+        self.elapsed[name] = time.perf_counter() - start
+        if self.cancelled.is_set() and returncode != 0:
+            self.status[name] = "cancelled"
+        else:
+            self.status[name] = "ok" if returncode == 0 else "failed"
+        return returncode
+
+    def cancel(self):
+        self.cancelled.set()
+        for name, state in self.status.items():
+            if state == "running":
+                self.log(name, "⛔ Cancelling ...", sys.stderr)
+        # Running steps get QueryCanceled on their current statement and roll back.
+        cancel_all()
+
+    def run(self) -> bool:
+        done: set[str] = set()
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="etl") as pool:
+            while True:
+                if not self.cancelled.is_set():
+                    for name, (_, deps) in STEPS.items():
+                        if self.status[name] == "pending" and name not in futures.values() \
+                                and all(d in done for d in deps):
+                            futures[pool.submit(self.run_step, name)] = name
+
+                running = [f for f in futures if not f.done()]
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = futures[fut]
+                    try:
+                        ok = fut.result() == 0
+                    except Exception as ex:
+                        self.status[name] = "failed"
+                        self.log(name, f"❌ {ex}", sys.stderr)
+                        ok = False
+
+                    if ok:
+                        done.add(name)
+                    elif not self.cancelled.is_set():
+                        self.log(name, f"❌ Step failed: {STEPS[name][0]}", sys.stderr)
+                        self.cancel()
+
+        for name, state in self.status.items():
+            if state == "pending":
+                self.status[name] = "skipped"
+
+        return all(state == "ok" for state in self.status.values())
+
+    def report(self):
+        print("\n⏱️  ETL step summary:")
+        for name in STEPS:
+            secs = self.elapsed.get(name)
+            took = f"{secs:8.2f}s" if secs is not None else "       -"
+            print(f"  {name:<12} {self.status[name]:<10} {took}")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run all ETL steps.")
+    p.add_argument("run_date", nargs="?", default=None, help="YYYYMMDD, e.g. 20251221")
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Max steps running at once (default: $ETL_WORKERS or 3)",
+    )
+    p.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="full",
+        help="Fact load mode passed to every loader (see etl_common.facts)",
+    )
+    p.add_argument("--force", action="store_true", help="Reload files the load manifest marks as unchanged")
+    p.add_argument(
+        "--restart",
+        action="store_true",
+        help="Start a new run instead of resuming an unfinished one for the same run_date and mode",
+    )
+    p.add_argument("--target", choices=TARGETS, default=DEFAULT_TARGET, help="Where to load (default: $ETL_TARGET or postgres)")
+    return p.parse_args()
 
 
 def main():
-    base_dir = Path(__file__).resolve().parent
-    run_date = sys.argv[1] if len(sys.argv) > 1 else None
+    args = parse_args()
+    run_date = args.run_date
 
     if run_date and (not run_date.isdigit() or len(run_date) != 8):
         raise SystemExit("run_date must be YYYYMMDD, e.g. 20251221")
+    if args.workers < 1:
+        raise SystemExit("--workers must be >= 1")
+
+    # Runs are keyed by partition, so resolve "latest" once for every step.
+    run_date = run_date or resolve_fact_dir().name
+    tracked = args.target == "postgres"
+    if tracked:
+        with connection() as conn:
+            cur = conn.cursor()
+            run = begin_run(cur, SCHEMA, run_date, args.mode, args.restart)
+            done = completed_tables(cur, SCHEMA, run)
+            conn.commit()
+        set_run_id(run.run_id)
+        if run.resumed:
+            print(f"↩ Resuming run {run.run_id} (attempt {run.attempt}): {len(done)} tables already loaded.")
+        else:
+            print(f"🆕 Run {run.run_id} ({run_date}, {args.mode})")
+    else:
+        run = Run(RUN_ID, run_date, args.mode)
+        print(f"🦆 Run {run.run_id} ({run_date}, {args.mode}) into {args.target}")
 
-    sales = base_dir / "load_sales.py"
-    ops = base_dir / "load_operations.py"
-    fin = base_dir / "load_finance.py"
+    pipeline = Pipeline(run, args.workers, args.force, args.target)
+    start = time.perf_counter()
+    sys.stdout, sys.stderr = StepOutput(sys.stdout), StepOutput(sys.stderr)
+    ok = False
+    try:
+        ok = pipeline.run()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout, sys.stderr = sys.stdout.stream, sys.stderr.stream
+        try:
+            if tracked:
+                with connection() as conn:
+                    finish_run(conn.cursor(), SCHEMA, run, ok)
+                    conn.commit()
+        finally:
+            close_pool()
+    pipeline.report()
+    print(f"  {'total':<12} {'':<10} {time.perf_counter() - start:8.2f}s")
 
-    run_script(sales, run_date)
-    run_script(ops, run_date)
-    run_script(fin, run_date)
+    if not ok:
+        raise SystemExit(1)
 
     print("\n✅ All ETL steps completed successfully.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,34 @@
+"""
+Fixtures for the ETL tests.
+
+Tests that need PostgreSQL run against a scratch database (bench_etl.py's
+``scratch_database``) created through ETL_TEST_ADMIN_URL, a DSN of the
+``postgres`` database of a server we may create databases on; they are
+skipped when it is not set.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ETL_DIR))
+
+
+@pytest.fixture
+def scratch_dsn(monkeypatch):
+    admin_dsn = os.environ.get("ETL_TEST_ADMIN_URL")
+    if not admin_dsn:
+        pytest.skip("ETL_TEST_ADMIN_URL not set")
+
+    from bench_etl import scratch_database
+    from etl_common.db import close_pool
+
+    with scratch_database(admin_dsn) as dsn:
+        monkeypatch.setenv("NEON_CONN_STR", dsn)
+        try:
+            yield dsn
+        finally:
+            close_pool()
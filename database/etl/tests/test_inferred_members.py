@@ -0,0 +1,106 @@
+"""An unknown code is inferred by a fact load, then arrives with the dimension file."""
+
+from pathlib import Path
+
+import pandas as pd
+import psycopg2
+import pytest
+
+from etl_common import dimensions
+from etl_common.dimensions import sync_dimension
+from etl_common.keys import SurrogateKeyCache
+from etl_common.partitions import ensure_fact_partitions
+from load_dimensions import DIM_COLUMN_MAP, DIM_KEY_MAP, DIM_NATURAL_KEY_MAP
+
+SCHEMA = "analytics"
+
+CUSTOMER_HEADER = ",".join(DIM_COLUMN_MAP["dimcustomer"])
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    cache = SurrogateKeyCache()
+    monkeypatch.setattr(dimensions, "SURROGATE_KEYS", cache)
+    return cache
+
+
+@pytest.fixture
+def conn(scratch_dsn):
+    conn = psycopg2.connect(scratch_dsn)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO analytics.dimdate VALUES (20250101, '2025-01-01', 2025, 1, 1, 'January', 1, 3, 'Wednesday', true);
+        INSERT INTO analytics.dimproduct (productkey, productcode, productname) VALUES (1, 'P001', 'Widget');
+        """
+    )
+    ensure_fact_partitions(cur, SCHEMA)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def write_customers(path: Path, *rows: str) -> Path:
+    path.write_text("\n".join([CUSTOMER_HEADER, *rows]) + "\n", encoding="utf-8")
+    return path
+
+
+def sync_customers(conn, path: Path) -> dimensions.DimensionSync:
+    result = sync_dimension(
+        conn.cursor(), SCHEMA, "dimcustomer", DIM_KEY_MAP["dimcustomer"], DIM_NATURAL_KEY_MAP["dimcustomer"],
+        DIM_COLUMN_MAP["dimcustomer"], path,
+    )
+    conn.commit()
+    return result
+
+
+def customers(conn) -> dict[str, tuple[int, bool]]:
+    cur = conn.cursor()
+    cur.execute("SELECT customercode, customerkey, isactive FROM analytics.dimcustomer")
+    return {code: (key, active) for code, key, active in cur.fetchall()}
+
+
+def test_inferred_member_is_kept_then_adopted(conn, keys, tmp_path):
+    sync_customers(conn, write_customers(tmp_path / "c1.csv", "1,C001,Acme,B2B,SMB,,Direct,true"))
+
+    # A fact load meets C999 before the dimension file has it.
+    facts = tmp_path / "factsales.csv"
+    facts.write_text("customercode,productkey\nC001,1\nC999,1\n", encoding="utf-8")
+    keys.prepare(conn.cursor(), SCHEMA, {"factsales": (facts, ["customerkey", "productkey"])})
+    inferred_key = int(keys.resolve("customerkey", pd.Series(["C999"]))[0])
+    assert inferred_key < 0
+
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO analytics.factsales (datekey, customerkey, productkey, invoicenumber, invoicelineno, quantity)
+        VALUES (20250101, 1, 1, 'INV-1', 1, 1), (20250101, %s, 1, 'INV-2', 1, 1)
+        """,
+        (inferred_key,),
+    )
+    conn.commit()
+
+    # Still missing from the file: the placeholder stays active.
+    result = sync_customers(conn, write_customers(tmp_path / "c2.csv", "1,C001,Acme,B2B,SMB,,Direct,true"))
+    assert (result.deactivated, result.adopted) == (0, 0)
+    assert customers(conn)["C999"] == (inferred_key, True)
+
+    # The file brings it: the placeholder takes the file's key and facts follow.
+    result = sync_customers(
+        conn,
+        write_customers(
+            tmp_path / "c3.csv",
+            "1,C001,Acme,B2B,SMB,,Direct,true",
+            "7,C999,Late Arrival Ltd,B2C,Retail,,Online,true",
+        ),
+    )
+    assert (result.adopted, result.inserted, result.deactivated) == (1, 0, 0)
+    assert customers(conn) == {"C001": (1, True), "C999": (7, True)}
+    cur.execute("SELECT invoicenumber, customerkey FROM analytics.factsales ORDER BY 1")
+    assert cur.fetchall() == [("INV-1", 1), ("INV-2", 7)]
+    cur.execute("SELECT customername FROM analytics.dimcustomer WHERE customerkey = 7")
+    assert cur.fetchone() == ("Late Arrival Ltd",)
+
+    # The cache forgot the old key and resolves the code to the adopted one.
+    keys.prepare(conn.cursor(), SCHEMA, {"factsales": (facts, ["customerkey", "productkey"])})
+    assert list(keys.resolve("customerkey", pd.Series(["C001", "C999"]))) == [1, 7]
@@ -1,14 +1,47 @@
 # database/mock_data/generate_data_excel.py
 import argparse
+import gzip
+import io
+import itertools
+import os
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import date, timedelta
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+# Make results reproducible for your portfolio (override with --seed)
+DEFAULT_SEED = 42
 
-# Make results reproducible for your portfolio
-random.seed(42)
+# Volumes at --scale-factor 1. Every count is multiplied by the scale factor
+# (TPC-style), so dimension cardinalities and fact volumes grow together.
+BASE_VOLUMES = dict(
+    products=30,
+    customers=40,
+    warehouses=3,
+    salesreps=14,
+    sales=4000,
+    orders=2500,
+    inventory_per_date=10,  # products snapshotted per month-end
+    production_per_date=5,  # products produced per weekday
+)
+
+# Facts are generated and written this many rows at a time, so peak memory
+# does not depend on the scale factor (override with --chunk-rows).
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def scaled_volumes(scale_factor: float) -> dict[str, int]:
+    return {k: max(1, round(v * scale_factor)) for k, v in BASE_VOLUMES.items()}
+
+
+# Default dimdate range; the base fact volumes are spread over it.
+HISTORY_START = date(2024, 1, 1)
+HISTORY_END = date(2025, 12, 31)
 
 # Output folder: database/mock_data/csv/
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,19 +49,100 @@ DEFAULT_OUTPUT_DIR = BASE_DIR / "csv"
 
 
 # -------------------------------------------------------------------
-# Helper: save DataFrame as CSV with a small log message
+# Helpers: save DataFrame as CSV / Parquet with a small log message
 # -------------------------------------------------------------------
-def save_csv(df: pd.DataFrame, name: str, output_dir: Path) -> None:
+# compression -> file suffix; the loaders read all of these (etl_common/sources.py)
+COMPRESSION_SUFFIXES = {None: ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+PARTITION_SUFFIXES = (*COMPRESSION_SUFFIXES.values(), ".parquet")
+
+
+def _output_path(output_dir: Path, name: str, suffix: str) -> Path:
     output_dir.mkdir(parents=True, exist_ok=True)
-    path = output_dir / f"{name}.csv"
-    df.to_csv(path, index=False)
-    print(f"Saved {name}.csv with {len(df):,} rows -> {path}")
+    # The loaders prefer plain .csv, so never leave a stale variant next to the new file.
+    for other in PARTITION_SUFFIXES:
+        (output_dir / f"{name}{other}").unlink(missing_ok=True)
+    return output_dir / f"{name}{suffix}"
+
+
+def save_csv(df: pd.DataFrame, name: str, output_dir: Path, compression: str | None = None) -> None:
+    path = _output_path(output_dir, name, COMPRESSION_SUFFIXES[compression])
+    # zstd needs the optional 'zstandard' package.
+    df.to_csv(path, index=False, compression=compression)
+    print(f"Saved {path.name} with {len(df):,} rows -> {path}")
+
+
+def _open_text(path: Path, compression: str | None):
+    """One text handle for the whole file: a single gzip member / zstd frame however many chunks."""
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as ex:
+            raise ImportError("--compress zstd requires the 'zstandard' package") from ex
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(path.open("wb")), encoding="utf-8", newline="")
+    return path.open("w", encoding="utf-8", newline="")
+
+
+def _arrow_table(df: pd.DataFrame):
+    """``df`` as an Arrow table with date (not timestamp) columns."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    return table
+
+
+def format_chunk(df: pd.DataFrame, fmt: str = "csv", header: bool = True):
+    """One chunk of a fact file: CSV text, or an Arrow table for Parquet (needs pyarrow)."""
+    if fmt == "parquet":
+        return _arrow_table(df)
+    return df.to_csv(index=False, header=header)
+
+
+def save_fact(
+    chunks, name: str, output_dir: Path, fmt: str = "csv", compression: str | None = None, verbose: bool = True
+) -> int:
+    """
+    Stream the ``(rows, chunk)`` pairs of format_chunk into one file: CSV
+    text (optionally compressed) appended chunk by chunk, or Parquet with one
+    row group per chunk (``compression`` is then the Parquet codec; snappy
+    by default). Only the chunks in flight are in memory. Returns the rows
+    written.
+    """
+    rows = 0
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        path = _output_path(output_dir, name, ".parquet")
+        writer = None
+        try:
+            for n, table in chunks:
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression=compression or "snappy")
+                writer.write_table(table.cast(writer.schema))
+                rows += n
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        path = _output_path(output_dir, name, COMPRESSION_SUFFIXES[compression])
+        with _open_text(path, compression) as f:
+            for n, text in chunks:
+                f.write(text)
+                rows += n
+    if verbose:
+        print(f"Saved {path.name} with {rows:,} rows -> {path}")
+    return rows
+
 
 # -------------------------------------------------------------------
 # DimDate
 # -------------------------------------------------------------------
-def make_dim_date(start: date = date(2024, 1, 1),
-                  end: date = date(2025, 12, 31)):
+def make_dim_date(start: date = HISTORY_START,
+                  end: date = HISTORY_END):
     rows = []
     date_rows = []  # list of (datekey, fulldate)
 
@@ -155,9 +269,9 @@ def make_dim_customer(region_keys, n: int = 40):
     return df, customer_keys
 
 
-def make_dim_warehouse(region_keys):
+def make_dim_warehouse(region_keys, n: int = 3):
     rows = []
-    for i in range(1, 4):
+    for i in range(1, n + 1):
         code = f"WH{i:02d}"
         name = f"Main Warehouse {i}"
         region = random.choice(region_keys)
@@ -175,9 +289,9 @@ def make_dim_warehouse(region_keys):
     return df, wh_keys
 
 
-def make_dim_salesrep(region_keys):
+def make_dim_salesrep(region_keys, n: int = 14):
     rows = []
-    for i in range(1, 15):
+    for i in range(1, n + 1):
         empcode = f"SR{i:03d}"
         name = f"Sales Rep {i:03d}"
         region = random.choice(region_keys)
@@ -230,288 +344,538 @@ def make_dim_glaccount():
 
 # -------------------------------------------------------------------
 # Facts
+#
+# Every fact is generated column-wise from a NumPy Generator: keys are
+# drawn with one integers() call per column and the amounts are whole-array
+# arithmetic, so millions of rows take well under a second before writing.
+# The same seed always gives the same rows.
 # -------------------------------------------------------------------
-def make_fact_sales(
-    date_keys, customer_keys, product_keys, region_keys, salesrep_keys, wh_keys
-):
-    rows = []
-    for _ in range(4000):  # 4k sales lines
-        datekey = random.choice(date_keys)
-        cust = random.choice(customer_keys)
-        prod = random.choice(product_keys)
-        region = random.choice(region_keys)
-        salesrep = random.choice(salesrep_keys)
-        wh = random.choice(wh_keys)
-        invoice_no = f"INV{random.randint(100000, 999999)}"
-        line_no = random.randint(1, 5)
-        qty = round(random.uniform(1, 50), 2)
-        list_price = round(random.uniform(10, 200), 2)
-        discount = round(list_price * qty * random.uniform(0, 0.2), 2)
-        net_sales = round(list_price * qty - discount, 2)
-        cogs = round(net_sales * random.uniform(0.5, 0.8), 2)
-        gm = round(net_sales - cogs, 2)
+def _pick(rng: np.random.Generator, values, n: int) -> np.ndarray:
+    values = np.asarray(values)
+    return values[rng.integers(0, len(values), n)]
 
-        rows.append(
-            dict(
-                datekey=datekey,
-                customerkey=cust,
-                productkey=prod,
-                regionkey=region,
-                salesrepkey=salesrep,
-                warehousekey=wh,
-                invoicenumber=invoice_no,
-                invoicelineno=line_no,
-                quantity=qty,
-                listprice=list_price,
-                discountamount=discount,
-                netsales=net_sales,
-                cogs=cogs,
-                grossmargin=gm,
-                currency="EUR",
-            )
-        )
 
-    return pd.DataFrame(rows)
+def _pick_nullable(rng: np.random.Generator, values, n: int) -> pd.Series:
+    """Like _pick, but one draw in len(values) + 1 is NULL (nullable Int64)."""
+    values = np.asarray(values)
+    idx = rng.integers(0, len(values) + 1, n)
+    out = pd.array(values[np.minimum(idx, len(values) - 1)], dtype="Int64")
+    out[idx == len(values)] = pd.NA
+    return out
 
 
-def make_fact_sales_target(month_first_keys, region_keys):
-    rows = []
-    for mk in month_first_keys:
-        for region in region_keys:
-            revenue_target = round(random.uniform(20_000, 80_000), 2)
-            qty_target = round(random.uniform(500, 3_000), 2)
-            rows.append(
-                dict(
-                    datekey=mk,
-                    regionkey=region,
-                    salesrepkey=None,
-                    productkey=None,
-                    targetrevenue=revenue_target,
-                    targetquantity=qty_target,
-                )
-            )
-    return pd.DataFrame(rows)
+def _codes(rng: np.random.Generator, prefix: str, n: int, lo: int = 100000, hi: int = 1000000) -> np.ndarray:
+    """``n`` random codes like INV123456."""
+    return np.char.add(prefix, rng.integers(lo, hi, n).astype("U"))
 
 
-def make_fact_orders(date_rows, customer_keys, product_keys, region_keys, wh_keys):
-    rows = []
-    for _ in range(2500):
-        order_no = f"SO{random.randint(100000, 999999)}"
-        line_no = random.randint(1, 5)
+def _dates(date_rows) -> tuple[np.ndarray, np.ndarray]:
+    """(datekeys, datetime64[D] dates) of ``date_rows``."""
+    keys = np.array([dk for dk, _ in date_rows], dtype="int64")
+    days = np.array([d for _, d in date_rows], dtype="datetime64[D]")
+    return keys, days
 
-        order_date_key, order_date = random.choice(date_rows)
 
-        cust = random.choice(customer_keys)
-        prod = random.choice(product_keys)
-        region = random.choice(region_keys)
-        wh = random.choice(wh_keys)
-        ordered_qty = round(random.uniform(1, 80), 2)
+def _month_ends(days: np.ndarray) -> np.ndarray:
+    return (days + 1).astype("datetime64[M]") != days.astype("datetime64[M]")
 
-        req_offset = random.randint(1, 20)
-        prom_delay = random.randint(0, 5)
-        ship_delay = random.randint(-2, 7)
 
-        requested_date = order_date + timedelta(days=req_offset)
-        promised_date = requested_date + timedelta(days=prom_delay)
-        actual_ship = promised_date + timedelta(days=ship_delay)
+def _weekdays(days: np.ndarray) -> np.ndarray:
+    # 1970-01-01 was a Thursday (weekday index 3, Monday = 0)
+    return (days.astype("int64") + 3) % 7 < 5
 
-        shipped_qty = max(0, round(ordered_qty - random.uniform(0, 10), 2))
-        cancelled_qty = max(0, round(ordered_qty - shipped_qty, 2))
-        is_on_time = actual_ship <= promised_date
-        is_in_full = shipped_qty >= ordered_qty * 0.98
 
-        rows.append(
-            dict(
-                ordernumber=order_no,
-                orderlineno=line_no,
-                orderdatekey=order_date_key,
-                customerkey=cust,
-                productkey=prod,
-                regionkey=region,
-                warehousekey=wh,
-                orderedqty=ordered_qty,
-                requesteddeliverydate=requested_date,
-                promiseddeliverydate=promised_date,
-                actualshipdate=actual_ship,
-                shippedqty=shipped_qty,
-                cancelledqty=cancelled_qty,
-                isontime=is_on_time,
-                isinfull=is_in_full,
-            )
+def _sample_per_date(rng: np.random.Generator, keys, n_dates: int, k: int) -> np.ndarray:
+    """``k`` distinct keys per date (random.sample per date), as an (n_dates, k) array."""
+    keys = np.asarray(keys)
+    k = min(k, len(keys))
+    order = np.argsort(rng.random((n_dates, len(keys))), axis=1)[:, :k]
+    return keys[order]
+
+
+def make_fact_sales(
+    rng, date_keys, customer_keys, product_keys, region_keys, salesrep_keys, wh_keys, n: int = 4000
+):
+    qty = np.round(rng.uniform(1, 50, n), 2)
+    list_price = np.round(rng.uniform(10, 200, n), 2)
+    gross = list_price * qty
+    discount = np.round(gross * rng.uniform(0, 0.2, n), 2)  # at most 20%
+    net_sales = np.round(gross - discount, 2)
+    cogs = np.round(net_sales * rng.uniform(0.5, 0.8, n), 2)  # 50-80% of net sales
+
+    return pd.DataFrame(
+        dict(
+            datekey=_pick(rng, date_keys, n),
+            customerkey=_pick(rng, customer_keys, n),
+            productkey=_pick(rng, product_keys, n),
+            regionkey=_pick(rng, region_keys, n),
+            salesrepkey=_pick(rng, salesrep_keys, n),
+            warehousekey=_pick(rng, wh_keys, n),
+            invoicenumber=_codes(rng, "INV", n),
+            invoicelineno=rng.integers(1, 6, n),
+            quantity=qty,
+            listprice=list_price,
+            discountamount=discount,
+            netsales=net_sales,
+            cogs=cogs,
+            grossmargin=np.round(net_sales - cogs, 2),
+            currency="EUR",
         )
-    return pd.DataFrame(rows)
+    )
 
 
-def make_fact_inventory(date_rows, product_keys, wh_keys):
-    # date_rows: list of (datekey, date)
-    rows = []
-    for dk, d in date_rows:
-        next_day = d + timedelta(days=1)
-        # only month-end snapshots
-        if next_day.month == d.month:
-            continue
-
-        sample_products = random.sample(product_keys, k=min(10, len(product_keys)))
-        for prod in sample_products:
-            wh = random.choice(wh_keys)
-            opening = round(random.uniform(0, 200), 2)
-            inbound = round(random.uniform(0, 100), 2)
-            outbound = round(random.uniform(0, 120), 2)
-            closing = max(0, opening + inbound - outbound)
-            value = round(closing * random.uniform(5, 40), 2)
-            age = round(random.uniform(5, 120), 1)
-            prov = round(value * random.uniform(0, 0.2), 2)
-
-            rows.append(
-                dict(
-                    datekey=dk,
-                    productkey=prod,
-                    warehousekey=wh,
-                    openingqty=opening,
-                    inboundqty=inbound,
-                    outboundqty=outbound,
-                    closingqty=closing,
-                    inventoryvalue=value,
-                    averageagedays=age,
-                    provisionamount=prov,
-                )
-            )
-    return pd.DataFrame(rows)
+def make_fact_sales_target(rng, month_first_keys, region_keys):
+    months = np.repeat(np.asarray(month_first_keys, dtype="int64"), len(region_keys))
+    n = len(months)
+    return pd.DataFrame(
+        dict(
+            datekey=months,
+            regionkey=np.tile(np.asarray(region_keys), len(month_first_keys)),
+            salesrepkey=pd.array([pd.NA] * n, dtype="Int64"),
+            productkey=pd.array([pd.NA] * n, dtype="Int64"),
+            targetrevenue=np.round(rng.uniform(20_000, 80_000, n), 2),
+            targetquantity=np.round(rng.uniform(500, 3_000, n), 2),
+        )
+    )
 
 
-def make_fact_production(date_rows, product_keys, wh_keys):
-    rows = []
-    for dk, d in date_rows:
-        # weekday? (1–5)
-        if d.isoweekday() > 5:
-            continue
-
-        sample_products = random.sample(product_keys, k=min(5, len(product_keys)))
-        for prod in sample_products:
-            wh = random.choice(wh_keys)
-            produced = round(random.uniform(0, 150), 2)
-            scrap = round(produced * random.uniform(0, 0.1), 2)
-            machine_hours = round(random.uniform(1, 20), 2)
-            downtime = round(random.uniform(0, 3), 2)
-
-            rows.append(
-                dict(
-                    datekey=dk,
-                    productkey=prod,
-                    warehousekey=wh,
-                    producedqty=produced,
-                    scrapqty=scrap,
-                    machinehours=machine_hours,
-                    downtimehours=downtime,
-                )
-            )
-    return pd.DataFrame(rows)
+def make_fact_orders(rng, date_rows, customer_keys, product_keys, region_keys, wh_keys, n: int = 2500):
+    date_keys, days = _dates(date_rows)
+    idx = rng.integers(0, len(date_keys), n)
+    ordered_qty = np.round(rng.uniform(1, 80, n), 2)
+
+    # order date -> requested -> promised -> actual ship
+    requested = days[idx] + rng.integers(1, 21, n)
+    promised = requested + rng.integers(0, 6, n)
+    actual_ship = promised + rng.integers(-2, 8, n)
+
+    shipped_qty = np.maximum(0, np.round(ordered_qty - rng.uniform(0, 10, n), 2))
+    cancelled_qty = np.maximum(0, np.round(ordered_qty - shipped_qty, 2))
+
+    return pd.DataFrame(
+        dict(
+            ordernumber=_codes(rng, "SO", n),
+            orderlineno=rng.integers(1, 6, n),
+            orderdatekey=date_keys[idx],
+            customerkey=_pick(rng, customer_keys, n),
+            productkey=_pick(rng, product_keys, n),
+            regionkey=_pick(rng, region_keys, n),
+            warehousekey=_pick(rng, wh_keys, n),
+            orderedqty=ordered_qty,
+            requesteddeliverydate=requested,
+            promiseddeliverydate=promised,
+            actualshipdate=actual_ship,
+            shippedqty=shipped_qty,
+            cancelledqty=cancelled_qty,
+            isontime=actual_ship <= promised,
+            isinfull=shipped_qty >= ordered_qty * 0.98,
+        )
+    )
 
 
-def make_fact_finance(month_first_keys, pl_ids, bs_ids, cf_ids, region_keys):
+def make_fact_inventory(rng, date_rows, product_keys, wh_keys, per_date: int = 10):
+    # only month-end snapshots
+    date_keys, days = _dates(date_rows)
+    snapshot_keys = date_keys[_month_ends(days)]
+    products = _sample_per_date(rng, product_keys, len(snapshot_keys), per_date)
+    n = products.size
+
+    opening = np.round(rng.uniform(0, 200, n), 2)
+    inbound = np.round(rng.uniform(0, 100, n), 2)
+    outbound = np.round(rng.uniform(0, 120, n), 2)
+    closing = np.round(np.maximum(0, opening + inbound - outbound), 2)
+    value = np.round(closing * rng.uniform(5, 40, n), 2)
+
+    return pd.DataFrame(
+        dict(
+            datekey=np.repeat(snapshot_keys, products.shape[1]),
+            productkey=products.ravel(),
+            warehousekey=_pick(rng, wh_keys, n),
+            openingqty=opening,
+            inboundqty=inbound,
+            outboundqty=outbound,
+            closingqty=closing,
+            inventoryvalue=value,
+            averageagedays=np.round(rng.uniform(5, 120, n), 1),
+            provisionamount=np.round(value * rng.uniform(0, 0.2, n), 2),
+        )
+    )
+
+
+def make_fact_production(rng, date_rows, product_keys, wh_keys, per_date: int = 5):
+    # weekdays only
+    date_keys, days = _dates(date_rows)
+    work_keys = date_keys[_weekdays(days)]
+    products = _sample_per_date(rng, product_keys, len(work_keys), per_date)
+    n = products.size
+
+    produced = np.round(rng.uniform(0, 150, n), 2)
+    return pd.DataFrame(
+        dict(
+            datekey=np.repeat(work_keys, products.shape[1]),
+            productkey=products.ravel(),
+            warehousekey=_pick(rng, wh_keys, n),
+            producedqty=produced,
+            scrapqty=np.round(produced * rng.uniform(0, 0.1, n), 2),
+            machinehours=np.round(rng.uniform(1, 20, n), 2),
+            downtimehours=np.round(rng.uniform(0, 3, n), 2),
+        )
+    )
+
+
+def make_fact_finance(rng, month_first_keys, pl_ids, bs_ids, cf_ids, region_keys):
+    months = np.asarray(month_first_keys, dtype="int64")
+
+    def grid(gl_ids):
+        return np.repeat(months, len(gl_ids)), np.tile(np.asarray(gl_ids), len(months))
+
     # P&L monthly
-    pl_rows = []
-    for mk in month_first_keys:
-        for gl in pl_ids:
-            region = random.choice(region_keys + [None])
-            amount = round(random.uniform(-80_000, 80_000), 2)
-            pl_rows.append(
-                dict(
-                    datekey=mk,
-                    glaccountkey=gl,
-                    regionkey=region,
-                    amount=amount,
-                    currency="EUR",
-                )
-            )
+    datekey, gl = grid(pl_ids)
+    n = len(datekey)
+    pl = pd.DataFrame(
+        dict(
+            datekey=datekey,
+            glaccountkey=gl,
+            regionkey=_pick_nullable(rng, region_keys, n),
+            amount=np.round(rng.uniform(-80_000, 80_000, n), 2),
+            currency="EUR",
+        )
+    )
 
     # Balance Sheet monthly balances
-    bs_rows = []
-    for mk in month_first_keys:
-        for gl in bs_ids:
-            region = random.choice(region_keys + [None])
-            bal = round(random.uniform(-200_000, 200_000), 2)
-            bs_rows.append(
-                dict(
-                    datekey=mk,
-                    glaccountkey=gl,
-                    regionkey=region,
-                    balanceamount=bal,
-                    currency="EUR",
-                )
-            )
+    datekey, gl = grid(bs_ids)
+    n = len(datekey)
+    bs = pd.DataFrame(
+        dict(
+            datekey=datekey,
+            glaccountkey=gl,
+            regionkey=_pick_nullable(rng, region_keys, n),
+            balanceamount=np.round(rng.uniform(-200_000, 200_000, n), 2),
+            currency="EUR",
+        )
+    )
 
     # Cash Flow
-    cf_rows = []
-    for mk in month_first_keys:
-        for gl in cf_ids:
-            cf = round(random.uniform(-100_000, 100_000), 2)
-            cf_rows.append(
-                dict(
-                    datekey=mk,
-                    glaccountkey=gl,
-                    regionkey=None,
-                    cashflowamount=cf,
-                    currency="EUR",
-                )
-            )
+    datekey, gl = grid(cf_ids)
+    n = len(datekey)
+    cf = pd.DataFrame(
+        dict(
+            datekey=datekey,
+            glaccountkey=gl,
+            regionkey=pd.array([pd.NA] * n, dtype="Int64"),
+            cashflowamount=np.round(rng.uniform(-100_000, 100_000, n), 2),
+            currency="EUR",
+        )
+    )
+
+    return pl, bs, cf
 
-    return (
-        pd.DataFrame(pl_rows),
-        pd.DataFrame(bs_rows),
-        pd.DataFrame(cf_rows),
+
+# -------------------------------------------------------------------
+# Partitioned generation
+#
+# A fact is generated per day (and a big day in blocks of SEED_BLOCK_ROWS).
+# Each (table, day, block) unit gets its own Generator seeded with
+# SeedSequence(seed, spawn_key=(table id, day ordinal, block)), so its rows
+# depend only on --seed and --scale-factor: units are spread over a process
+# pool (--workers) and the files are bit-identical whatever the worker
+# count or --chunk-rows.
+# -------------------------------------------------------------------
+# Spawn keys of the per-unit seeds: append new facts, never renumber.
+FACT_IDS = {
+    "factsales": 0,
+    "factsalestarget": 1,
+    "factorders": 2,
+    "factinventory": 3,
+    "factproduction": 4,
+    "factfinancepl": 5,
+    "factfinancebs": 6,
+    "factfinancecf": 7,
+}
+FINANCE_FACTS = ("factfinancepl", "factfinancebs", "factfinancecf")  # order of make_fact_finance
+SEED_BLOCK_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class FactContext:
+    """What every worker needs to generate any unit (sent once per process)."""
+
+    seed: int
+    vol: dict
+    fmt: str
+    customer_keys: list
+    product_keys: list
+    region_keys: list
+    salesrep_keys: list
+    wh_keys: list
+    pl_ids: list
+    bs_ids: list
+    cf_ids: list
+
+
+def _spread(n: int, day: int, days: int) -> int:
+    """Rows on day index ``day`` when ``n`` rows are spread evenly over every ``days`` days."""
+    return (day + 1) * n // days - day * n // days
+
+
+def _day_rows(ctx: FactContext, table: str, d: date) -> int:
+    vol = ctx.vol
+    if table in ("factsales", "factorders"):
+        # the base volumes cover the default dimdate history
+        days = (HISTORY_END - HISTORY_START).days + 1
+        return _spread(vol[table.removeprefix("fact")], (d - HISTORY_START).days, days)
+    if table == "factinventory":
+        return min(vol["inventory_per_date"], len(ctx.product_keys)) if (d + timedelta(days=1)).day == 1 else 0
+    if table == "factproduction":
+        return min(vol["production_per_date"], len(ctx.product_keys)) if d.isoweekday() <= 5 else 0
+    if d.day != 1:
+        return 0
+    if table == "factsalestarget":
+        return len(ctx.region_keys)
+    return len((ctx.pl_ids, ctx.bs_ids, ctx.cf_ids)[FINANCE_FACTS.index(table)])
+
+
+def _units(ctx: FactContext, table: str, days) -> list[tuple[date, int, int]]:
+    """(day, block, rows) units of ``table`` over ``days``; at least one, so every file gets a header."""
+    units = []
+    for d in days:
+        n = _day_rows(ctx, table, d)
+        for block, start in enumerate(range(0, n, SEED_BLOCK_ROWS)):
+            units.append((d, block, min(SEED_BLOCK_ROWS, n - start)))
+    return units or [(days[0], 0, 0)]
+
+
+def _tasks(units, chunk_rows: int):
+    """Consecutive units grouped into tasks of at most ``chunk_rows`` rows (or one unit)."""
+    task, rows = [], 0
+    for unit in units:
+        if task and rows + unit[2] > chunk_rows:
+            yield task
+            task, rows = [], 0
+        task.append(unit)
+        rows += unit[2]
+    if task:
+        yield task
+
+
+def make_fact_unit(ctx: FactContext, table: str, d: date, block: int, n: int) -> pd.DataFrame:
+    """Rows of one (table, day, block) unit, from its own Generator."""
+    rng = np.random.default_rng(np.random.SeedSequence(ctx.seed, spawn_key=(FACT_IDS[table], d.toordinal(), block)))
+    dk = int(d.strftime("%Y%m%d"))
+    if table == "factsales":
+        return make_fact_sales(
+            rng, [dk], ctx.customer_keys, ctx.product_keys, ctx.region_keys, ctx.salesrep_keys, ctx.wh_keys, n
+        )
+    if table == "factorders":
+        return make_fact_orders(rng, [(dk, d)], ctx.customer_keys, ctx.product_keys, ctx.region_keys, ctx.wh_keys, n)
+    if table == "factinventory":
+        return make_fact_inventory(rng, [(dk, d)], ctx.product_keys, ctx.wh_keys, ctx.vol["inventory_per_date"])
+    if table == "factproduction":
+        return make_fact_production(rng, [(dk, d)], ctx.product_keys, ctx.wh_keys, ctx.vol["production_per_date"])
+    month_first_keys = [dk] if d.day == 1 else []
+    if table == "factsalestarget":
+        return make_fact_sales_target(rng, month_first_keys, ctx.region_keys)
+    finance = make_fact_finance(rng, month_first_keys, ctx.pl_ids, ctx.bs_ids, ctx.cf_ids, ctx.region_keys)
+    return finance[FINANCE_FACTS.index(table)]
+
+
+_CONTEXT: FactContext | None = None  # per worker process, set by _init_worker
+
+
+def _init_worker(ctx: FactContext) -> None:
+    global _CONTEXT
+    _CONTEXT = ctx
+
+
+def _generate_chunk(table: str, units, header: bool):
+    """(rows, CSV text or Arrow table) of one task, ready for save_fact."""
+    df = pd.concat([make_fact_unit(_CONTEXT, table, *unit) for unit in units], ignore_index=True)
+    return len(df), format_chunk(df, _CONTEXT.fmt, header)
+
+
+def _in_order(pool, fn, jobs, ahead: int):
+    """fn(*job) for every job, in order, with at most ``ahead`` jobs in flight (bounded memory)."""
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, *job))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _run_jobs(ctx: FactContext, fn, jobs, workers: int):
+    """fn(*job) for every job, in order: on ``workers`` processes, or in this one."""
+    if workers <= 1:
+        _init_worker(ctx)
+        for job in jobs:
+            yield fn(*job)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ctx,))
+    try:
+        yield from _in_order(pool, fn, jobs, 2 * workers)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def iter_fact_chunks(ctx: FactContext, days, workers: int = 1, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """
+    ``(table, rows, chunk)`` of every fact over ``days``, table by table in
+    day order, split by table and day over ``workers`` processes. The first
+    CSV chunk of each table carries the header.
+    """
+    jobs = [
+        (t, units, i == 0)
+        for t in FACT_IDS
+        for i, units in enumerate(_tasks(_units(ctx, t, days), chunk_rows))
+    ]
+    for (t, _, _), (rows, chunk) in zip(jobs, _run_jobs(ctx, _generate_chunk, jobs, workers)):
+        yield t, rows, chunk
+
+
+def generate_facts(
+    ctx: FactContext,
+    days,
+    output_dir: Path,
+    compression: str | None = None,
+    workers: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> None:
+    """Generate every fact over ``days`` into ``output_dir`` (see iter_fact_chunks)."""
+    for t, chunks in itertools.groupby(iter_fact_chunks(ctx, days, workers, chunk_rows), key=lambda c: c[0]):
+        save_fact(((rows, chunk) for _, rows, chunk in chunks), t, output_dir, ctx.fmt, compression)
+
+
+def _write_partition_file(table: str, d: date, output_dir: Path, compression: str | None, chunk_rows: int) -> int:
+    """Generate and write ``table`` of day ``d`` (in a worker); returns its rows."""
+    chunks = (
+        _generate_chunk(table, units, i == 0)
+        for i, units in enumerate(_tasks(_units(_CONTEXT, table, [d]), chunk_rows))
     )
+    return save_fact(chunks, table, output_dir, _CONTEXT.fmt, compression, verbose=False)
+
+
+def generate_daily_partitions(
+    ctx: FactContext,
+    days,
+    output_dir: Path,
+    compression: str | None = None,
+    workers: int = 1,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> None:
+    """
+    One ``output_dir/daily/YYYYMMDD/`` partition per day, holding only that
+    day's facts: the same rows the full history has for the day. Every fact
+    is still written (header only on days without snapshots, production or
+    month starts). Each (table, day) file is generated and written by a
+    worker, so partitions scale with the cores.
+    """
+    dirs = [output_dir / "daily" / d.strftime("%Y%m%d") for d in days]
+    jobs = [(t, d, out, compression, chunk_rows) for d, out in zip(days, dirs) for t in FACT_IDS]
+    results = _run_jobs(ctx, _write_partition_file, jobs, workers)
+    for out in dirs:
+        rows = sum(itertools.islice(results, len(FACT_IDS)))
+        print(f"Saved {len(FACT_IDS)} facts with {rows:,} rows -> {out}")
+
 
 def parse_args():
     p = argparse.ArgumentParser()
-    p.add_argument("--ds", type=str, default=None, help="YYYY-MM-DD, e.g. 2025-12-20")
+    p.add_argument("--ds", type=str, default=None, help="YYYY-MM-DD, e.g. 2025-12-20 (default: today)")
     p.add_argument("--out-dir", type=str, default=str(DEFAULT_OUTPUT_DIR), help="Base output dir")
-    p.add_argument("--daily", action="store_true", help="Write into out-dir/daily/YYYYMMDD/")
-    return p.parse_args()
+    p.add_argument(
+        "--daily",
+        action="store_true",
+        help="One out-dir/daily/YYYYMMDD/ partition per day from --start to --end, holding only that day's facts "
+        "(default: the full history of facts in out-dir/daily/<ds>/)",
+    )
+    p.add_argument("--start", type=str, default=None, help="First daily partition, YYYY-MM-DD (default: --end)")
+    p.add_argument("--end", type=str, default=None, help="Last daily partition, YYYY-MM-DD (default: --ds)")
+    p.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="File format of the daily fact partitions (dimensions stay CSV)",
+    )
+    p.add_argument(
+        "--compress",
+        choices=["gzip", "zstd"],
+        default=None,
+        help="Compress the fact partitions: .csv.gz / .csv.zst, or the Parquet codec with --format parquet "
+        "(default: none / snappy); dimensions stay plain CSV",
+    )
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    p.add_argument(
+        "--scale-factor",
+        type=float,
+        default=1.0,
+        help="Multiply every dimension cardinality and fact volume (default: 1 = 30 products, 4000 sales, ...)",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Processes generating fact chunks; the output does not depend on it (default: all cores)",
+    )
+    p.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help=f"Fact rows generated and written at a time; bounds peak memory (default: {DEFAULT_CHUNK_ROWS:,})",
+    )
+    args = p.parse_args()
+    if (args.start or args.end) and not args.daily:
+        p.error("--start / --end need --daily")
+    try:
+        args.ds = date.fromisoformat(args.ds) if args.ds else date.today()
+        args.end = date.fromisoformat(args.end) if args.end else args.ds
+        args.start = date.fromisoformat(args.start) if args.start else args.end
+    except ValueError as ex:
+        p.error(str(ex))
+    if args.start > args.end:
+        p.error(f"--start {args.start} is after --end {args.end}")
+    return args
+
 
 # -------------------------------------------------------------------
 # Main
 # -------------------------------------------------------------------
 def main():
+    args = parse_args()
     print("Generating mock CSV data (no database)…")
+    random.seed(args.seed)  # dimensions; facts are seeded per unit (generate_facts)
 
     # ---- 日期（用于 daily facts）----
-    today = date.today()
-    ds_key = today.strftime("%Y%m%d")
+    ds_key = args.ds.strftime("%Y%m%d")
 
     # ---- 输出目录 ----
-    DIM_DIR = BASE_DIR / "csv"
-    FACT_DAILY_DIR = BASE_DIR / "csv" / "daily" / ds_key
+    DIM_DIR = Path(args.out_dir)
+    FACT_DAILY_DIR = DIM_DIR / "daily" / ds_key
+
+    vol = scaled_volumes(args.scale_factor)
 
     print(f"Dim output dir   : {DIM_DIR}")
-    print(f"Fact output dir  : {FACT_DAILY_DIR}")
-  
-    # 1. Dates
-    dim_date, date_rows, date_keys, month_first_keys = make_dim_date()
+    if args.daily:
+        print(f"Fact output dirs : {DIM_DIR / 'daily'}/{{{args.start:%Y%m%d}..{args.end:%Y%m%d}}}")
+    else:
+        print(f"Fact output dir  : {FACT_DAILY_DIR}")
+    print(f"Scale factor     : {args.scale_factor:g} ({vol['sales']:,} sales, {vol['orders']:,} orders)")
+
+    # 1. Dates (the history, widened to cover the daily partitions)
+    if args.daily:
+        dim_date, date_rows, date_keys, month_first_keys = make_dim_date(
+            min(HISTORY_START, args.start), max(HISTORY_END, args.end)
+        )
+    else:
+        dim_date, date_rows, date_keys, month_first_keys = make_dim_date()
 
-    # 2. Dimensions
+    # 2. Dimensions (small: generated and saved whole)
     dim_region, region_keys = make_dim_region()
-    dim_product, product_keys = make_dim_product()
-    dim_customer, customer_keys = make_dim_customer(region_keys)
-    dim_warehouse, wh_keys = make_dim_warehouse(region_keys)
-    dim_salesrep, salesrep_keys = make_dim_salesrep(region_keys)
+    dim_product, product_keys = make_dim_product(vol["products"])
+    dim_customer, customer_keys = make_dim_customer(region_keys, vol["customers"])
+    dim_warehouse, wh_keys = make_dim_warehouse(region_keys, vol["warehouses"])
+    dim_salesrep, salesrep_keys = make_dim_salesrep(region_keys, vol["salesreps"])
     dim_glaccount, pl_ids, bs_ids, cf_ids = make_dim_glaccount()
 
-    # 3. Facts
-    fact_sales = make_fact_sales(
-        date_keys, customer_keys, product_keys, region_keys, salesrep_keys, wh_keys
-    )
-    fact_sales_target = make_fact_sales_target(month_first_keys, region_keys)
-    fact_orders = make_fact_orders(
-        date_rows, customer_keys, product_keys, region_keys, wh_keys
-    )
-    fact_inventory = make_fact_inventory(date_rows, product_keys, wh_keys)
-    fact_production = make_fact_production(date_rows, product_keys, wh_keys)
-    fact_pl, fact_bs, fact_cf = make_fact_finance(
-        month_first_keys, pl_ids, bs_ids, cf_ids, region_keys
-    )
-
-    # 4. Save all to CSV
     save_csv(dim_date, "dimdate", DIM_DIR)
     save_csv(dim_region, "dimregion", DIM_DIR)
     save_csv(dim_customer, "dimcustomer", DIM_DIR)
@@ -520,14 +884,18 @@ def main():
     save_csv(dim_salesrep, "dimsalesrep", DIM_DIR)
     save_csv(dim_glaccount, "dimglaccount", DIM_DIR)
 
-    save_csv(fact_sales, "factsales", FACT_DAILY_DIR)
-    save_csv(fact_sales_target, "factsalestarget", FACT_DAILY_DIR)
-    save_csv(fact_orders, "factorders", FACT_DAILY_DIR)
-    save_csv(fact_inventory, "factinventory", FACT_DAILY_DIR)
-    save_csv(fact_production, "factproduction", FACT_DAILY_DIR)
-    save_csv(fact_pl, "factfinancepl", FACT_DAILY_DIR)
-    save_csv(fact_bs, "factfinancebs", FACT_DAILY_DIR)
-    save_csv(fact_cf, "factfinancecf", FACT_DAILY_DIR)
+    # 3. Facts, split by table and day over the worker processes
+    ctx = FactContext(
+        args.seed, vol, args.format,
+        customer_keys, product_keys, region_keys, salesrep_keys, wh_keys, pl_ids, bs_ids, cf_ids,
+    )
+    workers = max(1, args.workers)
+    if args.daily:
+        days = [args.start + timedelta(days=i) for i in range((args.end - args.start).days + 1)]
+        generate_daily_partitions(ctx, days, DIM_DIR, args.compress, workers, args.chunk_rows)
+    else:
+        days = [d for _, d in date_rows]
+        generate_facts(ctx, days, FACT_DAILY_DIR, args.compress, workers, args.chunk_rows)
 
     print("✅ CSV mock data generation completed.")
 